@@ -1,47 +1,283 @@
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from .extensions import limiter
-
-db = SQLAlchemy()
-migrate = Migrate()
-
-def create_app():
-    app = Flask(__name__, instance_relative_config=True)
-    limiter.init_app(app)
-
-
-    app.config.from_object("config.Config")
-
-    
-    db.init_app(app)
-    migrate.init_app(app, db)
-   
-    
-
-    
-    from .routes import bp as main_bp
-    app.register_blueprint(main_bp)
-
-    
-    @app.cli.command("init-db")
-    def init_db():
-        from . import models  
-        with app.app_context():
-            db.create_all()
-            print("Database creato in instance/social.db")
-
-    # CLI
-    @app.cli.command("seed")
-    def seed():
-        from .models import Student, Post
-        s = Student(nome="Mario Rossi", email="mario@example.com", corso="Python Base",
-                    programmi="php, react, angular")
-        db.session.add(s)
-        db.session.flush()
-        p = Post(author_id=s.id, content="Ciao a tutti, primo post sul social!")
-        db.session.add(p)
-        db.session.commit()
-        print("Dati di seed inseriti.")
-    return app
-
+import os
+import sqlite3
+import sys
+import time
+import click
+from flask import Flask
+from flask.cli import with_appcontext
+from flask_sqlalchemy import SQLAlchemy
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from .extensions import limiter, bus, page_cache, compress, like_buffer, neardup, trending
+
+db = SQLAlchemy()
+
+
+@event.listens_for(Engine, "connect")
+def _sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite applica ON DELETE CASCADE solo con foreign_keys=ON (per connessione)
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+def _in_cli() -> bool:
+    return click.get_current_context(silent=True) is not None
+
+def _init_migrate(app):
+    # Flask-Migrate (e quindi Alembic) serve solo ai comandi `flask db ...`:
+    # lo carichiamo se l'app nasce dentro il CLI (c'è un contesto click) o se
+    # lo script chiamante l'ha già importato. I worker WSGI/ASGI lo saltano.
+    if _in_cli() or "flask_migrate" in sys.modules:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+        app.cli.commands["db"].add_command(db_backup)
+
+@click.command("backup")
+@click.option("--method", type=click.Choice(["step", "vacuum"]), default=None,
+              help="Default BACKUP_METHOD.")
+@click.option("--dest", type=click.Path(file_okay=False), default=None,
+              help="Cartella di destinazione (default BACKUP_DIR).")
+@click.option("--list", "list_only", is_flag=True, help="Elenca i backup esistenti.")
+@with_appcontext
+def db_backup(method, dest, list_only):
+    """Backup a caldo del database, verificato con integrity_check."""
+    from flask import current_app
+    from .backup import BackupError, create_backup, list_backups
+    if list_only:
+        for info in list_backups(dest or current_app.config["BACKUP_DIR"]):
+            print(f"{info['created_at']}  {info['file']}  {info['size']:>10} B  "
+                  f"revisione {info['alembic_revision']}")
+        return
+    try:
+        info = create_backup(current_app, method, dest)
+    except BackupError as e:
+        raise click.ClickException(str(e))
+    print(f"{info['file']}: {info['size']} byte in {info['duration_ms']} ms "
+          f"({info['method']}, revisione {info['alembic_revision']})")
+    for name in info["pruned"]:
+        print(f"rimosso {name}")
+
+def create_app():
+    started = time.perf_counter()
+    app = Flask(__name__, instance_relative_config=True)
+    os.makedirs(app.instance_path, exist_ok=True)
+
+
+    app.config.from_object("config.Config")
+    # prima che qualcuno tocchi app.jinja_env (viene creato una volta sola)
+    bytecode_dir = app.config.get("JINJA_BYTECODE_CACHE_DIR")
+    if bytecode_dir:
+        os.makedirs(bytecode_dir, exist_ok=True)
+        app.jinja_options = {**app.jinja_options,
+                             "bytecode_cache": FileSystemBytecodeCache(str(bytecode_dir))}
+    # dopo la config: Flask-Limiter legge storage e strategia in init_app
+    limiter.init_app(app)
+    bus.init_app(app)
+    page_cache.init_app(app, bus)
+    compress.init_app(app)
+    like_buffer.init_app(app)
+    neardup.init_app(app)
+    trending.init_app(app)
+    from . import assets
+    assets.init_app(app)
+
+    
+    db.init_app(app)
+    _init_migrate(app)
+    if app.config.get("BACKUP_INTERVAL_MINUTES") and not _in_cli():
+        from . import backup
+        backup.start_scheduler(app)
+
+    from . import querybudget
+    querybudget.install()
+   
+    
+
+    
+    from .routes import bp as main_bp
+    app.register_blueprint(main_bp)
+
+    
+    @app.cli.command("init-db")
+    def init_db():
+        from . import models  
+        with app.app_context():
+            db.create_all()
+            print("Database creato in instance/social.db")
+
+    # CLI
+    @app.cli.command("seed")
+    def seed():
+        from . import courses, skills
+        from .models import Student, Post
+        course = courses.ensure("Python Base")
+        s = Student(nome="Mario Rossi", email="mario@example.com", corso=course.nome,
+                    course_id=course.id, programmi="php, react, angular")
+        db.session.add(s)
+        db.session.flush()
+        p = Post(author_id=s.id, course_id=course.id, content="Ciao a tutti, primo post sul social!")
+        db.session.add(p)
+        skills.set_for(s)
+        db.session.commit()
+        print("Dati di seed inseriti.")
+
+    @app.cli.group("media")
+    def media_cli():
+        """Gestione dei file caricati."""
+
+    @media_cli.command("gc")
+    @click.option("--dry-run", is_flag=True, help="Elenca i file senza eliminarli.")
+    def media_gc(dry_run):
+        """Elimina da UPLOAD_FOLDER i file non più usati da post o profili."""
+        from .media import collect_orphans
+        orphans = collect_orphans(app.config["MEDIA_ORPHAN_GRACE_SECONDS"])
+        for f in orphans:
+            print(f"{'(dry-run) ' if dry_run else ''}rimuovo {f.name}")
+            if not dry_run:
+                f.unlink(missing_ok=True)
+        print(f"{len(orphans)} file orfani.")
+
+    @media_cli.command("videos")
+    @click.option("--retry-failed", is_flag=True, help="Riprova anche i video già falliti.")
+    def media_videos(retry_failed):
+        """Crea poster e versione per lo streaming dei video non ancora elaborati."""
+        from sqlalchemy import or_, select
+        from .models import Post
+        from .video import ffmpeg_binary, process_now
+        if not ffmpeg_binary(app):
+            raise click.ClickException("ffmpeg non trovato: imposta FFMPEG_BINARY.")
+        status = Post.video_status.is_(None)
+        if retry_failed:
+            status = or_(status, Post.video_status == "failed")
+        todo = db.session.execute(
+            select(Post.id, Post.video_url)
+            .where(Post.video_url.like("uploads/%"), status)
+            .order_by(Post.id)
+        ).all()
+        for post_id, video_url in todo:
+            result = process_now(app, post_id, video_url)
+            print(f"post {post_id}: stream={result['stream']} poster={result['poster']}")
+        print(f"{len(todo)} video elaborati.")
+
+    @app.cli.group("archive")
+    def archive_cli():
+        """Archivio dei post vecchi."""
+
+    @archive_cli.command("run")
+    @click.option("--days", type=int, default=None, help="Età minima dei post (default ARCHIVE_AFTER_DAYS).")
+    @click.option("--dry-run", is_flag=True, help="Conta i post da archiviare senza spostarli.")
+    def archive_run(days, dry_run):
+        """Sposta nelle tabelle *_archive i post più vecchi, con like, commenti e segnalazioni."""
+        from datetime import datetime, timedelta
+        from .archive import archive_older_than, count_archivable
+        days = app.config["ARCHIVE_AFTER_DAYS"] if days is None else days
+        if dry_run:
+            cutoff = datetime.utcnow() - timedelta(days=days)
+            print(f"{count_archivable(cutoff)} post più vecchi di {days} giorni da archiviare.")
+            return
+        totals = archive_older_than(days, app.config["ARCHIVE_CHUNK_SIZE"])
+        print(", ".join(f"{n} {kind}" for kind, n in totals.items()) + " archiviati.")
+
+    @app.cli.group("stats")
+    def stats_cli():
+        """Statistiche per studente (student_stats)."""
+
+    @stats_cli.command("rebuild")
+    @click.option("--student", "student_id", type=int, default=None, help="Solo questo studente.")
+    def stats_rebuild(student_id):
+        """Ricalcola da zero post, like e commenti ricevuti."""
+        from .stats import rebuild
+        rows = rebuild(student_id)
+        db.session.commit()
+        print(f"Statistiche ricalcolate per {rows} studenti.")
+
+    @app.cli.group("skills")
+    def skills_cli():
+        """Competenze degli studenti (skills, student_skills)."""
+
+    @skills_cli.command("rebuild")
+    def skills_rebuild():
+        """Ricalcola competenze e contatori da Student.programmi."""
+        from .skills import rebuild
+        total = rebuild()
+        db.session.commit()
+        print(f"Competenze ricalcolate per {total} studenti.")
+
+    @app.cli.group("likes")
+    def likes_cli():
+        """Like in write-behind (LIKE_BUFFER_ENABLED)."""
+
+    @likes_cli.command("flush")
+    def likes_flush():
+        """Applica subito al database i like ancora nel buffer."""
+        print(f"{like_buffer.flush()} like applicati dal buffer.")
+
+    @app.cli.group("trending")
+    def trending_cli():
+        """Termini di tendenza (app/trending.py)."""
+
+    @trending_cli.command("backfill")
+    def trending_backfill():
+        """Ricalcola i contatori dai post e commenti visibili (storico giornaliero)."""
+        print(f"{trending.backfill()} contenuti contati.")
+
+    @app.cli.group("static")
+    def static_cli():
+        """File statici."""
+
+    @static_cli.command("build")
+    @click.option("--clean", is_flag=True, help="Rimuove prima i file generati dai build precedenti.")
+    def static_build(clean):
+        """Copia i file statici con hash nel nome e varianti .br/.gz (da lanciare al deploy)."""
+        from .assets import build
+        manifest = build(app, clean=clean)
+        print(f"{len(manifest)} file in {app.static_folder}/{app.config['STATIC_DIST_DIR']}")
+
+    @app.cli.group("templates")
+    def templates_cli():
+        """Template Jinja."""
+
+    @templates_cli.command("compile")
+    @click.option("--clear", is_flag=True, help="Svuota prima la bytecode cache.")
+    def templates_compile(clear):
+        """Precompila tutti i template nella bytecode cache (da lanciare al deploy)."""
+        cache = app.jinja_env.bytecode_cache
+        if cache is None:
+            raise click.ClickException("JINJA_BYTECODE_CACHE_DIR non configurata.")
+        if clear:
+            cache.clear()
+        names = app.jinja_env.list_templates(extensions=["html"])
+        for name in names:
+            app.jinja_env.get_template(name)
+        print(f"{len(names)} template compilati in {app.config['JINJA_BYTECODE_CACHE_DIR']}")
+
+    @app.cli.command("export")
+    @click.argument("tables", nargs=-1)
+    @click.option("--format", "fmt", type=click.Choice(["parquet", "arrow"]), default="parquet")
+    @click.option("--out", "out_dir", type=click.Path(file_okay=False), default=None,
+                  help="Cartella di destinazione (default EXPORT_DIR).")
+    @click.option("--since", type=click.DateTime(), default=None,
+                  help="Solo righe con created_at da questa data.")
+    @click.option("--full", is_flag=True, help="Ignora il watermark e riesporta tutto.")
+    def export_cmd(tables, fmt, out_dir, since, full):
+        """Esporta students, posts, likes, comments, reports in Parquet/Arrow (incrementale)."""
+        from .export import TABLES, ExportError, export_table
+        unknown = set(tables) - set(TABLES)
+        if unknown:
+            raise click.BadParameter(f"tabelle sconosciute: {', '.join(sorted(unknown))}")
+        out_dir = out_dir or app.config["EXPORT_DIR"]
+        for table in tables or TABLES:
+            try:
+                result = export_table(table, out_dir, fmt, since=since, full=full,
+                                      chunk_size=app.config["EXPORT_CHUNK_SIZE"])
+            except ExportError as e:
+                raise click.ClickException(str(e))
+            where = result["path"] or "nessuna riga nuova"
+            print(f"{table}: {result['rows']} righe -> {where}")
+
+    # profilo dettagliato: python benchmarks/bench_startup.py
+    app.logger.debug("create_app in %.1f ms", (time.perf_counter() - started) * 1000)
+    return app
+
@@ -0,0 +1,299 @@
+# app/aio.py
+"""
+Modalità di servizio ASGI (opzionale):  uvicorn asgi:app
+
+Gli endpoint I/O-bound sono serviti in modo nativamente asincrono e,
+mentre aspettano rete o disco, non tengono occupato un thread:
+- GET /events/stream            SSE: un solo task per processo legge la
+                                tabella eventi (aiosqlite) e smista alle code
+- PUT /api/uploads/<filename>   upload in streaming su disco (aiofiles)
+- GET /api/posts/<id>/like      stato like letto con aiosqlite (con
+                                LIKE_BUFFER_ENABLED anche i toggle ancora
+                                in like_buffer.db, come fa l'app Flask)
+Tutto il resto passa all'app Flask (WSGI) tramite asgiref.
+
+Dipendenze extra: asgiref, aiosqlite, aiofiles, uvicorn.
+"""
+import asyncio
+import json
+import logging
+import re
+import sqlite3
+from http.cookies import SimpleCookie
+from pathlib import Path
+from uuid import uuid4
+
+import aiofiles
+import aiofiles.os
+import aiosqlite
+from asgiref.wsgi import WsgiToAsgi
+from itsdangerous import BadSignature
+from sqlalchemy.engine import make_url
+
+from .events import _SCHEMA as EVENTS_SCHEMA, Subscriber, format_sse
+from .likebuffer import _SCHEMA as LIKE_BUFFER_SCHEMA
+
+log = logging.getLogger(__name__)
+
+
+class AsyncSubscriber(Subscriber):
+    def __init__(self, maxsize: int, admin: bool = False):
+        self.queue = asyncio.Queue(maxsize)
+        self.admin = admin
+        self.dropped = 0
+
+    def offer(self, event: dict):
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except asyncio.QueueFull:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except asyncio.QueueEmpty:
+                    pass
+
+
+async def _send_json(send, data: dict, status: int = 200):
+    body = json.dumps(data).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AsyncApp:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+
+        cfg = flask_app.config
+        if cfg.get("EVENTS_LIVE") is None:
+            cfg["EVENTS_LIVE"] = True  # qui gli stream SSE non occupano un worker
+        self.db_path = make_url(cfg["SQLALCHEMY_DATABASE_URI"]).database
+        self.events_path = str(cfg["EVENTS_DB_PATH"])
+        self.upload_dir = Path(cfg["UPLOAD_FOLDER"])
+        self.max_upload = cfg["MAX_CONTENT_LENGTH"]
+        self.heartbeat = cfg.get("EVENTS_HEARTBEAT_SECONDS", 15)
+        self.poll_interval = cfg.get("EVENTS_POLL_INTERVAL", 0.5)
+        self.queue_size = cfg.get("EVENTS_QUEUE_SIZE", 100)
+        self.like_buffer_path = (str(cfg["LIKE_BUFFER_DB_PATH"])
+                                 if cfg.get("LIKE_BUFFER_ENABLED") else None)
+
+        self._db = None
+        self._buffer_db = None
+        self._subscribers = set()
+        self._tail = None
+
+        self.routes = [
+            ("GET", re.compile(r"^/events/stream$"), self.event_stream),
+            ("PUT", re.compile(r"^/api/uploads/(?P<filename>[^/]+)$"), self.upload),
+            ("GET", re.compile(r"^/api/posts/(?P<post_id>\d+)/like$"), self.like_status),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] == "http":
+            for method, pattern, handler in self.routes:
+                m = pattern.match(scope["path"])
+                if m and scope["method"] == method:
+                    return await handler(scope, receive, send, **m.groupdict())
+        return await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for conn in (self._db, self._buffer_db):
+                    if conn is not None:
+                        await conn.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # --- helpers ---
+    async def _conn(self) -> aiosqlite.Connection:
+        # una connessione per processo: aiosqlite serializza le query sul suo thread
+        if self._db is None:
+            self._db = await aiosqlite.connect(self.db_path)
+        return self._db
+
+    async def _buffer_conn(self) -> aiosqlite.Connection:
+        if self._buffer_db is None:
+            self._buffer_db = await aiosqlite.connect(self.like_buffer_path)
+            await self._buffer_db.execute("PRAGMA journal_mode=WAL")
+            await self._buffer_db.executescript(LIKE_BUFFER_SCHEMA)
+        return self._buffer_db
+
+    def _session(self, scope) -> dict:
+        raw = dict(scope.get("headers") or []).get(b"cookie")
+        if not raw:
+            return {}
+        cookie = SimpleCookie(raw.decode("latin-1"))
+        name = self.flask_app.config["SESSION_COOKIE_NAME"]
+        if name not in cookie:
+            return {}
+        serializer = self.flask_app.session_interface.get_signing_serializer(self.flask_app)
+        max_age = int(self.flask_app.permanent_session_lifetime.total_seconds())
+        try:
+            return serializer.loads(cookie[name].value, max_age=max_age)
+        except BadSignature:
+            return {}
+
+    async def _is_admin(self, user_id) -> bool:
+        if not user_id:
+            return False
+        db = await self._conn()
+        async with db.execute("SELECT email FROM students WHERE id = ?", (user_id,)) as cur:
+            row = await cur.fetchone()
+        admins = [e.lower() for e in self.flask_app.config.get("ADMIN_EMAILS", [])]
+        return bool(row and row[0] and row[0].lower() in admins)
+
+    # --- SSE ---
+    async def _tail_events(self):
+        async with aiosqlite.connect(self.events_path) as db:
+            await db.executescript(EVENTS_SCHEMA)
+            async with db.execute("SELECT COALESCE(MAX(id), 0) FROM events") as cur:
+                (last_id,) = await cur.fetchone()
+            # parte col primo subscriber e resta attivo per tutta la vita del processo
+            while True:
+                try:
+                    async with db.execute(
+                        "SELECT id, type, audience, data FROM events WHERE id > ? ORDER BY id",
+                        (last_id,),
+                    ) as cur:
+                        rows = await cur.fetchall()
+                except sqlite3.Error:
+                    # es. "database is locked" durante il checkpoint di events.py:
+                    # si riprova al giro dopo, gli stream aperti non restano muti
+                    log.exception("Lettura degli eventi fallita")
+                    rows = []
+                for event_id, type, audience, data in rows:
+                    last_id = event_id
+                    event = {"type": type, "data": json.loads(data), "audience": audience}
+                    for sub in list(self._subscribers):
+                        if sub.wants(event):
+                            sub.offer(event)
+                await asyncio.sleep(self.poll_interval)
+
+    async def event_stream(self, scope, receive, send):
+        admin = await self._is_admin(self._session(scope).get("user_id"))
+        sub = AsyncSubscriber(self.queue_size, admin=admin)
+        self._subscribers.add(sub)
+        if self._tail is None or self._tail.done():
+            self._tail = asyncio.create_task(self._tail_events())
+
+        async def wait_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        disconnected = asyncio.create_task(wait_disconnect())
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/event-stream"),
+                            (b"cache-control", b"no-cache"),
+                            (b"x-accel-buffering", b"no")],
+            })
+            await send({"type": "http.response.body",
+                        "body": f"retry: {int(self.heartbeat * 1000)}\n\n".encode(),
+                        "more_body": True})
+            while True:
+                get = asyncio.ensure_future(sub.queue.get())
+                done, _ = await asyncio.wait({get, disconnected}, timeout=self.heartbeat,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if disconnected in done:
+                    get.cancel()
+                    return
+                if get in done:
+                    chunk = format_sse(get.result())
+                else:
+                    get.cancel()
+                    chunk = ": ping\n\n"
+                await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+        finally:
+            disconnected.cancel()
+            self._subscribers.discard(sub)
+
+    # --- upload in streaming ---
+    async def upload(self, scope, receive, send, filename: str):
+        if not self._session(scope).get("user_id"):
+            return await _send_json(send, {"error": "not authenticated"}, 401)
+
+        cfg = self.flask_app.config
+        ext = filename.rsplit(".", 1)[1].lower() if "." in filename else ""
+        if ext in cfg["ALLOWED_IMAGE_EXTENSIONS"]:
+            kind = "image"
+        elif ext in cfg["ALLOWED_VIDEO_EXTENSIONS"]:
+            kind = "video"
+        else:
+            return await _send_json(send, {"error": "unsupported file type"}, 415)
+
+        declared = dict(scope.get("headers") or []).get(b"content-length")
+        if declared and not declared.isdigit():
+            return await _send_json(send, {"error": "invalid content-length"}, 400)
+        if declared and int(declared) > self.max_upload:
+            return await _send_json(send, {"error": "file too large"}, 413)
+
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        fname = f"{uuid4().hex}.{ext}"
+        path = self.upload_dir / fname
+        size = 0
+        async with aiofiles.open(path, "wb") as f:
+            more = True
+            while more:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    break
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                if size > self.max_upload:
+                    break
+                await f.write(chunk)
+                more = message.get("more_body", False)
+        if more:
+            # client disconnesso o file oltre il limite
+            await aiofiles.os.remove(path)
+            return await _send_json(send, {"error": "file too large"}, 413)
+        return await _send_json(send, {"url": f"uploads/{fname}", "kind": kind, "size": size}, 201)
+
+    # --- letture con aiosqlite ---
+    async def like_status(self, scope, receive, send, post_id: str):
+        post_id = int(post_id)
+        uid = self._session(scope).get("user_id")
+        db = await self._conn()
+        async with db.execute("SELECT 1 FROM posts WHERE id = ?", (post_id,)) as cur:
+            if await cur.fetchone() is None:
+                return await _send_json(send, {"error": "not found"}, 404)
+        async with db.execute("SELECT COUNT(*) FROM likes WHERE post_id = ?", (post_id,)) as cur:
+            (count,) = await cur.fetchone()
+        liked_by_me = False
+        if uid:
+            async with db.execute(
+                "SELECT 1 FROM likes WHERE post_id = ? AND user_id = ?", (post_id, uid)
+            ) as cur:
+                liked_by_me = await cur.fetchone() is not None
+        if self.like_buffer_path:
+            # toggle non ancora applicati a social.db (app/likebuffer.py)
+            buf = await self._buffer_conn()
+            async with buf.execute(
+                "SELECT COALESCE(SUM(liked - base), 0) FROM pending_likes WHERE post_id = ?", (post_id,)
+            ) as cur:
+                (delta,) = await cur.fetchone()
+            count += delta
+            if uid:
+                async with buf.execute(
+                    "SELECT liked FROM pending_likes WHERE user_id = ? AND post_id = ?", (uid, post_id)
+                ) as cur:
+                    row = await cur.fetchone()
+                if row is not None:
+                    liked_by_me = bool(row[0])
+        return await _send_json(send, {"post_id": post_id, "likes_count": count,
+                                       "liked_by_me": liked_by_me})
@@ -0,0 +1,77 @@
+# app/archive.py
+"""
+Archivio freddo: i post più vecchi di ARCHIVE_AFTER_DAYS passano, con
+like, commenti e segnalazioni, nelle tabelle *_archive.
+
+- feed, bacheca e coda di moderazione lavorano solo sulle tabelle calde,
+  che restano della stessa dimensione semestre dopo semestre
+- spostamento a blocchi di ARCHIVE_CHUNK_SIZE post, una transazione per
+  blocco: INSERT ... SELECT nelle tabelle d'archivio, poi DELETE del post
+  (like, commenti e segnalazioni li elimina il DB con ON DELETE CASCADE)
+- gli id restano gli stessi (le tabelle calde sono AUTOINCREMENT, un id
+  archiviato non torna mai in uso): /post/<id> trova il post ovunque sia
+- i post in attesa di moderazione restano dove sono
+- i contenuti archiviati sono in sola lettura; student_stats non cambia
+
+`flask archive run [--days N] [--dry-run]`.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, or_, select
+
+from . import db
+from .models import (Post, Like, Comment, Report,
+                     ArchivedPost, ArchivedLike, ArchivedComment, ArchivedReport)
+
+
+def _copy(hot, cold, where):
+    """INSERT INTO cold (colonne comuni) SELECT ... FROM hot WHERE ..."""
+    names = [c.name for c in cold.__table__.c if c.name in hot.__table__.c]
+    src = select(*(hot.__table__.c[n] for n in names)).where(where)
+    return db.session.execute(insert(cold).from_select(names, src)).rowcount
+
+
+def _candidates(cutoff: datetime):
+    return (
+        select(Post.id)
+        .where(Post.created_at < cutoff,
+               or_(Post.moderation_status.is_(None), Post.moderation_status != "pending"))
+        .order_by(Post.created_at, Post.id)
+    )
+
+
+def count_archivable(cutoff: datetime) -> int:
+    return db.session.query(_candidates(cutoff).subquery()).count()
+
+
+def archive_chunk(post_ids: list[int]) -> dict:
+    """Sposta i post indicati e tutto ciò che dipende da loro (senza commit)."""
+    comment_ids = select(Comment.id).where(Comment.post_id.in_(post_ids))
+    moved = {
+        "posts": _copy(Post, ArchivedPost, Post.id.in_(post_ids)),
+        "comments": _copy(Comment, ArchivedComment, Comment.post_id.in_(post_ids)),
+        "likes": _copy(Like, ArchivedLike, Like.post_id.in_(post_ids)),
+        "reports": _copy(Report, ArchivedReport,
+                         or_(Report.post_id.in_(post_ids), Report.comment_id.in_(comment_ids))),
+    }
+    db.session.execute(
+        delete(Post).where(Post.id.in_(post_ids)).execution_options(synchronize_session=False)
+    )
+    return moved
+
+
+def archive_older_than(days: int, chunk_size: int = 500) -> dict:
+    """Archivia a blocchi, un commit per blocco; restituisce i totali spostati."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    totals = {"posts": 0, "comments": 0, "likes": 0, "reports": 0}
+    while True:
+        ids = db.session.execute(_candidates(cutoff).limit(chunk_size)).scalars().all()
+        if not ids:
+            return totals
+        try:
+            for key, n in archive_chunk(ids).items():
+                totals[key] += n
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
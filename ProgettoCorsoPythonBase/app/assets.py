@@ -0,0 +1,124 @@
+# app/assets.py
+"""
+File statici con nome "fingerprint" e varianti precompresse.
+
+`flask static build` (al deploy) copia i file di app/static in
+app/static/dist/ aggiungendo al nome un hash del contenuto
+(css/social.css -> dist/css/social.3f2a9c1b7e04.css), scrive accanto le
+versioni .br/.gz dei file testuali e un manifest.json.
+
+- nei template: {{ asset_url('css/social.css') }} restituisce il nome con
+  hash se il manifest esiste, altrimenti il file originale
+- la vista static serve i file di dist/ con cache immutabile di un anno
+  e, se il client li accetta, i byte già compressi (.br, poi .gz)
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+from pathlib import Path
+
+from flask import current_app, request, send_from_directory, url_for
+from werkzeug.security import safe_join
+
+from .compression import brotli
+from .media import _UPLOAD_NAME
+
+_ONE_YEAR = 365 * 24 * 3600
+_PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _dist_name(app) -> str:
+    return app.config.get("STATIC_DIST_DIR", "dist")
+
+
+def _manifest(app) -> dict:
+    # letto una volta per processo: il build avviene prima di avviare i worker
+    if "asset_manifest" not in app.extensions:
+        path = Path(app.static_folder) / _dist_name(app) / "manifest.json"
+        try:
+            app.extensions["asset_manifest"] = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            app.extensions["asset_manifest"] = {}
+    return app.extensions["asset_manifest"]
+
+
+def asset_url(filename: str) -> str:
+    """URL del file statico, nella versione con hash se disponibile."""
+    return url_for("static", filename=_manifest(current_app).get(filename, filename))
+
+
+def _compressible(path: Path, mimetypes_allowed) -> bool:
+    mimetype, _ = mimetypes.guess_type(path.name)
+    return mimetype in mimetypes_allowed
+
+
+def build(app, clean: bool = False) -> dict:
+    """Genera dist/ e il manifest; restituisce il manifest."""
+    static_dir = Path(app.static_folder)
+    dist = static_dir / _dist_name(app)
+    if clean and dist.exists():
+        shutil.rmtree(dist)
+    dist.mkdir(parents=True, exist_ok=True)
+
+    allowed = set(app.config.get("COMPRESS_MIMETYPES", ()))
+    min_size = app.config.get("COMPRESS_MIN_SIZE", 1024)
+    manifest = {}
+    for src in sorted(static_dir.rglob("*")):
+        rel = src.relative_to(static_dir)
+        # gli upload degli utenti cambiano di continuo: restano fuori dal build
+        if (not src.is_file() or rel.parts[0] == dist.name
+                or src.name.startswith(".") or _UPLOAD_NAME.match(src.name)):
+            continue
+
+        data = src.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        target = dist / rel.parent / f"{src.stem}.{digest}{src.suffix}"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if not target.exists():
+            target.write_bytes(data)
+            if len(data) >= min_size and _compressible(src, allowed):
+                variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+                if brotli is not None:
+                    variants[".br"] = brotli.compress(data, quality=11)
+                for ext, compressed in variants.items():
+                    if len(compressed) < len(data):
+                        target.with_name(target.name + ext).write_bytes(compressed)
+        manifest[rel.as_posix()] = target.relative_to(static_dir).as_posix()
+
+    (dist / "manifest.json").write_text(json.dumps(manifest, indent=2, sort_keys=True),
+                                        encoding="utf-8")
+    app.extensions.pop("asset_manifest", None)
+    return manifest
+
+
+def serve_static(filename: str):
+    """Vista `static`: dist/ con cache immutabile e varianti precompresse."""
+    app = current_app
+    if not filename.startswith(_dist_name(app) + "/"):
+        return app.send_static_file(filename)
+
+    folder = Path(app.static_folder)
+    response = None
+    for encoding, ext in _PRECOMPRESSED:
+        # per servire i .br già pronti non serve il pacchetto brotli
+        path = safe_join(str(folder), filename + ext)
+        if request.accept_encodings[encoding] and path and os.path.isfile(path):
+            mimetype, _ = mimetypes.guess_type(filename)
+            response = send_from_directory(folder, filename + ext, mimetype=mimetype,
+                                           max_age=_ONE_YEAR)
+            response.headers["Content-Encoding"] = encoding
+            break
+    if response is None:
+        response = send_from_directory(folder, filename, max_age=_ONE_YEAR)
+    response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    app.view_functions["static"] = serve_static
+    app.add_template_global(asset_url)
@@ -0,0 +1,241 @@
+# app/backup.py
+"""
+Backup a caldo del database SQLite, senza fermare l'app.
+
+- metodo "step" (default): API di backup di sqlite3, BACKUP_PAGES_PER_STEP
+  pagine per volta con una pausa tra un passo e l'altro; il lock in
+  lettura dura un solo passo, quindi chi scrive aspetta al massimo pochi ms.
+  Se durante la copia un'altra connessione scrive, SQLite ricomincia da
+  capo: dopo BACKUP_MAX_RESTARTS ripartenze si passa a "vacuum"
+- metodo "vacuum": VACUUM INTO, una sola transazione di lettura (file
+  compatto, ma blocca chi scrive per tutta la copia se il DB non è in WAL)
+
+Ogni copia nasce come .partial, passa PRAGMA integrity_check e solo allora
+prende il nome definitivo (social-20261019-031500.db). Accanto, un .json
+con la revisione Alembic contenuta nella copia, dimensione, sha256 e
+durata. Restano le ultime BACKUP_KEEP copie.
+
+`flask db backup` lo lancia a mano; con BACKUP_INTERVAL_MINUTES > 0 un
+thread in background lo ripete (un solo processo per volta, grazie a un
+file di lock in BACKUP_DIR).
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+_LOCK_NAME = ".backup.lock"
+_LOCK_STALE_SECONDS = 3600
+
+
+class BackupError(RuntimeError):
+    pass
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def database_path(app) -> Path:
+    from . import db
+    with app.app_context():
+        url = db.engine.url
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        raise BackupError(f"backup possibile solo per un database SQLite su file, non {url!r}")
+    return Path(url.database)
+
+
+def _step_copy(src: sqlite3.Connection, dst: sqlite3.Connection, pages: int, pause: float,
+               max_restarts: int) -> int:
+    """Copia a passi; restituisce quante volte SQLite è ripartito da capo."""
+    state = {"remaining": None, "restarts": 0}
+
+    def progress(status, remaining, total):
+        # remaining che risale = un'altra connessione ha scritto e la copia riparte
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > max_restarts:
+                raise _TooManyRestarts(state["restarts"])
+        state["remaining"] = remaining
+        if remaining and pause:
+            time.sleep(pause)  # lascia passare chi deve scrivere
+
+    src.backup(dst, pages=pages, progress=progress)
+    return state["restarts"]
+
+
+def _check(path: Path) -> str | None:
+    """Verifica la copia; restituisce la revisione Alembic che contiene."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        result = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+        if result != ["ok"]:
+            raise BackupError(f"integrity_check fallito: {'; '.join(result[:5])}")
+        try:
+            row = conn.execute("SELECT version_num FROM alembic_version").fetchone()
+        except sqlite3.OperationalError:  # DB creato con `flask init-db`, senza Alembic
+            row = None
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_backups(dest_dir: Path) -> list[dict]:
+    """Metadati delle copie presenti, dalla più recente."""
+    items = []
+    for meta in Path(dest_dir).glob("*.json"):
+        try:
+            info = json.loads(meta.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if (meta.parent / info.get("file", "")).is_file():
+            items.append(info)
+    return sorted(items, key=lambda i: i["created_at"], reverse=True)
+
+
+def prune(dest_dir: Path, keep: int) -> list[str]:
+    removed = []
+    for info in list_backups(dest_dir)[keep:]:
+        path = Path(dest_dir) / info["file"]
+        path.unlink(missing_ok=True)
+        path.with_suffix(".json").unlink(missing_ok=True)
+        removed.append(info["file"])
+    return removed
+
+
+def create_backup(app, method: str | None = None, dest_dir: Path | None = None) -> dict:
+    """Copia, verifica e registra un backup; applica la retention. Restituisce i metadati."""
+    cfg = app.config
+    src_path = database_path(app)
+    dest_dir = Path(dest_dir or cfg["BACKUP_DIR"])
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    method = method or cfg.get("BACKUP_METHOD", "step")
+
+    stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    final = dest_dir / f"{src_path.stem}-{stamp}.db"
+    n = 1
+    while final.exists():  # due backup nello stesso secondo
+        final = dest_dir / f"{src_path.stem}-{stamp}-{n}.db"
+        n += 1
+    partial = final.with_name(final.name + ".partial")
+    partial.unlink(missing_ok=True)
+
+    started = time.perf_counter()
+    restarts = 0
+    src = sqlite3.connect(src_path, timeout=30)
+    try:
+        if method == "step":
+            dst = sqlite3.connect(partial)
+            try:
+                restarts = _step_copy(src, dst, cfg.get("BACKUP_PAGES_PER_STEP", 256),
+                                      cfg.get("BACKUP_STEP_PAUSE_SECONDS", 0.005),
+                                      cfg.get("BACKUP_MAX_RESTARTS", 5))
+            except _TooManyRestarts as e:
+                restarts = e.args[0]
+                log.warning("Backup a passi ripartito troppe volte: uso VACUUM INTO")
+                method = "vacuum"
+            finally:
+                dst.close()
+        if method == "vacuum":
+            partial.unlink(missing_ok=True)
+            src.execute("VACUUM INTO ?", (str(partial),))
+        elif method != "step":
+            raise BackupError(f"metodo di backup sconosciuto: {method}")
+    finally:
+        src.close()
+
+    try:
+        revision = _check(partial)
+    except (BackupError, sqlite3.DatabaseError):
+        partial.unlink(missing_ok=True)
+        raise
+    os.replace(partial, final)
+
+    info = {
+        "file": final.name,
+        "created_at": datetime.utcnow().isoformat(),
+        "source": str(src_path),
+        "alembic_revision": revision,
+        "method": method,
+        "restarts": restarts,
+        "size": final.stat().st_size,
+        "sha256": _sha256(final),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    final.with_suffix(".json").write_text(json.dumps(info, indent=2), encoding="utf-8")
+    info["pruned"] = prune(dest_dir, cfg.get("BACKUP_KEEP", 14))
+    return info
+
+
+# --- backup periodico in background ---
+def _acquire_lock(dest_dir: Path) -> bool:
+    lock = dest_dir / _LOCK_NAME
+    try:
+        if time.time() - lock.stat().st_mtime > _LOCK_STALE_SECONDS:
+            lock.unlink(missing_ok=True)  # lasciato da un processo morto a metà backup
+    except FileNotFoundError:
+        pass
+    try:
+        os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        return False
+
+
+def _due(dest_dir: Path, interval: float) -> bool:
+    latest = list_backups(dest_dir)[:1]
+    if not latest:
+        return True
+    last = datetime.fromisoformat(latest[0]["created_at"])
+    return (datetime.utcnow() - last).total_seconds() >= interval
+
+
+def run_scheduled(app) -> dict | None:
+    """Un backup se l'ultimo è più vecchio dell'intervallo e nessun altro processo lo sta facendo."""
+    dest_dir = Path(app.config["BACKUP_DIR"])
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    interval = app.config["BACKUP_INTERVAL_MINUTES"] * 60
+    if not _due(dest_dir, interval) or not _acquire_lock(dest_dir):
+        return None
+    try:
+        # ricontrollo col lock in mano: un altro worker potrebbe aver appena finito
+        return create_backup(app) if _due(dest_dir, interval) else None
+    finally:
+        (dest_dir / _LOCK_NAME).unlink(missing_ok=True)
+
+
+def start_scheduler(app):
+    interval = app.config.get("BACKUP_INTERVAL_MINUTES", 0)
+    if not interval or app.extensions.get("backup_scheduler"):
+        return
+
+    def loop():
+        while True:
+            try:
+                info = run_scheduled(app)
+                if info:
+                    log.info("Backup %s (%s ms, revisione %s)", info["file"],
+                             info["duration_ms"], info["alembic_revision"])
+            except Exception:
+                log.exception("Backup periodico fallito")
+            # controlla spesso, ma il backup parte solo quando è dovuto
+            time.sleep(min(interval * 60, 300))
+
+    thread = threading.Thread(target=loop, name="db-backup", daemon=True)
+    thread.start()
+    app.extensions["backup_scheduler"] = thread
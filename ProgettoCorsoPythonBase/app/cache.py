@@ -0,0 +1,130 @@
+# app/cache.py
+"""
+Cache in-process delle pagine di feed già renderizzate.
+
+- TTL breve (FEED_CACHE_SECONDS, 0 = disattivata)
+- invalidazione automatica: un hook sulla Session segna la transazione se
+  tocca post, commenti, like o studenti (flush ORM o UPDATE/DELETE
+  set-based) e al commit svuota le chiavi "feed:"
+- feed dei corsi (chiavi "feed:course:<id>:"): una scrittura su post,
+  commenti o like svuota solo il feed pubblico e quello del corso del post;
+  studenti modificati e UPDATE/DELETE set-based svuotano tutto
+- tra worker: l'invalidazione viaggia sul bus eventi con audience
+  "internal", che non viene mai inoltrata ai client SSE
+"""
+import threading
+import time
+from itertools import chain
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+FEED_TABLES = frozenset({"posts", "comments", "likes", "students"})
+_INVALIDATE = "cache_invalidate"
+
+
+class PageCache:
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._installed = False
+        self.ttl = 0
+        self.bus = None
+
+    def init_app(self, app, bus):
+        self.ttl = app.config.get("FEED_CACHE_SECONDS", 0)
+        self.bus = bus
+        bus.on(_INVALIDATE, lambda data: self._drop(data.get("prefix", "")))
+        app.extensions["page_cache"] = self
+        if not self._installed:
+            event.listen(Session, "after_flush", self._after_flush)
+            event.listen(Session, "do_orm_execute", self._do_orm_execute)
+            event.listen(Session, "after_commit", self._after_commit)
+            event.listen(Session, "after_rollback", self._after_rollback)
+            self._installed = True
+
+    # --- API ---
+    def get_or_render(self, key: str, render):
+        """Pagina in cache o render(); non salva se nel frattempo c'è stata un'invalidazione."""
+        if not self.ttl:
+            return render()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            generation = self._generation
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        value = render()
+        # le invalidazioni degli altri worker arrivano dal poller del bus
+        self.bus.ensure_poller()
+        with self._lock:
+            if self._generation == generation:
+                self._data[key] = (now + self.ttl, value)
+        return value
+
+    def invalidate(self, prefix: str = ""):
+        if self.ttl:
+            self.bus.publish(_INVALIDATE, {"prefix": prefix}, audience="internal")
+
+    def _drop(self, prefix: str):
+        with self._lock:
+            self._generation += 1
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def touch_posts(self, session, post_ids):
+        """Segna la transazione come scrittura sui post indicati (per chi scrive
+        senza ORM, es. il flush del buffer dei like)."""
+        from .models import Post
+
+        post_ids = set(post_ids)
+        if not post_ids:
+            return
+        info = session.info
+        info["feed_dirty"] = True
+        rows = session.connection().execute(select(Post.course_id).where(Post.id.in_(post_ids)))
+        info.setdefault("feed_courses", set()).update(c for c in rows.scalars() if c is not None)
+
+    # --- hook sulla Session ---
+    def _after_flush(self, session, flush_context):
+        info = session.info
+        post_ids = set()
+        for obj in chain(session.new, session.dirty, session.deleted):
+            table = getattr(obj, "__tablename__", None)
+            if table not in FEED_TABLES:
+                continue
+            info["feed_dirty"] = True
+            if table == "students":
+                info["feed_all"] = True  # nomi e avatar compaiono in tutti i feed
+            elif table == "posts":
+                if obj.course_id is not None:
+                    info.setdefault("feed_courses", set()).add(obj.course_id)
+            else:
+                post_ids.add(obj.post_id)
+        if post_ids and not info.get("feed_all"):
+            self.touch_posts(session, post_ids)
+
+    def _do_orm_execute(self, state):
+        if not (state.is_update or state.is_delete) or state.bind_mapper is None:
+            return
+        if state.bind_mapper.local_table.name in FEED_TABLES:
+            state.session.info["feed_dirty"] = True
+            state.session.info["feed_all"] = True
+
+    def _after_commit(self, session):
+        courses = session.info.pop("feed_courses", set())
+        feed_all = session.info.pop("feed_all", False)
+        if not session.info.pop("feed_dirty", False):
+            return
+        if feed_all:
+            self.invalidate("feed:")
+            return
+        self.invalidate("feed:public")
+        for course_id in courses:
+            self.invalidate(f"feed:course:{course_id}:")
+
+    def _after_rollback(self, session):
+        for key in ("feed_dirty", "feed_all", "feed_courses"):
+            session.info.pop(key, None)
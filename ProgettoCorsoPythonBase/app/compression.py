@@ -0,0 +1,96 @@
+# app/compression.py
+"""
+Compressione delle risposte (gzip, brotli se il pacchetto `brotli` è installato).
+
+- solo per i tipi testuali in COMPRESS_MIMETYPES (HTML, JSON, CSS, JS...)
+- risposte normali: compresse se più grandi di COMPRESS_MIN_SIZE
+- risposte in streaming (es. /admin/moderation/pending): compresse a
+  blocchi man mano che il generatore produce dati
+- esclusi SSE (text/event-stream), file statici (send_file) e risposte
+  già codificate: i file di app/static/dist hanno le varianti .br/.gz
+  precompresse (vedi app/assets.py)
+"""
+import gzip
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # opzionale: senza, solo gzip
+    brotli = None
+
+
+def choose_encoding() -> str | None:
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def _compress(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _compress_stream(chunks, encoding: str, level: int):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=level)
+        process, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = formato gzip
+        process, finish = compressor.compress, compressor.flush
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            out = process(chunk)
+            if out:
+                yield out
+        yield finish()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+class Compress:
+    def init_app(self, app):
+        self.mimetypes = set(app.config.get("COMPRESS_MIMETYPES", ()))
+        self.min_size = app.config.get("COMPRESS_MIN_SIZE", 1024)
+        self.gzip_level = app.config.get("COMPRESS_GZIP_LEVEL", 6)
+        self.br_quality = app.config.get("COMPRESS_BR_QUALITY", 5)
+        app.after_request(self.after_request)
+        app.extensions["compress"] = self
+
+    def after_request(self, response):
+        if (
+            response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in self.mimetypes
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding()
+        if encoding is None:
+            return response
+        level = self.br_quality if encoding == "br" else self.gzip_level
+
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, encoding, level)
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            compressed = _compress(data, encoding, level)
+            if len(compressed) >= len(data):
+                return response
+            response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        return response
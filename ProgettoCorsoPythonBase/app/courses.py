@@ -0,0 +1,43 @@
+# app/courses.py
+"""
+Corsi normalizzati (tabella courses) a partire dal testo libero Student.corso.
+
+- "Python Base", "python base " e "Python  base" diventano lo stesso corso
+  (slug "python-base"); il nome mostrato è quello del primo che l'ha scritto
+- lo studente ha course_id, i suoi post lo copiano alla creazione: il feed
+  /corso/<slug>/feed legge solo l'indice (course_id, created_at) di posts
+- le pagine in cache del feed di un corso (chiavi "feed:course:<id>:")
+  vengono invalidate solo dalle scritture su post di quel corso (app/cache.py)
+"""
+import re
+import unicodedata
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from . import db
+from .models import Course
+
+
+def slugify(nome: str) -> str:
+    ascii_name = unicodedata.normalize("NFKD", nome or "").encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "-", ascii_name.lower()).strip("-")
+
+
+def ensure(nome: str) -> Course | None:
+    """Il corso con quel nome (creato se manca); None se il nome è vuoto."""
+    slug = slugify(nome)
+    if not slug:
+        return None
+    course = Course.query.filter_by(slug=slug).first()
+    if course is None:
+        # due registrazioni contemporanee allo stesso corso nuovo: vince la prima
+        db.session.execute(
+            sqlite_insert(Course).values(slug=slug, nome=" ".join(nome.split()))
+            .on_conflict_do_nothing(index_elements=[Course.slug])
+        )
+        course = Course.query.filter_by(slug=slug).one()
+    return course
+
+
+def cache_prefix(course_id: int) -> str:
+    return f"feed:course:{course_id}:"
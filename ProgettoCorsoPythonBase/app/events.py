@@ -0,0 +1,210 @@
+# app/events.py
+"""
+Bus eventi per gli aggiornamenti live (Server-Sent Events).
+
+- in-process: ogni connessione SSE è un Subscriber con una coda limitata;
+  se il client è lento si scartano gli eventi più vecchi (backpressure)
+- tra worker: ogni evento è anche scritto in una tabella SQLite di
+  appoggio (instance/events.db); un thread per processo legge le righe
+  nuove scritte dagli altri worker e le consegna ai propri subscriber
+
+Eventi: post_created, like_count, comment_added, moderation_pending_count.
+Gli eventi con audience "internal" non vanno ai client: li ricevono gli
+handler registrati con on() (es. invalidazione della cache dei feed).
+
+Modalità live (EVENTS_LIVE): stream() è un generatore bloccante, quindi con
+il server WSGI ogni scheda aperta occupa un thread per tutta la sua durata.
+Va attivata solo con worker a thread o gevent; con i worker sync resta
+spenta (niente EventSource nelle pagine, /events/stream risponde 404).
+In modalità ASGI (asgi.py, app/aio.py) gli stream sono asincroni ed è
+attiva di default.
+
+La tabella si svuota degli eventi più vecchi di EVENTS_RETENTION_SECONDS sia
+dal poller sia da publish() (il poller parte solo con subscriber o cache
+attivi), e dopo la pulizia il WAL viene riportato a EVENTS_WAL_LIMIT_BYTES.
+"""
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    origin INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    audience TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_events_created_at ON events (created_at);
+"""
+
+log = logging.getLogger(__name__)
+
+
+def format_sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+class Subscriber:
+    def __init__(self, maxsize: int, admin: bool = False):
+        self.queue = queue.Queue(maxsize)
+        self.admin = admin
+        self.dropped = 0
+
+    def offer(self, event: dict):
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def wants(self, event: dict) -> bool:
+        audience = event.get("audience", "all")
+        return audience == "all" or (audience == "admin" and self.admin)
+
+
+class EventBus:
+    def __init__(self):
+        self._subs = set()
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._poller = None
+        self._poller_pid = None
+        self._last_purge = 0.0
+        self.path = None
+
+    def init_app(self, app):
+        self.path = str(app.config["EVENTS_DB_PATH"])
+        self.queue_size = app.config.get("EVENTS_QUEUE_SIZE", 100)
+        self.max_subscribers = app.config.get("EVENTS_MAX_SUBSCRIBERS", 200)
+        self.heartbeat = app.config.get("EVENTS_HEARTBEAT_SECONDS", 15)
+        self.poll_interval = app.config.get("EVENTS_POLL_INTERVAL", 0.5)
+        self.retention = app.config.get("EVENTS_RETENTION_SECONDS", 300)
+        self.wal_limit = app.config.get("EVENTS_WAL_LIMIT_BYTES", 4 * 1024 * 1024)
+        app.extensions["event_bus"] = self
+
+    # --- storage condiviso ---
+    def _conn(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA journal_size_limit={int(self.wal_limit)}")
+            conn.executescript(_SCHEMA)
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
+
+    def _purge(self, conn: sqlite3.Connection):
+        """Cancella gli eventi scaduti (al più una volta ogni retention/10 secondi)."""
+        now = time.time()
+        if now - self._last_purge < self.retention / 10:
+            return
+        self._last_purge = now
+        conn.execute("DELETE FROM events WHERE created_at < ?", (now - self.retention,))
+        # checkpoint: con journal_size_limit il file -wal torna piccolo
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    # --- API ---
+    def publish(self, type: str, data: dict, audience: str = "all"):
+        event = {"type": type, "data": data, "audience": audience}
+        self._dispatch(event)
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT INTO events (origin, type, audience, data, created_at) VALUES (?, ?, ?, ?, ?)",
+                (os.getpid(), type, audience, json.dumps(data), time.time()),
+            )
+            self._purge(conn)
+        except sqlite3.Error:
+            # gli eventi live sono best effort: mai far fallire la richiesta
+            log.exception("Impossibile propagare l'evento %s agli altri worker", type)
+
+    def on(self, type: str, handler):
+        """Handler in-process per gli eventi di questo tipo (anche da altri worker)."""
+        self._handlers.setdefault(type, []).append(handler)
+
+    def subscribe(self, admin: bool = False) -> Subscriber | None:
+        """Nuovo subscriber, o None se il worker ha già troppe connessioni."""
+        self.ensure_poller()
+        with self._lock:
+            if len(self._subs) >= self.max_subscribers:
+                return None
+            sub = Subscriber(self.queue_size, admin=admin)
+            self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        with self._lock:
+            self._subs.discard(sub)
+
+    def stream(self, sub: Subscriber):
+        """Generatore SSE: eventi del subscriber più heartbeat periodici."""
+        try:
+            yield f"retry: {int(self.heartbeat * 1000)}\n\n"
+            while True:
+                try:
+                    event = sub.queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            self.unsubscribe(sub)
+
+    # --- consegna ---
+    def _dispatch(self, event: dict):
+        for handler in self._handlers.get(event["type"], ()):
+            try:
+                handler(event["data"])
+            except Exception:
+                log.exception("Handler fallito per l'evento %s", event["type"])
+        with self._lock:
+            subs = list(self._subs)
+        for sub in subs:
+            if sub.wants(event):
+                sub.offer(event)
+
+    def ensure_poller(self):
+        # thread avviato al primo uso (subscriber o cache), uno per processo (anche dopo fork)
+        if self._poller_pid == os.getpid() and self._poller.is_alive():
+            return
+        with self._lock:
+            if self._poller_pid == os.getpid() and self._poller.is_alive():
+                return
+            self._poller = threading.Thread(target=self._poll_loop, name="event-bus-poller",
+                                            daemon=True)
+            self._poller_pid = os.getpid()
+            self._poller.start()
+
+    def _poll_loop(self):
+        conn = self._conn()
+        (last_id,) = conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()
+        me = os.getpid()
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                rows = conn.execute(
+                    "SELECT id, origin, type, audience, data FROM events WHERE id > ? ORDER BY id",
+                    (last_id,),
+                ).fetchall()
+                for event_id, origin, type, audience, data in rows:
+                    last_id = event_id
+                    if origin != me:
+                        self._dispatch({"type": type, "data": json.loads(data), "audience": audience})
+                self._purge(conn)
+            except sqlite3.Error:
+                # DB occupato o momentaneamente non disponibile: si riprova al giro dopo
+                continue
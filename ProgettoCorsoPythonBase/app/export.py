@@ -0,0 +1,191 @@
+# app/export.py
+"""
+Export colonnare (Parquet o Arrow IPC) per le analisi del corso.
+
+- tabelle: courses, students, posts, likes, comments, reports e le copie
+  *_archive (email e avatar degli studenti restano fuori)
+- lettura a blocchi di EXPORT_CHUNK_SIZE righe, a cursore sull'id: in
+  memoria c'è un solo blocco per volta, che diventa un row group Parquet
+  o un record batch Arrow
+- incrementale: EXPORT_DIR/watermark.json ricorda per ogni tabella l'id
+  (e il created_at) dell'ultima riga esportata; il run successivo
+  esporta solo le righe nuove in un file a parte
+  (posts/posts-000101-000250.parquet). Le modifiche alle righe già
+  esportate (es. esito della moderazione) richiedono un export completo
+  (--full), che sostituisce i file precedenti della tabella
+
+Richiede il pacchetto opzionale `pyarrow`.
+"""
+import io
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import sqlalchemy as sa
+from sqlalchemy import select
+
+from . import db
+from .models import (Course, Student, Post, Like, Comment, Report,
+                     ArchivedPost, ArchivedLike, ArchivedComment, ArchivedReport)
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # opzionale: serve solo per l'export
+    pa = None
+
+TABLES = {
+    "courses": (Course, ("id", "slug", "nome", "created_at")),
+    "students": (Student, ("id", "nome", "corso", "course_id", "programmi", "created_at",
+                           "strikes", "mute_until", "is_shadow_banned")),
+    "posts": (Post, ("id", "author_id", "course_id", "content", "image_url", "video_url", "created_at",
+                     "moderation_status", "toxicity_score", "is_visible", "report_count")),
+    "likes": (Like, ("id", "user_id", "post_id", "created_at")),
+    "comments": (Comment, ("id", "user_id", "post_id", "body", "created_at",
+                           "moderation_status", "toxicity_score", "is_visible", "report_count")),
+    "reports": (Report, ("id", "reporter_id", "post_id", "comment_id", "reason",
+                         "created_at", "handled")),
+}
+# archivio (app/archive.py): stesse colonne, stessi id
+for _name, _model in (("posts", ArchivedPost), ("likes", ArchivedLike),
+                      ("comments", ArchivedComment), ("reports", ArchivedReport)):
+    TABLES[f"{_name}_archive"] = (_model, TABLES[_name][1])
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+ARROW_STREAM_MIMETYPE = "application/vnd.apache.arrow.stream"
+
+
+class ExportError(RuntimeError):
+    pass
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ExportError("pyarrow non è installato: pip install pyarrow")
+
+
+def _arrow_type(column):
+    if isinstance(column.type, sa.Boolean):
+        return pa.bool_()
+    if isinstance(column.type, sa.Integer):
+        return pa.int64()
+    if isinstance(column.type, sa.Float):
+        return pa.float64()
+    if isinstance(column.type, sa.DateTime):
+        return pa.timestamp("us")
+    return pa.string()
+
+
+def _columns(table: str):
+    model, names = TABLES[table]
+    return [model.__table__.c[name] for name in names]
+
+
+def schema(table: str):
+    _require_pyarrow()
+    return pa.schema([pa.field(c.name, _arrow_type(c)) for c in _columns(table)])
+
+
+def iter_batches(table: str, after_id: int = 0, since: datetime | None = None,
+                 chunk_size: int = 10_000):
+    """RecordBatch di al più chunk_size righe con id > after_id, in ordine di id."""
+    _require_pyarrow()
+    cols = _columns(table)
+    id_col = cols[0]
+    arrow_schema = schema(table)
+    last_id = after_id
+    while True:
+        q = select(*cols).where(id_col > last_id).order_by(id_col).limit(chunk_size)
+        if since is not None:
+            q = q.where(TABLES[table][0].created_at >= since)
+        rows = db.session.execute(q).all()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(zip(*rows), arrow_schema)],
+            schema=arrow_schema,
+        )
+        if len(rows) < chunk_size:
+            return
+
+
+def _load_watermark(out_dir: Path) -> dict:
+    try:
+        return json.loads((out_dir / "watermark.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_watermark(out_dir: Path, watermark: dict):
+    tmp = out_dir / "watermark.json.tmp"
+    tmp.write_text(json.dumps(watermark, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, out_dir / "watermark.json")
+
+
+def _open_writer(path: Path, arrow_schema, fmt: str):
+    if fmt == "parquet":
+        return pq.ParquetWriter(path, arrow_schema, compression="zstd")
+    return pa.ipc.new_file(str(path), arrow_schema)
+
+
+def export_table(table: str, out_dir: Path, fmt: str = "parquet", since: datetime | None = None,
+                 full: bool = False, chunk_size: int = 10_000) -> dict:
+    """Esporta le righe nuove della tabella in un file; restituisce
+    {"rows", "path", "last_id"} (path None se non c'era nulla da esportare)."""
+    _require_pyarrow()
+    out_dir = Path(out_dir)
+    watermark = {} if full else _load_watermark(out_dir)
+    after_id = watermark.get(table, {}).get("id", 0)
+
+    table_dir = out_dir / table
+    table_dir.mkdir(parents=True, exist_ok=True)
+    tmp = table_dir / f".{table}.partial{FORMATS[fmt]}"
+    writer, rows, first_id, last_id, last_created = None, 0, None, after_id, None
+    try:
+        for batch in iter_batches(table, after_id, since, chunk_size):
+            if writer is None:
+                writer = _open_writer(tmp, batch.schema, fmt)
+                first_id = batch.column(0)[0].as_py()
+            writer.write_batch(batch)
+            rows += batch.num_rows
+            last_id = batch.column(0)[-1].as_py()
+            last_created = batch.column("created_at")[-1].as_py()
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        return {"rows": 0, "path": None, "last_id": last_id}
+
+    suffix = "full" if full else f"{first_id:06d}-{last_id:06d}"
+    path = table_dir / f"{table}-{suffix}{FORMATS[fmt]}"
+    os.replace(tmp, path)
+    if full:
+        # l'export completo sostituisce i file incrementali precedenti
+        for old in table_dir.glob(f"{table}-*"):
+            if old != path:
+                old.unlink()
+
+    # il watermark avanza solo dopo che il file è al suo posto
+    watermark = _load_watermark(out_dir)
+    watermark[table] = {
+        "id": last_id,
+        "created_at": last_created.isoformat() if last_created else None,
+        "exported_at": datetime.utcnow().isoformat(timespec="seconds"),
+    }
+    _save_watermark(out_dir, watermark)
+    return {"rows": rows, "path": path, "last_id": last_id}
+
+
+def stream_arrow(table: str, after_id: int = 0, chunk_size: int = 10_000):
+    """Generatore di byte in formato Arrow IPC stream (per la risposta HTTP)."""
+    _require_pyarrow()
+    buf = io.BytesIO()
+    with pa.ipc.new_stream(buf, schema(table)) as writer:
+        for batch in iter_batches(table, after_id, chunk_size=chunk_size):
+            writer.write_batch(batch)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
@@ -1,5 +1,32 @@
-# app/extensions.py
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
-
-limiter = Limiter(key_func=get_remote_address, default_limits=[])
+# app/extensions.py
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+
+# registra lo schema sqlite:// presso `limits` prima di init_app
+from . import ratelimit_storage  # noqa: F401
+from .cache import PageCache
+from .compression import Compress
+from .events import EventBus
+from .likebuffer import LikeBuffer
+from .neardup import NearDupIndex
+from .trending import Trending
+
+limiter = Limiter(key_func=get_remote_address, default_limits=[])
+
+# eventi live (SSE)
+bus = EventBus()
+
+# pagine di feed renderizzate (invalidata al commit e tra worker via bus)
+page_cache = PageCache()
+
+# gzip/brotli delle risposte testuali
+compress = Compress()
+
+# like in write-behind (LIKE_BUFFER_ENABLED)
+like_buffer = LikeBuffer()
+
+# impronte dei contenuti recenti (quasi-duplicati in moderazione)
+neardup = NearDupIndex()
+
+# termini di tendenza (contatori per ora/giorno)
+trending = Trending()
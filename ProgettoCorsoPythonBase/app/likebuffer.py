@@ -0,0 +1,217 @@
+# app/likebuffer.py
+"""
+Like in write-behind (opzionale, LIKE_BUFFER_ENABLED).
+
+Durante le lezioni live i toggle dei like arrivano a raffiche e ognuno
+sarebbe una transazione di scrittura su social.db, in coda per l'unico
+lock di scrittura di SQLite. In modalità buffer:
+
+- il toggle scrive solo in instance/like_buffer.db (SQLite in WAL, un file
+  diverso: non tocca il lock di social.db); una riga per (user_id, post_id)
+  con lo stato finale voluto e quello di partenza (base), quindi N toggle
+  dello stesso utente sullo stesso post restano una riga sola, e un
+  doppio toggle la cancella
+- un thread per processo, ogni LIKE_BUFFER_FLUSH_MS, applica tutte le
+  righe a social.db in UNA transazione (INSERT/DELETE su likes più
+  student_stats) e poi le toglie dal buffer
+- le letture (conteggi, "mi piace già") sommano i delta ancora nel buffer:
+  chi mette like lo vede subito, da qualunque worker
+- il buffer è su disco: un worker che muore non perde i like, li applica
+  il prossimo flush (di qualunque processo)
+
+`flask likes flush` svuota il buffer a mano.
+"""
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending_likes (
+    user_id INTEGER NOT NULL,
+    post_id INTEGER NOT NULL,
+    liked INTEGER NOT NULL,     -- stato voluto
+    base INTEGER NOT NULL,      -- stato in social.db quando la riga è nata
+    version INTEGER NOT NULL DEFAULT 1,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (user_id, post_id)
+);
+CREATE INDEX IF NOT EXISTS ix_pending_likes_post ON pending_likes (post_id);
+"""
+
+_INSERT_LIKE = text("""
+    INSERT OR IGNORE INTO likes (user_id, post_id, created_at)
+    SELECT :user_id, posts.id, :created_at FROM posts
+    WHERE posts.id = :post_id AND EXISTS (SELECT 1 FROM students WHERE students.id = :user_id)
+""")
+_DELETE_LIKE = text("DELETE FROM likes WHERE user_id = :user_id AND post_id = :post_id")
+
+log = logging.getLogger(__name__)
+
+
+class LikeBuffer:
+    def __init__(self):
+        self.enabled = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._flusher_pid = None
+        self.app = None
+
+    def init_app(self, app):
+        self.enabled = bool(app.config.get("LIKE_BUFFER_ENABLED"))
+        self.path = str(app.config.get("LIKE_BUFFER_DB_PATH", ""))
+        self.interval = app.config.get("LIKE_BUFFER_FLUSH_MS", 300) / 1000
+        self.app = app
+        app.extensions["like_buffer"] = self
+
+    def _conn(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
+
+    # --- scrittura ---
+    def toggle(self, user_id: int, post_id: int, liked_in_db: bool) -> bool:
+        """Inverte il like (stato in social.db + eventuale riga nel buffer); restituisce
+        il nuovo stato. liked_in_db serve solo se la coppia non è già nel buffer."""
+        self.ensure_flusher()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT liked, base FROM pending_likes WHERE user_id = ? AND post_id = ?",
+                (user_id, post_id),
+            ).fetchone()
+            if row is None:
+                base = int(liked_in_db)
+                liked = 1 - base
+                conn.execute(
+                    "INSERT INTO pending_likes (user_id, post_id, liked, base, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (user_id, post_id, liked, base, time.time()),
+                )
+            else:
+                liked, base = 1 - row[0], row[1]
+                if liked == base:  # doppio toggle: niente da scrivere in social.db
+                    conn.execute("DELETE FROM pending_likes WHERE user_id = ? AND post_id = ?",
+                                 (user_id, post_id))
+                else:
+                    conn.execute(
+                        "UPDATE pending_likes SET liked = ?, version = version + 1, updated_at = ? "
+                        "WHERE user_id = ? AND post_id = ?",
+                        (liked, time.time(), user_id, post_id),
+                    )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return bool(liked)
+
+    # --- lettura (delta non ancora applicati) ---
+    def deltas(self, post_ids) -> dict[int, int]:
+        """{post_id: like da aggiungere al conteggio di social.db}."""
+        post_ids = list(post_ids)
+        if not self.enabled or not post_ids:
+            return {}
+        marks = ",".join("?" * len(post_ids))
+        rows = self._conn().execute(
+            f"SELECT post_id, SUM(liked - base) FROM pending_likes "
+            f"WHERE post_id IN ({marks}) GROUP BY post_id",
+            post_ids,
+        )
+        return {post_id: delta for post_id, delta in rows if delta}
+
+    def pending_state(self, user_id: int, post_id: int) -> bool | None:
+        """Stato del like nel buffer, o None se la coppia non ha modifiche in sospeso."""
+        if not self.enabled:
+            return None
+        row = self._conn().execute(
+            "SELECT liked FROM pending_likes WHERE user_id = ? AND post_id = ?", (user_id, post_id)
+        ).fetchone()
+        return None if row is None else bool(row[0])
+
+    # --- flush ---
+    def flush(self) -> int:
+        """Applica il buffer a social.db in una transazione; restituisce le righe applicate."""
+        from . import db, stats
+
+        conn = self._conn()
+        rows = conn.execute(
+            "SELECT user_id, post_id, liked, version FROM pending_likes"
+        ).fetchall()
+        if not rows:
+            return 0
+
+        with self.app.app_context():
+            now = datetime.utcnow()
+            per_post = {}
+            try:
+                for user_id, post_id, liked, _version in rows:
+                    params = {"user_id": user_id, "post_id": post_id, "created_at": now}
+                    changed = db.session.execute(_INSERT_LIKE if liked else _DELETE_LIKE, params).rowcount
+                    if changed:
+                        per_post[post_id] = per_post.get(post_id, 0) + (1 if liked else -1)
+                for post_id, delta in per_post.items():
+                    stats.bump_post_author(post_id, likes=delta)
+                # SQL testuale: la cache delle pagine non lo vede da sola
+                self.app.extensions["page_cache"].touch_posts(db.session, per_post)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+        # via dal buffer solo le righe non toccate nel frattempo; le altre ripartono
+        # dallo stato appena scritto
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for user_id, post_id, liked, version in rows:
+                cur = conn.execute(
+                    "DELETE FROM pending_likes WHERE user_id = ? AND post_id = ? AND version = ?",
+                    (user_id, post_id, version),
+                )
+                if not cur.rowcount:
+                    conn.execute("UPDATE pending_likes SET base = ? WHERE user_id = ? AND post_id = ?",
+                                 (liked, user_id, post_id))
+                    conn.execute("DELETE FROM pending_likes WHERE user_id = ? AND post_id = ? "
+                                 "AND liked = base", (user_id, post_id))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def ensure_flusher(self):
+        # un thread per processo (anche dopo fork), avviato al primo toggle
+        if self._flusher_pid == os.getpid() and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid() and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name="like-buffer-flush",
+                                             daemon=True)
+            self._flusher_pid = os.getpid()
+            self._flusher.start()
+            atexit.register(self._flush_quietly)
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except Exception:
+            log.exception("Flush del buffer dei like fallito")
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.interval)
+            self._flush_quietly()
+
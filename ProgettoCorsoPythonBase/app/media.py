@@ -0,0 +1,143 @@
+# app/media.py
+"""
+Pulizia dei file caricati in UPLOAD_FOLDER.
+
+Dopo il commit di una cancellazione, le route passano i percorsi dei media
+a cleanup_after_commit(): un thread in background verifica che nessun'altra
+riga li usi ancora e li rimuove dal disco. `flask media gc` ripulisce gli
+orfani rimasti (es. upload mai collegati a un post).
+
+Un percorso 'uploads/...' è locale solo se il nome è quello generato
+dall'upload (_UPLOAD_NAME: niente '/', niente '..'): image_url e video_url
+arrivano anche dai form e dalle API, e senza questo controllo un
+'uploads/../../x' farebbe cancellare (o passare a ffmpeg) file qualsiasi.
+Le route rifiutano questi valori con check_media_urls(); upload_path()
+ricontrolla comunque che il file stia dentro UPLOAD_FOLDER.
+"""
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Set
+
+from flask import current_app
+
+log = logging.getLogger(__name__)
+
+# nome generato dagli upload (uuid4().hex): i file statici del sito non lo rispettano
+_UPLOAD_NAME = re.compile(r"^[0-9a-f]{32}(\.[\w-]+)*\.[a-z0-9]+$")
+
+_executor = None
+
+
+class MediaPathError(ValueError):
+    pass
+
+
+def is_upload(rel_path: str | None) -> bool:
+    """'uploads/<nome generato>' (file in UPLOAD_FOLDER, nessuna sottocartella)."""
+    return bool(rel_path) and rel_path.startswith("uploads/") \
+        and _UPLOAD_NAME.match(rel_path[len("uploads/"):]) is not None
+
+
+def upload_path(rel_path: str, upload_dir=None) -> Path | None:
+    """Percorso su disco di un upload; None se il nome non è valido o esce da UPLOAD_FOLDER."""
+    if not is_upload(rel_path):
+        return None
+    upload_dir = Path(upload_dir or current_app.config["UPLOAD_FOLDER"]).resolve()
+    path = (upload_dir / rel_path.split("/", 1)[1]).resolve()
+    return path if path.is_relative_to(upload_dir) else None
+
+
+def check_media_urls(*urls):
+    """Per i valori arrivati da form/API: solleva MediaPathError sui percorsi
+    locali che non sono upload validi (es. 'uploads/../config.py')."""
+    for url in urls:
+        if not url:
+            continue
+        if not isinstance(url, str):
+            raise MediaPathError("URL del media non valido")
+        if "://" in url:
+            continue
+        if (url.startswith("uploads/") and not is_upload(url)) or url.startswith("/") \
+                or "\\" in url or ".." in url.split("/"):
+            raise MediaPathError(f"Percorso del media non valido: {url}")
+
+
+def local_media(*urls) -> Set[str]:
+    """Solo gli upload locali validi ('uploads/<nome generato>'); gli URL esterni
+    (e i percorsi non validi) restano fuori."""
+    return {u for u in urls if is_upload(u)}
+
+
+def referenced_media() -> Set[str]:
+    from . import db
+    from .models import Post, ArchivedPost, Student
+
+    refs = set()
+    for model in (Post, ArchivedPost):  # anche i post archiviati mostrano i loro file
+        for urls in db.session.query(model.image_url, model.video_url,
+                                     model.video_stream_url, model.video_poster_url):
+            refs |= local_media(*urls)
+    for (img,) in db.session.query(Student.immagine_profilo):
+        refs |= local_media(img)
+    return refs
+
+
+def _still_referenced(rel_path: str) -> bool:
+    from . import db
+    from .models import Post, ArchivedPost, Student
+
+    return (
+        any(
+            db.session.query(model.id)
+            .filter((model.image_url == rel_path) | (model.video_url == rel_path)
+                    | (model.video_stream_url == rel_path) | (model.video_poster_url == rel_path))
+            .first() is not None
+            for model in (Post, ArchivedPost)
+        )
+        or db.session.query(Student.id).filter(Student.immagine_profilo == rel_path).first() is not None
+    )
+
+
+def _unlink(app, rel_paths: Iterable[str]):
+    with app.app_context():
+        for rel in rel_paths:
+            path = upload_path(rel, app.config["UPLOAD_FOLDER"])
+            if path is None:
+                log.warning("Percorso fuori da UPLOAD_FOLDER ignorato: %s", rel)
+                continue
+            if _still_referenced(rel):
+                continue
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                log.exception("Impossibile eliminare %s", rel)
+
+
+def cleanup_after_commit(rel_paths: Iterable[str]):
+    """Da chiamare DOPO db.session.commit(): la rimozione avviene in background."""
+    global _executor
+    rel_paths = set(rel_paths)
+    if rel_paths:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="media-cleanup")
+        _executor.submit(_unlink, current_app._get_current_object(), rel_paths)
+
+
+def collect_orphans(grace_seconds: int) -> list:
+    """File in UPLOAD_FOLDER non referenziati, più vecchi di grace_seconds."""
+    upload_dir = Path(current_app.config["UPLOAD_FOLDER"])
+    if not upload_dir.is_dir():
+        return []
+    refs = referenced_media()
+    cutoff = time.time() - grace_seconds
+    orphans = []
+    for f in upload_dir.iterdir():
+        if not f.is_file() or not _UPLOAD_NAME.match(f.name):
+            continue
+        if f"uploads/{f.name}" in refs or f.stat().st_mtime > cutoff:
+            continue
+        orphans.append(f)
+    return orphans
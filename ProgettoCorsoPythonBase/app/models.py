@@ -1,209 +1,423 @@
-# app/models.py
-from . import db
-from datetime import datetime
-
-#         STUDENT
-class Student(db.Model):
-    __tablename__ = "students"
-
-    id = db.Column(db.Integer, primary_key=True)
-    nome = db.Column(db.String(120), nullable=False)
-    email = db.Column(db.String(255), unique=True, nullable=True)
-    corso = db.Column(db.String(120), nullable=False)
-    programmi = db.Column(db.String(500), nullable=True)
-    immagine_profilo = db.Column(db.String(255), nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-    
-    
-    strikes = db.Column(db.Integer, default=0)            
-    mute_until = db.Column(db.DateTime, nullable=True)      
-    is_shadow_banned = db.Column(db.Boolean, default=False) 
-
-    
-    posts = db.relationship(
-        "Post",
-        backref="author",
-        lazy=True,
-        cascade="all, delete-orphan"
-    )
-    likes = db.relationship(
-        "Like",
-        backref="user",
-        lazy=True,
-        cascade="all, delete-orphan"
-    )
-    comments = db.relationship(
-        "Comment",
-        backref="user",
-        lazy=True,
-        cascade="all, delete-orphan"
-    )
-    reports = db.relationship(  
-        "Report",
-        backref="reporter",
-        lazy=True,
-        cascade="all, delete-orphan"
-    )
-
-    def __repr__(self):
-        return f"<Student id={self.id} nome={self.nome} email={self.email}>"
-
-class Post(db.Model):
-    __tablename__ = "posts"
-
-    id = db.Column(db.Integer, primary_key=True)
-    author_id = db.Column(
-        db.Integer,
-        db.ForeignKey("students.id"),
-        nullable=False,
-        index=True
-    )
-    content = db.Column(db.Text, nullable=True)
-    image_url = db.Column(db.String(255), nullable=True)
-    video_url = db.Column(db.String(255), nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
-
-    moderation_status = db.Column(db.String(20), default="approved", index=True)
-    toxicity_score = db.Column(db.Float, default=0.0)
-    is_visible = db.Column(db.Boolean, default=True, index=True)
-
-    # --- Relazioni ---
-    likes = db.relationship(
-        "Like",
-        backref="post",
-        lazy=True,
-        cascade="all, delete-orphan"
-    )
-    comments = db.relationship(
-        "Comment",
-        backref="post",
-        lazy=True,
-        cascade="all, delete-orphan"
-    )
-    reports = db.relationship(
-        "Report",
-        backref="post",
-        lazy=True,
-        cascade="all, delete-orphan"
-    )
-
-    def __repr__(self):
-        return f"<Post id={self.id} author_id={self.author_id}>"
-
-   
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "author_id": self.author_id,
-            "author_nome": self.author.nome if self.author else None,
-            "content": self.content,
-            "image_url": self.image_url,
-            "video_url": self.video_url,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "likes_count": len(self.likes),
-            "comments_count": len(self.comments),
-            "moderation_status": self.moderation_status,
-            "toxicity_score": self.toxicity_score,
-            "is_visible": self.is_visible,
-        }
-
-#          LIKE
-
-class Like(db.Model):
-    __tablename__ = "likes"
-
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(
-        db.Integer,
-        db.ForeignKey("students.id"),
-        nullable=False,
-        index=True
-    )
-    post_id = db.Column(
-        db.Integer,
-        db.ForeignKey("posts.id"),
-        nullable=False,
-        index=True
-    )
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-    __table_args__ = (
-        db.UniqueConstraint("user_id", "post_id", name="uq_like_user_post"),
-    )
-
-    def __repr__(self):
-        return f"<Like user_id={self.user_id} post_id={self.post_id}>"
-
-
-#        COMMENT
-
-class Comment(db.Model):
-    __tablename__ = "comments"
-
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(
-        db.Integer,
-        db.ForeignKey("students.id"),
-        nullable=False,
-        index=True
-    )
-    post_id = db.Column(
-        db.Integer,
-        db.ForeignKey("posts.id"),
-        nullable=False,
-        index=True
-    )
-    body = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
-
-    
-    moderation_status = db.Column(db.String(20), default="approved", index=True)
-    toxicity_score = db.Column(db.Float, default=0.0)
-    is_visible = db.Column(db.Boolean, default=True, index=True)
-
-    reports = db.relationship(
-        "Report",
-        backref="comment",
-        lazy=True,
-        cascade="all, delete-orphan"
-    )
-
-    def __repr__(self):
-        return f"<Comment id={self.id} post_id={self.post_id} user_id={self.user_id}>"
-
-#         REPORT
-
-class Report(db.Model):
-    """
-    Segnalazione di un contenuto da parte di un utente.
-    Può riferirsi a un Post OPPURE a un Comment (uno solo dei due).
-    """
-    __tablename__ = "reports"
-
-    id = db.Column(db.Integer, primary_key=True)
-    reporter_id = db.Column(
-        db.Integer,
-        db.ForeignKey("students.id"),
-        nullable=False,
-        index=True
-    )
-    post_id = db.Column(
-        db.Integer,
-        db.ForeignKey("posts.id"),
-        nullable=True,
-        index=True
-    )
-    comment_id = db.Column(
-        db.Integer,
-        db.ForeignKey("comments.id"),
-        nullable=True,
-        index=True
-    )
-    reason = db.Column(db.String(300), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
-    handled = db.Column(db.Boolean, default=False, index=True)
-
-    def __repr__(self):
-        target = f"post_id={self.post_id}" if self.post_id else f"comment_id={self.comment_id}"
-        return f"<Report id={self.id} reporter_id={self.reporter_id} {target} handled={self.handled}>"
+# app/models.py
+from . import db
+from datetime import datetime
+
+#         COURSE
+class Course(db.Model):
+    """Corso normalizzato (Student.corso resta il testo inserito dallo studente)."""
+    __tablename__ = "courses"
+
+    id = db.Column(db.Integer, primary_key=True)
+    slug = db.Column(db.String(120), unique=True, nullable=False)
+    nome = db.Column(db.String(120), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    students = db.relationship("Student", backref="course", lazy=True)
+
+    def __repr__(self):
+        return f"<Course id={self.id} slug={self.slug}>"
+
+
+#         SKILL
+# legame studente <-> competenza: la chiave (skill_id, student_id) dà, per ogni
+# competenza, gli studenti già in ordine di id (intersezioni e cursori in app/skills.py)
+student_skills = db.Table(
+    "student_skills",
+    db.Column("skill_id", db.Integer, db.ForeignKey("skills.id", ondelete="CASCADE"), primary_key=True),
+    db.Column("student_id", db.Integer, db.ForeignKey("students.id", ondelete="CASCADE"),
+              primary_key=True, index=True),
+)
+
+
+class Skill(db.Model):
+    """Competenza normalizzata, ricavata da Student.programmi ("php, react")."""
+    __tablename__ = "skills"
+
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(80), unique=True, nullable=False)  # minuscolo, spazi compattati
+    # quanti studenti la indicano: serve solo a partire dalla competenza più rara
+    students_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    def __repr__(self):
+        return f"<Skill id={self.id} nome={self.nome}>"
+
+
+#         STUDENT
+class Student(db.Model):
+    __tablename__ = "students"
+
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(120), nullable=False)
+    email = db.Column(db.String(255), unique=True, nullable=True)
+    corso = db.Column(db.String(120), nullable=False)
+    course_id = db.Column(
+        db.Integer,
+        db.ForeignKey("courses.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True
+    )
+    programmi = db.Column(db.String(500), nullable=True)
+    immagine_profilo = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    
+    
+    strikes = db.Column(db.Integer, default=0)            
+    mute_until = db.Column(db.DateTime, nullable=True)      
+    is_shadow_banned = db.Column(db.Boolean, default=False) 
+
+    
+    posts = db.relationship(
+        "Post",
+        backref="author",
+        lazy=True,
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+    likes = db.relationship(
+        "Like",
+        backref="user",
+        lazy=True,
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+    comments = db.relationship(
+        "Comment",
+        backref="user",
+        lazy=True,
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+    reports = db.relationship(  
+        "Report",
+        backref="reporter",
+        lazy=True,
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+    skills = db.relationship(
+        "Skill",
+        secondary=student_skills,
+        backref="students",
+        lazy=True,
+        passive_deletes=True
+    )
+
+    def __repr__(self):
+        return f"<Student id={self.id} nome={self.nome} email={self.email}>"
+
+class Post(db.Model):
+    __tablename__ = "posts"
+
+    id = db.Column(db.Integer, primary_key=True)
+    author_id = db.Column(
+        db.Integer,
+        db.ForeignKey("students.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    # copia di author.course_id alla creazione: il feed del corso non fa join
+    course_id = db.Column(
+        db.Integer,
+        db.ForeignKey("courses.id", ondelete="SET NULL"),
+        nullable=True
+    )
+    content = db.Column(db.Text, nullable=True)
+    image_url = db.Column(db.String(255), nullable=True)
+    video_url = db.Column(db.String(255), nullable=True)
+    # derivati da video_url in background (app/video.py)
+    video_stream_url = db.Column(db.String(255), nullable=True)  # faststart / ricodificato
+    video_poster_url = db.Column(db.String(255), nullable=True)
+    video_status = db.Column(db.String(20), nullable=True)  # None = da elaborare | ready | failed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    moderation_status = db.Column(db.String(20), default="approved", index=True)
+    toxicity_score = db.Column(db.Float, default=0.0)
+    # posizione nella coda di moderazione: toxicity_score, più alta per i
+    # quasi-duplicati (app/moderation.py); toxicity_score resta quello vero
+    moderation_priority = db.Column(db.Float, nullable=False, default=0.0, server_default="0")
+    is_visible = db.Column(db.Boolean, default=True, index=True)
+    # segnalazioni distinte ricevute (aggiornato all'inserimento del Report)
+    report_count = db.Column(db.Integer, nullable=False, default=0, server_default="0", index=True)
+
+    # coda di moderazione: pending ordinati per priorità decrescente, poi i più vecchi
+    __table_args__ = (
+        db.Index("ix_posts_moderation_queue", "moderation_status",
+                 db.text("moderation_priority DESC"), "created_at"),
+        # bacheca personale: post di un autore, più recenti prima
+        db.Index("ix_posts_author_created", "author_id", "created_at"),
+        # feed del corso, più recenti prima
+        db.Index("ix_posts_course_created", "course_id", "created_at"),
+        # AUTOINCREMENT: gli id dei post archiviati non vengono mai riassegnati
+        {"sqlite_autoincrement": True},
+    )
+
+    # --- Relazioni ---
+    likes = db.relationship(
+        "Like",
+        backref="post",
+        lazy=True,
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+    comments = db.relationship(
+        "Comment",
+        backref="post",
+        lazy=True,
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+    reports = db.relationship(
+        "Report",
+        backref="post",
+        lazy=True,
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+
+    def __repr__(self):
+        return f"<Post id={self.id} author_id={self.author_id}>"
+
+   
+    def to_dict(self, likes_count: int | None = None, comments_count: int | None = None):
+        """likes_count/comments_count: conteggi già calcolati con una COUNT raggruppata
+        (routes.like_counts somma anche i like ancora nel buffer); se mancano si
+        caricano le relazioni del post."""
+        return {
+            "id": self.id,
+            "author_id": self.author_id,
+            "author_nome": self.author.nome if self.author else None,
+            "content": self.content,
+            "image_url": self.image_url,
+            "video_url": self.video_url,
+            "video_stream_url": self.video_stream_url,
+            "video_poster_url": self.video_poster_url,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "likes_count": len(self.likes) if likes_count is None else likes_count,
+            "comments_count": len(self.comments) if comments_count is None else comments_count,
+            "moderation_status": self.moderation_status,
+            "toxicity_score": self.toxicity_score,
+            "is_visible": self.is_visible,
+        }
+
+#        STATISTICHE STUDENTE
+
+class StudentStats(db.Model):
+    """
+    Contatori per studente, aggiornati dalle scritture (app/stats.py) e
+    ricostruibili con `flask stats rebuild`. Gli strike restano su Student.
+    """
+    __tablename__ = "student_stats"
+
+    student_id = db.Column(
+        db.Integer,
+        db.ForeignKey("students.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    posts_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    likes_received = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    comments_received = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    def __repr__(self):
+        return (f"<StudentStats student_id={self.student_id} posts={self.posts_count} "
+                f"likes={self.likes_received} comments={self.comments_received}>")
+
+#          LIKE
+
+class Like(db.Model):
+    __tablename__ = "likes"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("students.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    post_id = db.Column(
+        db.Integer,
+        db.ForeignKey("posts.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "post_id", name="uq_like_user_post"),
+        {"sqlite_autoincrement": True},
+    )
+
+    def __repr__(self):
+        return f"<Like user_id={self.user_id} post_id={self.post_id}>"
+
+
+#        COMMENT
+
+class Comment(db.Model):
+    __tablename__ = "comments"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("students.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    post_id = db.Column(
+        db.Integer,
+        db.ForeignKey("posts.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    body = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    
+    moderation_status = db.Column(db.String(20), default="approved", index=True)
+    toxicity_score = db.Column(db.Float, default=0.0)
+    moderation_priority = db.Column(db.Float, nullable=False, default=0.0, server_default="0")
+    is_visible = db.Column(db.Boolean, default=True, index=True)
+    report_count = db.Column(db.Integer, nullable=False, default=0, server_default="0", index=True)
+
+    __table_args__ = (
+        db.Index("ix_comments_moderation_queue", "moderation_status",
+                 db.text("moderation_priority DESC"), "created_at"),
+        {"sqlite_autoincrement": True},
+    )
+
+    reports = db.relationship(
+        "Report",
+        backref="comment",
+        lazy=True,
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+
+    def __repr__(self):
+        return f"<Comment id={self.id} post_id={self.post_id} user_id={self.user_id}>"
+
+#         REPORT
+
+class Report(db.Model):
+    """
+    Segnalazione di un contenuto da parte di un utente.
+    Può riferirsi a un Post OPPURE a un Comment (uno solo dei due).
+    """
+    __tablename__ = "reports"
+
+    id = db.Column(db.Integer, primary_key=True)
+    reporter_id = db.Column(
+        db.Integer,
+        db.ForeignKey("students.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    post_id = db.Column(
+        db.Integer,
+        db.ForeignKey("posts.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True
+    )
+    comment_id = db.Column(
+        db.Integer,
+        db.ForeignKey("comments.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True
+    )
+    reason = db.Column(db.String(300), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    handled = db.Column(db.Boolean, default=False, index=True)
+
+    # una sola segnalazione per utente e contenuto (i NULL non collidono tra loro)
+    __table_args__ = (
+        db.Index("uq_report_reporter_post", "reporter_id", "post_id", unique=True),
+        db.Index("uq_report_reporter_comment", "reporter_id", "comment_id", unique=True),
+        {"sqlite_autoincrement": True},
+    )
+
+    def __repr__(self):
+        target = f"post_id={self.post_id}" if self.post_id else f"comment_id={self.comment_id}"
+        return f"<Report id={self.id} reporter_id={self.reporter_id} {target} handled={self.handled}>"
+
+
+#        ARCHIVIO (post vecchi, vedi app/archive.py)
+# Stesse colonne (e stessi id) delle tabelle calde: il permalink /post/<id>
+# cerca prima in posts e poi in posts_archive. Contenuti in sola lettura.
+
+class ArchivedPost(db.Model):
+    __tablename__ = "posts_archive"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    author_id = db.Column(
+        db.Integer,
+        db.ForeignKey("students.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    course_id = db.Column(db.Integer, db.ForeignKey("courses.id", ondelete="SET NULL"), nullable=True)
+    content = db.Column(db.Text, nullable=True)
+    image_url = db.Column(db.String(255), nullable=True)
+    video_url = db.Column(db.String(255), nullable=True)
+    video_stream_url = db.Column(db.String(255), nullable=True)
+    video_poster_url = db.Column(db.String(255), nullable=True)
+    video_status = db.Column(db.String(20), nullable=True)
+    created_at = db.Column(db.DateTime, index=True)
+    moderation_status = db.Column(db.String(20))
+    toxicity_score = db.Column(db.Float)
+    is_visible = db.Column(db.Boolean)
+    report_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    archived_at = db.Column(db.DateTime, nullable=False, server_default=db.func.current_timestamp())
+
+    author = db.relationship("Student", lazy=True)
+
+    def __repr__(self):
+        return f"<ArchivedPost id={self.id} author_id={self.author_id}>"
+
+
+class ArchivedLike(db.Model):
+    __tablename__ = "likes_archive"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("students.id", ondelete="CASCADE"), nullable=False)
+    post_id = db.Column(
+        db.Integer,
+        db.ForeignKey("posts_archive.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    created_at = db.Column(db.DateTime)
+
+
+class ArchivedComment(db.Model):
+    __tablename__ = "comments_archive"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("students.id", ondelete="CASCADE"), nullable=False)
+    post_id = db.Column(
+        db.Integer,
+        db.ForeignKey("posts_archive.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    body = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime)
+    moderation_status = db.Column(db.String(20))
+    toxicity_score = db.Column(db.Float)
+    is_visible = db.Column(db.Boolean)
+    report_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    user = db.relationship("Student", lazy=True)
+
+
+class ArchivedReport(db.Model):
+    __tablename__ = "reports_archive"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    reporter_id = db.Column(db.Integer, db.ForeignKey("students.id", ondelete="CASCADE"), nullable=False)
+    post_id = db.Column(db.Integer, db.ForeignKey("posts_archive.id", ondelete="CASCADE"),
+                        nullable=True, index=True)
+    comment_id = db.Column(db.Integer, db.ForeignKey("comments_archive.id", ondelete="CASCADE"),
+                           nullable=True, index=True)
+    reason = db.Column(db.String(300), nullable=False)
+    created_at = db.Column(db.DateTime)
+    handled = db.Column(db.Boolean)
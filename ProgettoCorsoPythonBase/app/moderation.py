@@ -1,67 +1,91 @@
-# app/moderation.py
-import re
-from dataclasses import dataclass
-from typing import List
-from flask import current_app as app
-
-@dataclass
-class ModResult:
-    action: str   # 'approve' | 'pending' | 'reject'
-    score: float  # 0..1
-
-# elenco parole/insulti “hard block” (case-insensitive, word boundary, piccole varianti)
-_HARD_PATTERNS: List[str] = [
-    r"\b(vaf+ancul\w*)\b",
-    r"\b(stronz\w*)\b",
-    r"\b(coglion\w*)\b",
-    r"\b(puttan\w*|troi\w*)\b",
-    r"\b(merd\w*)\b",
-    r"\b(muori|ammazzati|ucciditi|suicidati)\b",
-    r"\b(negro|zingar\w*|froci\w*|lesbic\w*)\b",
-    r"\b(cornut\w*|bastard\w*)\b",
-    r"\b(deficient\w*|idiot\w*)\b",
-]
-
-_COMPILED = [re.compile(p, re.IGNORECASE) for p in _HARD_PATTERNS]
-
-def _has_hard_abuse(text: str) -> bool:
-    t = (text or "").strip()
-    if not t:
-        return False
-    return any(p.search(t) for p in _COMPILED)
-
-def _soft_score(text: str) -> float:
-    """Heuristica semplice: più parole dalla softlist => score più alto (0..1)."""
-    if not text:
-        return 0.0
-    t = text.lower()
-    soft_words = [
-        "stupido", "idiota", "cretino", "odioso", "schifo",
-        "odi", "odio", "imbecille", "vergogna"
-    ]
-    hits = sum(t.count(w) for w in soft_words)
-    # normalizza: 0 -> 0.0, >=3 -> ~1.0
-    return min(1.0, hits / 3.0)
-
-def assess(text: str) -> ModResult:
-    """Regole:
-    - hard list => reject (score=1.0)
-    - altrimenti calcola soft score e confronta con soglie dal config:
-      score < PENDING => approve
-      PENDING <= score < REJECT => pending
-      score >= REJECT => reject
-    """
-    if _has_hard_abuse(text):
-        return ModResult(action="reject", score=1.0)
-
-    score = _soft_score(text)
-    pending_th = float(getattr(app.config, "TOXICITY_PENDING_THRESHOLD", 0.75))
-    reject_th  = float(getattr(app.config, "TOXICITY_REJECT_THRESHOLD", 0.95))
-
-    if score >= reject_th:
-        return ModResult(action="reject", score=score)
-    if score >= pending_th:
-        return ModResult(action="pending", score=score)
-    return ModResult(action="approve", score=score)
-
-
+# app/moderation.py
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List
+from flask import current_app as app
+
+@dataclass
+class ModResult:
+    action: str   # 'approve' | 'pending' | 'reject'
+    score: float  # 0..1
+    priority: float | None = None  # posizione in coda (moderation_priority); None = score
+
+    def __post_init__(self):
+        if self.priority is None:
+            self.priority = self.score
+
+# elenco parole/insulti “hard block” (case-insensitive, word boundary, piccole varianti)
+_HARD_PATTERNS: List[str] = [
+    r"\b(vaf+ancul\w*)\b",
+    r"\b(stronz\w*)\b",
+    r"\b(coglion\w*)\b",
+    r"\b(puttan\w*|troi\w*)\b",
+    r"\b(merd\w*)\b",
+    r"\b(muori|ammazzati|ucciditi|suicidati)\b",
+    r"\b(negro|zingar\w*|froci\w*|lesbic\w*)\b",
+    r"\b(cornut\w*|bastard\w*)\b",
+    r"\b(deficient\w*|idiot\w*)\b",
+]
+
+_TOKEN_RE = re.compile(r"#?\w+")
+
+def tokenize(text: str) -> List[str]:
+    """Parole in minuscolo (gli hashtag tengono il #); usato anche dai quasi-duplicati."""
+    return _TOKEN_RE.findall((text or "").lower())
+
+@lru_cache(maxsize=1)
+def _compiled() -> List[re.Pattern]:
+    # compilate al primo contenuto da valutare, non all'avvio dell'app
+    return [re.compile(p, re.IGNORECASE) for p in _HARD_PATTERNS]
+
+def _has_hard_abuse(text: str) -> bool:
+    t = (text or "").strip()
+    if not t:
+        return False
+    return any(p.search(t) for p in _compiled())
+
+def _soft_score(text: str) -> float:
+    """Heuristica semplice: più parole dalla softlist => score più alto (0..1)."""
+    if not text:
+        return 0.0
+    t = text.lower()
+    soft_words = [
+        "stupido", "idiota", "cretino", "odioso", "schifo",
+        "odi", "odio", "imbecille", "vergogna"
+    ]
+    hits = sum(t.count(w) for w in soft_words)
+    # normalizza: 0 -> 0.0, >=3 -> ~1.0
+    return min(1.0, hits / 3.0)
+
+def assess(text: str, ref: tuple[str, int] | None = None) -> ModResult:
+    """Regole:
+    - hard list => reject (score=1.0)
+    - altrimenti calcola soft score e confronta con soglie dal config:
+      score < PENDING => approve
+      PENDING <= score < REJECT => pending
+      score >= REJECT => reject
+    - un testo che sarebbe approvato ma ricopia contenuti recenti
+      (app/neardup.py) => pending con il suo score vero, e priority almeno
+      NEARDUP_QUEUE_PRIORITY per non finire in fondo alla coda di moderazione
+    ref = ("post" | "comment", id) quando si valuta una modifica, per non
+    confrontare il contenuto con se stesso.
+    """
+    if _has_hard_abuse(text):
+        return ModResult(action="reject", score=1.0)
+
+    score = _soft_score(text)
+    pending_th = float(getattr(app.config, "TOXICITY_PENDING_THRESHOLD", 0.75))
+    reject_th  = float(getattr(app.config, "TOXICITY_REJECT_THRESHOLD", 0.95))
+
+    if score >= reject_th:
+        return ModResult(action="reject", score=score)
+    if score >= pending_th:
+        return ModResult(action="pending", score=score)
+    neardup = app.extensions.get("neardup")
+    if neardup is not None and neardup.is_duplicate(text, exclude=ref):
+        queue_priority = app.config.get("NEARDUP_QUEUE_PRIORITY", 0.5)
+        return ModResult(action="pending", score=score, priority=max(score, queue_priority))
+    return ModResult(action="approve", score=score)
+
+
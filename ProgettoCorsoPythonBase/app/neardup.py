@@ -0,0 +1,241 @@
+# app/neardup.py
+"""
+Quasi-duplicati: copia-incolla e flood finiscono in revisione.
+
+- ogni post/commento diventa una SimHash a 64 bit (parole e coppie di
+  parole del tokenizer di moderation.py): testi uguali a meno di piccole
+  modifiche danno impronte che differiscono in pochi bit
+- indice in memoria a bande (LSH): NEARDUP_BANDS finestre da
+  NEARDUP_BAND_BITS bit, sovrapposte, ognuna con i suoi bucket; la ricerca
+  confronta solo le impronte che condividono almeno una finestra (nessuna
+  scansione del DB). Con 16 finestre da 8 bit una copia con una parola
+  cambiata (6-10 bit diversi) si trova quasi sempre, mentre due testi
+  diversi restano sopra i 15 bit e di rado finiscono nello stesso bucket
+- finestra di NEARDUP_WINDOW_HOURS: le impronte più vecchie escono
+  dall'indice
+- impronte salvate accanto al DB principale (instance/social.db ->
+  instance/social.neardup.db, SQLite in WAL come events.db): al riavvio
+  l'indice si ricarica, e ogni worker, prima di cercare, legge le righe
+  aggiunte dagli altri. Un altro DATABASE_URL ha le sue impronte: i post di
+  un DB nuovo non vengono confrontati con quelli di uno vecchio
+- assess() manda in pending i testi con almeno NEARDUP_MIN_MATCHES copie
+  recenti, con moderation_priority almeno NEARDUP_QUEUE_PRIORITY (il
+  toxicity_score resta quello calcolato); le impronte si registrano da sole
+  al commit (hook sulla Session)
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from itertools import chain
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, attributes
+
+from .moderation import tokenize
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,          -- 'post' | 'comment'
+    item_id INTEGER NOT NULL,
+    fp INTEGER NOT NULL,         -- SimHash (64 bit, con segno)
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_fingerprints_created ON fingerprints (created_at);
+"""
+_TEXT_FIELDS = {"posts": ("post", "content"), "comments": ("comment", "body")}
+_MASK = (1 << 64) - 1
+
+log = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=65536)
+def _hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big")
+
+
+def simhash(tokens: list[str]) -> int:
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    hashes = [_hash(f) for f in features]
+    half = len(hashes) / 2
+    fp = 0
+    for bit in range(64):
+        if sum((h >> bit) & 1 for h in hashes) > half:
+            fp |= 1 << bit
+    return fp
+
+
+def _to_sql(fp: int) -> int:
+    return fp - (1 << 64) if fp >= 1 << 63 else fp
+
+
+def store_path(app) -> str:
+    """NEARDUP_DB_PATH, oppure <db principale>.neardup.db accanto al DB dell'app."""
+    if app.config.get("NEARDUP_DB_PATH"):
+        return str(app.config["NEARDUP_DB_PATH"])
+    database = make_url(app.config["SQLALCHEMY_DATABASE_URI"]).database
+    if not database or database == ":memory:":
+        return str(Path(app.instance_path) / "neardup.db")
+    return str(Path(database).with_suffix(".neardup.db"))
+
+
+class NearDupIndex:
+    def __init__(self):
+        self.enabled = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._installed = False
+        self._reset()
+
+    def _reset(self):
+        self._buckets = []
+        self._items = deque()  # (created_at, key, fp) in ordine di arrivo
+        self._keys = set()
+        self._seq = 0
+        self._pid = None
+
+    def init_app(self, app):
+        cfg = app.config
+        self.enabled = bool(cfg.get("NEARDUP_ENABLED"))
+        self.path = store_path(app)
+        self.window = cfg.get("NEARDUP_WINDOW_HOURS", 24) * 3600
+        self.bands = cfg.get("NEARDUP_BANDS", 16)
+        self.band_bits = cfg.get("NEARDUP_BAND_BITS", 8)
+        self.max_distance = cfg.get("NEARDUP_MAX_DISTANCE", 10)
+        self.min_tokens = cfg.get("NEARDUP_MIN_TOKENS", 6)
+        self.min_matches = cfg.get("NEARDUP_MIN_MATCHES", 1)
+        self.max_items = cfg.get("NEARDUP_MAX_ITEMS", 100_000)
+        app.extensions["neardup"] = self
+        if self.enabled and not self._installed:
+            event.listen(Session, "after_flush", self._after_flush)
+            event.listen(Session, "after_commit", self._after_commit)
+            event.listen(Session, "after_rollback", self._after_rollback)
+            self._installed = True
+
+    def _conn(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
+
+    # --- indice in memoria ---
+    def _bands_of(self, fp: int):
+        # finestre di band_bits bit che partono ogni 64/bands bit (ruotando l'impronta)
+        mask = (1 << self.band_bits) - 1
+        starts = (i * 64 // self.bands for i in range(self.bands))
+        return [((fp >> s) | (fp << (64 - s))) & mask for s in starts]
+
+    def _add(self, key, fp: int, created_at: float):
+        if key in self._keys:  # contenuto modificato: la nuova impronta sostituisce la vecchia
+            self._remove(key)
+        for bucket, value in zip(self._buckets, self._bands_of(fp)):
+            bucket.setdefault(value, []).append((fp, key))
+        self._items.append((created_at, key, fp))
+        self._keys.add(key)
+
+    def _remove(self, key):
+        for i, (created_at, k, fp) in enumerate(self._items):
+            if k == key:
+                del self._items[i]
+                break
+        else:
+            return
+        self._keys.discard(key)
+        for bucket, value in zip(self._buckets, self._bands_of(fp)):
+            entries = bucket.get(value, [])
+            entries[:] = [e for e in entries if e[1] != key]
+            if not entries:
+                bucket.pop(value, None)
+
+    def _expire(self, now: float):
+        cutoff = now - self.window
+        while self._items and (self._items[0][0] < cutoff or len(self._items) > self.max_items):
+            self._remove(self._items[0][1])
+
+    def _sync(self):
+        """Allinea l'indice a neardup.db: carico completo al primo uso (o dopo un
+        fork), poi solo le righe nuove degli altri worker."""
+        if self._pid != os.getpid():
+            self._reset()
+            self._buckets = [{} for _ in range(self.bands)]
+            self._pid = os.getpid()
+            since = time.time() - self.window
+        else:
+            since = 0
+        rows = self._conn().execute(
+            "SELECT seq, kind, item_id, fp, created_at FROM fingerprints "
+            "WHERE seq > ? AND created_at >= ? ORDER BY seq",
+            (self._seq, since),
+        ).fetchall()
+        for seq, kind, item_id, fp, created_at in rows:
+            self._add((kind, item_id), fp & _MASK, created_at)
+            self._seq = seq
+        self._expire(time.time())
+
+    # --- API ---
+    def matches(self, text: str, exclude: tuple[str, int] | None = None) -> list[tuple[str, int]]:
+        """Contenuti recenti quasi uguali al testo ([(kind, id)]), escluso `exclude`."""
+        tokens = tokenize(text)
+        if not self.enabled or len(tokens) < self.min_tokens:
+            return []
+        fp = simhash(tokens)
+        found = set()
+        with self._lock:
+            self._sync()
+            for bucket, value in zip(self._buckets, self._bands_of(fp)):
+                for other, key in bucket.get(value, ()):
+                    if key != exclude and (fp ^ other).bit_count() <= self.max_distance:
+                        found.add(key)
+        return sorted(found)
+
+    def is_duplicate(self, text: str, exclude: tuple[str, int] | None = None) -> bool:
+        return self.enabled and len(self.matches(text, exclude)) >= self.min_matches
+
+    def remember(self, items):
+        """Registra [(kind, id, testo)] (dopo il commit che li ha salvati)."""
+        now = time.time()
+        rows = []
+        for kind, item_id, text in items:
+            tokens = tokenize(text)
+            if len(tokens) >= self.min_tokens:
+                rows.append((kind, item_id, _to_sql(simhash(tokens)), now))
+        if not rows:
+            return
+        conn = self._conn()
+        conn.executemany(
+            "INSERT INTO fingerprints (kind, item_id, fp, created_at) VALUES (?, ?, ?, ?)", rows
+        )
+        conn.execute("DELETE FROM fingerprints WHERE created_at < ?", (now - self.window,))
+        # le righe nuove entrano nell'indice con il prossimo _sync()
+
+    # --- hook sulla Session ---
+    def _after_flush(self, session, flush_context):
+        pending = session.info.setdefault("neardup_pending", {})
+        for obj in chain(session.new, session.dirty):
+            kind, field = _TEXT_FIELDS.get(getattr(obj, "__tablename__", None), (None, None))
+            if kind and obj.id is not None and (obj in session.new
+                                                or attributes.get_history(obj, field).has_changes()):
+                pending[(kind, obj.id)] = getattr(obj, field)
+
+    def _after_commit(self, session):
+        pending = session.info.pop("neardup_pending", None)
+        if pending:
+            try:
+                self.remember([(kind, item_id, text) for (kind, item_id), text in pending.items()])
+            except sqlite3.Error:
+                log.exception("Impossibile registrare le impronte dei quasi-duplicati")
+
+    def _after_rollback(self, session):
+        session.info.pop("neardup_pending", None)
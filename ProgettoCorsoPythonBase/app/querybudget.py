@@ -0,0 +1,147 @@
+# app/querybudget.py
+"""
+Budget di query: conta gli statement SQL eseguiti in un blocco (una view,
+un test...), li raggruppa per "forma" normalizzata e segnala quando la
+stessa forma si ripete troppe volte (tipico N+1 da lazy load) o quando il
+totale supera il budget.
+
+Uso:
+    @bp.get("/feed")
+    @query_budget(max_total=20)
+    def public_feed(): ...
+
+    with assert_max_queries(3):          # nei test: fallisce se sfora
+        client.get("/api/posts")
+"""
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import List, Optional, Tuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+# --- normalizzazione SQL ---
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """Riduce uno statement alla sua forma: letterali e liste IN diventano '?'."""
+    s = _STRING.sub("?", statement or "")
+    s = _NUMBER.sub("?", s)
+    s = _IN_LIST.sub("(?)", s)
+    return _SPACES.sub(" ", s).strip()
+
+
+@dataclass
+class QueryTracker:
+    total: int = 0
+    shapes: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str):
+        self.total += 1
+        self.shapes[normalize_sql(statement)] += 1
+
+    def repeated(self, max_repeat: int) -> List[Tuple[str, int]]:
+        return [(s, n) for s, n in self.shapes.most_common() if n > max_repeat]
+
+
+# tracker attivi nel contesto corrente (i budget annidati contano tutti)
+_active: ContextVar[tuple] = ContextVar("query_budget_trackers", default=())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    for tracker in _active.get():
+        tracker.record(statement)
+
+
+def install():
+    """Registra il listener globale sugli Engine (idempotente)."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def _config(key: str, default):
+    if has_app_context():
+        return current_app.config.get(key, default)
+    return default
+
+
+class query_budget:
+    """Context manager e decoratore.
+
+    - max_total: numero massimo di statement nel blocco
+    - max_repeat: quante volte può ripetersi la stessa forma (default da config)
+    - action: 'raise' | 'log' (default da config QUERY_BUDGET_ACTION)
+    """
+
+    def __init__(self, max_total: Optional[int] = None, max_repeat: Optional[int] = None,
+                 action: Optional[str] = None, label: Optional[str] = None):
+        self.max_total = max_total
+        self.max_repeat = max_repeat
+        self.action = action
+        self.label = label
+        self.tracker: Optional[QueryTracker] = None
+        self._token = None
+
+    def __enter__(self) -> QueryTracker:
+        self.tracker = QueryTracker()
+        self._token = _active.set(_active.get() + (self.tracker,))
+        return self.tracker
+
+    def __exit__(self, exc_type, exc, tb):
+        _active.reset(self._token)
+        if exc_type is None:
+            self.check()
+        return False
+
+    def __call__(self, fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            # un'istanza nuova per chiamata: il decoratore è condiviso tra thread
+            with query_budget(self.max_total, self.max_repeat, self.action,
+                              self.label or fn.__name__):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def check(self):
+        max_repeat = self.max_repeat
+        if max_repeat is None:
+            max_repeat = _config("QUERY_BUDGET_MAX_REPEAT", None)
+        action = self.action or _config("QUERY_BUDGET_ACTION", "raise")
+
+        problems = []
+        if self.max_total is not None and self.tracker.total > self.max_total:
+            problems.append(f"{self.tracker.total} query (budget {self.max_total})")
+        if max_repeat is not None:
+            for shape, n in self.tracker.repeated(max_repeat):
+                problems.append(f"{n}x (max {max_repeat}): {shape[:200]}")
+        if not problems:
+            return
+
+        msg = f"Query budget superato in {self.label or 'blocco'}: " + "; ".join(problems)
+        if action == "raise":
+            raise QueryBudgetExceeded(msg)
+        log.warning(msg)
+
+
+@contextmanager
+def assert_max_queries(max_total: Optional[int] = None, max_repeat: Optional[int] = 1):
+    """Helper per i test: fallisce (QueryBudgetExceeded) se il blocco sfora."""
+    with query_budget(max_total, max_repeat, action="raise", label="test") as tracker:
+        yield tracker
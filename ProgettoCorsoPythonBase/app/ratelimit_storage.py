@@ -0,0 +1,147 @@
+# app/ratelimit_storage.py
+"""
+Storage per Flask-Limiter condiviso tra processi, senza Redis.
+
+I contatori stanno in un file SQLite in modalità WAL: ogni worker gunicorn
+apre la propria connessione, ma i limiti sono unici per tutta la macchina.
+
+    RATELIMIT_STORAGE_URI = "sqlite:////percorso/assoluto/ratelimit.db"
+
+Strategie supportate:
+- fixed-window: un UPSERT ... RETURNING atomico per controllo
+- moving-window: finestra scorrevole esatta (una riga per hit), con
+  controllo+inserimento nella stessa transazione BEGIN IMMEDIATE
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from limits.storage import MovingWindowSupport, Storage
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS window_entries (
+    key TEXT NOT NULL,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_window_entries_key_at ON window_entries (key, at);
+"""
+
+# ogni quante operazioni (per connessione) ripulire i contatori scaduti
+_PURGE_EVERY = 1000
+
+
+class SQLiteStorage(Storage, MovingWindowSupport):
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri: str = None, wrap_exceptions: bool = False, **options):
+        # stessa convenzione di SQLAlchemy: sqlite:///relativo, sqlite:////assoluto
+        self.path = uri.split(":///", 1)[1] if uri and ":///" in uri else ""
+        if not self.path:
+            raise ValueError(f"URI SQLite non valido per il rate limiting: {uri!r}")
+        self.timeout = float(options.get("timeout", 5.0))
+        self._local = threading.local()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    # --- connessione (una per thread, riaperta dopo un fork) ---
+    def _conn(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            local.conn, local.pid, local.ops = conn, os.getpid(), 0
+        local.ops += 1
+        if local.ops % _PURGE_EVERY == 0:
+            local.conn.execute("DELETE FROM counters WHERE expires_at <= ?", (time.time(),))
+        return local.conn
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    # --- fixed window ---
+    def incr(self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1) -> int:
+        now = time.time()
+        row = self._conn().execute(
+            """
+            INSERT INTO counters (key, value, expires_at) VALUES (:key, :amount, :exp)
+            ON CONFLICT (key) DO UPDATE SET
+                value = CASE WHEN expires_at <= :now THEN :amount ELSE value + :amount END,
+                expires_at = CASE WHEN expires_at <= :now OR :elastic THEN :exp ELSE expires_at END
+            RETURNING value
+            """,
+            {"key": key, "amount": amount, "exp": now + expiry, "now": now,
+             "elastic": 1 if elastic_expiry else 0},
+        ).fetchone()
+        return row[0]
+
+    def get(self, key: str) -> int:
+        row = self._conn().execute(
+            "SELECT value FROM counters WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        row = self._conn().execute(
+            "SELECT expires_at FROM counters WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else time.time()
+
+    # --- moving window ---
+    def acquire_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM window_entries WHERE key = ? AND at <= ?", (key, now - expiry))
+            (count,) = conn.execute(
+                "SELECT COUNT(*) FROM window_entries WHERE key = ?", (key,)
+            ).fetchone()
+            if count + amount > limit:
+                conn.execute("COMMIT")
+                return False
+            conn.executemany(
+                "INSERT INTO window_entries (key, at) VALUES (?, ?)", [(key, now)] * amount
+            )
+            conn.execute("COMMIT")
+            return True
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_moving_window(self, key: str, limit: int, expiry: int):
+        now = time.time()
+        oldest, count = self._conn().execute(
+            "SELECT MIN(at), COUNT(*) FROM window_entries WHERE key = ? AND at > ?",
+            (key, now - expiry),
+        ).fetchone()
+        return (oldest if oldest is not None else now), count
+
+    # --- manutenzione ---
+    def check(self) -> bool:
+        try:
+            self._conn().execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int:
+        conn = self._conn()
+        n = conn.execute("DELETE FROM counters").rowcount
+        n += conn.execute("DELETE FROM window_entries").rowcount
+        return n
+
+    def clear(self, key: str) -> None:
+        conn = self._conn()
+        conn.execute("DELETE FROM counters WHERE key = ?", (key,))
+        conn.execute("DELETE FROM window_entries WHERE key = ?", (key,))
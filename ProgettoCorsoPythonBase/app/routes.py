@@ -1,648 +1,1488 @@
-# app/routes.py
-from flask import (
-    Blueprint, request, jsonify, render_template,
-    redirect, url_for, session, flash, current_app as app
-)
-from werkzeug.utils import secure_filename
-from uuid import uuid4
-from datetime import datetime, timedelta
-from pathlib import Path
-from sqlalchemy import or_
-from . import db
-from .models import Student, Post, Like, Comment, Report
-from .moderation import assess
-from .extensions import limiter
-
-bp = Blueprint("main", __name__)
-
-def allowed_file(filename: str) -> bool:
-    if "." not in filename:
-        return False
-    ext = filename.rsplit(".", 1)[1].lower()
-    return ext in app.config["ALLOWED_EXTENSIONS"]
-
-def media_kind(filename: str):
-    if "." not in filename:
-        return None
-    ext = filename.rsplit(".", 1)[1].lower()
-    if ext in app.config["ALLOWED_IMAGE_EXTENSIONS"]:
-        return "image"
-    if ext in app.config["ALLOWED_VIDEO_EXTENSIONS"]:
-        return "video"
-    return None
-
-def get_current_user() -> Student | None:
-    uid = session.get("user_id")
-    return Student.query.get(uid) if uid else None
-
-def require_login():
-    if not session.get("user_id"):
-        flash("Devi essere registrato per questa azione.", "warning")
-        return False
-    return True
-
-def require_owner(post: Post):
-    uid = session.get("user_id")
-    if not uid or uid != post.author_id:
-        flash("Non sei autorizzato/a a modificare questo post.", "danger")
-        return False
-    return True
-
-def require_comment_owner(comment: Comment):
-    user = get_current_user()
-    if not user:
-        flash("Devi essere registrato per questa azione.", "warning")
-        return False
-    if user.id != comment.user_id and not can_moderate(user):
-        flash("Non sei autorizzato/a a modificare questo commento.", "danger")
-        return False
-    return True
-
-def is_muted(user: Student) -> bool:
-    return bool(user and user.mute_until and user.mute_until > datetime.utcnow())
-
-def can_moderate(user: Student | None) -> bool:
-    admins = [e.lower() for e in app.config.get("ADMIN_EMAILS", [])]
-    return bool(user and user.email and user.email.lower() in admins)
-
-def escalate_strike(user: Student):
-    user.strikes = (user.strikes or 0) + 1
-    if user.strikes >= 3 and not is_muted(user):
-        user.mute_until = datetime.utcnow() + timedelta(hours=24)
-
-@bp.app_context_processor
-def inject_globals():
-    user = get_current_user()
-    is_admin = can_moderate(user)
-    if is_admin:
-        pending_post_count = db.session.query(Post.id).filter(Post.moderation_status == "pending").count()
-        pending_comment_count = db.session.query(Comment.id).filter(Comment.moderation_status == "pending").count()
-    else:
-        pending_post_count = 0
-        pending_comment_count = 0
-    return {
-        "ctx_user": user,
-        "is_admin": is_admin,
-        "now": datetime.utcnow(),
-        "pending_post_count": pending_post_count,
-        "pending_comment_count": pending_comment_count,
-        "pending_total": pending_post_count + pending_comment_count,
-    }
-
-@bp.get("/")
-def root():
-    return redirect(url_for("main.public_feed"))
-
-@bp.route("/register", methods=["GET", "POST"])
-def register():
-    if request.method == "POST":
-        nome = request.form.get("nome") or ""
-        email = (request.form.get("email") or "").strip().lower() or None
-        corso = request.form.get("corso") or ""
-        programmi = request.form.get("programmi") or ""
-        img = request.files.get("immagine_profilo")
-
-        if not nome or not corso:
-            flash("Nome e Corso sono obbligatori.", "danger")
-            return render_template("register.html")
-
-        existing = Student.query.filter_by(email=email).first() if email else None
-
-        img_filename = None
-        if img and img.filename:
-            if not allowed_file(img.filename):
-                flash("Formato immagine non valido. Usa png, jpg, jpeg, gif o webp.", "danger")
-                return render_template("register.html")
-            ext = img.filename.rsplit(".", 1)[1].lower()
-            img_filename = f"{uuid4().hex}.{ext}"
-            up_dir = Path(app.config["UPLOAD_FOLDER"])
-            up_dir.mkdir(parents=True, exist_ok=True)
-            save_path = up_dir / secure_filename(img_filename)
-            img.save(save_path)
-            img_filename = f"uploads/{img_filename}"
-
-        if existing:
-            if not existing.immagine_profilo and img_filename:
-                existing.immagine_profilo = img_filename
-                db.session.commit()
-            session["user_id"] = existing.id
-            flash(f"Accesso effettuato! Bentornata/o {existing.nome}.", "success")
-            return redirect(url_for("main.public_feed"))
-
-        s = Student(nome=nome, email=email, corso=corso, programmi=programmi, immagine_profilo=img_filename)
-        db.session.add(s)
-        db.session.commit()
-        session["user_id"] = s.id
-        flash("Registrazione completata! Benvenutə nel social del corso 👋", "success")
-        return redirect(url_for("main.public_feed"))
-
-    return render_template("register.html")
-
-@bp.route("/login", methods=["GET", "POST"])
-def login():
-    if request.method == "POST":
-        email = (request.form.get("email") or "").strip().lower()
-        if not email:
-            flash("Inserisci la tua email.", "danger")
-            return render_template("login.html")
-        user = Student.query.filter_by(email=email).first()
-        if not user:
-            flash("Email non trovata. Registrati per creare un account.", "warning")
-            return redirect(url_for("main.register"))
-        session["user_id"] = user.id
-        flash(f"Ciao {user.nome}, accesso effettuato ✅", "success")
-        return redirect(url_for("main.public_feed"))
-    return render_template("login.html")
-
-@bp.route("/logout")
-def logout():
-    session.pop("user_id", None)
-    flash("Logout effettuato.", "info")
-    return redirect(url_for("main.public_feed"))
-
-@bp.get("/feed")
-def public_feed():
-    user = get_current_user()
-    posts = Post.query.order_by(Post.created_at.desc()).all()
-    return render_template("feed.html", posts=posts, current_user=user)
-
-@bp.route("/me", methods=["GET"])
-def my_feed():
-    if not session.get("user_id"):
-        flash("Per vedere la tua bacheca registrati o accedi.", "warning")
-        return redirect(url_for("main.register"))
-    me = Student.query.get(session["user_id"])
-    posts = Post.query.filter_by(author_id=me.id).order_by(Post.created_at.desc()).all()
-    return render_template("bacheca.html", me=me, posts=posts)
-
-@bp.route("/post/create", methods=["POST"])
-@limiter.limit("5 per 5 minutes")
-def create_post_form():
-    if not require_login():
-        return redirect(url_for("main.register"))
-
-    user = get_current_user()
-    if is_muted(user):
-        flash("Non puoi postare al momento (sei in mute temporaneo).", "danger")
-        return redirect(url_for("main.public_feed"))
-
-    content = (request.form.get("content") or "").strip() or None
-    image_url = request.form.get("image_url") or None
-    video_url = request.form.get("video_url") or None
-
-    media = request.files.get("media_file")
-    if media and media.filename:
-        kind = media_kind(media.filename)
-        if not kind:
-            flash("Formato file non supportato. Immagini: png/jpg/jpeg/gif/webp. Video: mp4/webm/mov/avi/mkv.", "danger")
-            return redirect(url_for("main.public_feed"))
-        ext = media.filename.rsplit(".", 1)[1].lower()
-        fname = f"{uuid4().hex}.{ext}"
-        up_dir = Path(app.config["UPLOAD_FOLDER"])
-        up_dir.mkdir(parents=True, exist_ok=True)
-        save_path = up_dir / secure_filename(fname)
-        media.save(save_path)
-        rel_path = f"uploads/{fname}"
-        if kind == "image":
-            image_url = rel_path
-            video_url = None
-        else:
-            video_url = rel_path
-            image_url = None
-
-    if not any([content, image_url, video_url]):
-        flash("Inserisci almeno del testo, un'immagine o un video.", "danger")
-        return redirect(url_for("main.public_feed"))
-
-    mod = assess(content or "")
-    status_map = {"approve": "approved", "pending": "pending", "reject": "rejected"}
-    status = status_map[mod.action]
-    is_visible = (status == "approved") and (not user.is_shadow_banned)
-
-    p = Post(
-        author_id=user.id,
-        content=content,
-        image_url=image_url,
-        video_url=video_url,
-        moderation_status=status,
-        toxicity_score=mod.score,
-        is_visible=is_visible,
-    )
-    db.session.add(p)
-
-    if mod.action == "reject":
-        escalate_strike(user)
-        flash("Il tuo post è stato rifiutato per linguaggio offensivo.", "danger")
-    elif mod.action == "pending":
-        flash("Il tuo post è in revisione.", "info")
-    else:
-        flash("Post pubblicato!", "success")
-
-    db.session.commit()
-    return redirect(request.referrer or url_for("main.public_feed"))
-
-@bp.route("/post/<int:post_id>/edit", methods=["GET", "POST"])
-def edit_post(post_id):
-    post = Post.query.get_or_404(post_id)
-    if not require_owner(post):
-        return redirect(url_for("main.public_feed"))
-
-    if request.method == "POST":
-        content = (request.form.get("content") or "").strip() or None
-        image_url = request.form.get("image_url") or None
-        video_url = request.form.get("video_url") or None
-
-        if not any([content, image_url, video_url]):
-            flash("Il post non può essere vuoto. Inserisci testo, immagine o video.", "danger")
-            return render_template("edit_post.html", post=post)
-
-        mod = assess(content or "")
-        status_map = {"approve": "approved", "pending": "pending", "reject": "rejected"}
-        status = status_map[mod.action]
-        user = get_current_user()
-        is_visible = (status == "approved") and (not (user and user.is_shadow_banned))
-
-        post.content = content
-        post.image_url = image_url
-        post.video_url = video_url
-        post.moderation_status = status
-        post.toxicity_score = mod.score
-        post.is_visible = is_visible
-
-        if mod.action == "reject":
-            escalate_strike(user)
-            flash("Modifica rifiutata per linguaggio offensivo.", "danger")
-        elif mod.action == "pending":
-            flash("Modifica inviata: post in revisione.", "info")
-        else:
-            flash("Post aggiornato ✅", "success")
-
-        db.session.commit()
-        return redirect(url_for("main.public_feed"))
-
-    return render_template("edit_post.html", post=post)
-
-@bp.post("/post/<int:post_id>/delete")
-def delete_post(post_id):
-    post = Post.query.get_or_404(post_id)
-    if not require_owner(post):
-        return redirect(url_for("main.public_feed"))
-    db.session.delete(post)
-    db.session.commit()
-    flash("Post eliminato 🗑️", "success")
-    return redirect(request.referrer or url_for("main.public_feed"))
-
-@bp.post("/like/<int:post_id>")
-def like_post_html(post_id):
-    if not require_login():
-        return redirect(url_for("main.register"))
-
-    user_id = session["user_id"]
-    post = Post.query.get_or_404(post_id)
-
-    like = Like.query.filter_by(user_id=user_id, post_id=post_id).first()
-    if like:
-        db.session.delete(like)
-        db.session.commit()
-        flash("Like rimosso.", "info")
-    else:
-        db.session.add(Like(user_id=user_id, post_id=post_id))
-        try:
-            db.session.commit()
-            flash("Like aggiunto ❤️", "success")
-        except Exception:
-            db.session.rollback()
-            flash("Hai già messo like a questo post.", "warning")
-
-    return redirect(request.referrer or url_for("main.public_feed"))
-
-@bp.post("/comment/<int:post_id>")
-@limiter.limit("10 per 5 minutes")
-def add_comment_html(post_id):
-    if not require_login():
-        return redirect(url_for("main.register"))
-
-    user = get_current_user()
-    if is_muted(user):
-        flash("Non puoi commentare al momento (sei in mute temporaneo).", "danger")
-        return redirect(url_for("main.public_feed"))
-
-    body = (request.form.get("body") or "").strip()
-    if not body:
-        flash("Il commento non può essere vuoto.", "danger")
-        return redirect(request.referrer or url_for("main.public_feed"))
-
-    mod = assess(body)
-    status_map = {"approve": "approved", "pending": "pending", "reject": "rejected"}
-    status = status_map[mod.action]
-    is_visible = (status == "approved") and (not user.is_shadow_banned)
-
-    c = Comment(
-        user_id=user.id,
-        post_id=post_id,
-        body=body,
-        moderation_status=status,
-        toxicity_score=mod.score,
-        is_visible=is_visible,
-    )
-    db.session.add(c)
-
-    if mod.action == "reject":
-        escalate_strike(user)
-        flash("Commento rifiutato per linguaggio offensivo.", "danger")
-    elif mod.action == "pending":
-        flash("Commento in revisione.", "info")
-    else:
-        flash("Commento pubblicato.", "success")
-
-    db.session.commit()
-    return redirect(request.referrer or url_for("main.public_feed"))
-
-@bp.route("/comment/<int:comment_id>/edit", methods=["GET", "POST"])
-def edit_comment(comment_id: int):
-    c = Comment.query.get_or_404(comment_id)
-    if not require_comment_owner(c):
-        return redirect(url_for("main.public_feed"))
-
-    if request.method == "POST":
-        body = (request.form.get("body") or "").strip()
-        if not body:
-            flash("Il commento non può essere vuoto.", "danger")
-            return redirect(request.referrer or url_for("main.public_feed"))
-
-        mod = assess(body)
-        status_map = {"approve": "approved", "pending": "pending", "reject": "rejected"}
-        status = status_map[mod.action]
-        is_visible = (status == "approved") and (not c.user.is_shadow_banned)
-
-        c.body = body
-        c.moderation_status = status
-        c.toxicity_score = mod.score
-        c.is_visible = is_visible
-
-        if mod.action == "reject":
-            escalate_strike(c.user)
-            flash("Modifica rifiutata per linguaggio offensivo.", "danger")
-        elif mod.action == "pending":
-            flash("Modifica inviata: commento in revisione.", "info")
-        else:
-            flash("Commento aggiornato ✅", "success")
-
-        db.session.commit()
-        return redirect(request.referrer or url_for("main.public_feed"))
-
-    return render_template("edit_comment.html", comment=c)
-
-@bp.post("/comment/<int:comment_id>/delete")
-def delete_comment(comment_id: int):
-    c = Comment.query.get_or_404(comment_id)
-    if not require_comment_owner(c):
-        return redirect(url_for("main.public_feed"))
-    db.session.delete(c)
-    db.session.commit()
-    flash("Commento eliminato 🗑️", "success")
-    return redirect(request.referrer or url_for("main.public_feed"))
-
-@bp.post("/report/post/<int:post_id>")
-def report_post(post_id: int):
-    if not require_login():
-        return redirect(url_for("main.register"))
-    reason = (request.form.get("reason") or "Segnalazione utente").strip()
-    r = Report(reporter_id=session["user_id"], post_id=post_id, reason=reason)
-    db.session.add(r)
-    db.session.commit()
-    flash("Grazie, la tua segnalazione è stata inviata.", "info")
-    return redirect(request.referrer or url_for("main.public_feed"))
-
-@bp.post("/report/comment/<int:comment_id>")
-def report_comment(comment_id: int):
-    if not require_login():
-        return redirect(url_for("main.register"))
-    reason = (request.form.get("reason") or "Segnalazione utente").strip()
-    r = Report(reporter_id=session["user_id"], comment_id=comment_id, reason=reason)
-    db.session.add(r)
-    db.session.commit()
-    flash("Grazie, la tua segnalazione è stata inviata.", "info")
-    return redirect(request.referrer or url_for("main.public_feed"))
-
-@bp.get("/admin/moderation/pending")
-def admin_pending_json():
-    user = get_current_user()
-    if not can_moderate(user):
-        flash("Area riservata allo staff.", "danger")
-        return redirect(url_for("main.public_feed"))
-
-    posts = Post.query.filter(Post.moderation_status == "pending").order_by(Post.created_at.desc()).all()
-    comments = Comment.query.filter(Comment.moderation_status == "pending").order_by(Comment.created_at.desc()).all()
-    data = {
-        "pending_posts": [p.to_dict() for p in posts],
-        "pending_comments": [
-            {
-                "id": c.id,
-                "post_id": c.post_id,
-                "user_id": c.user_id,
-                "body": c.body,
-                "created_at": c.created_at.isoformat() if c.created_at else None,
-                "toxicity_score": c.toxicity_score,
-                "moderation_status": c.moderation_status,
-                "is_visible": c.is_visible,
-            }
-            for c in comments
-        ],
-    }
-    return jsonify(data)
-
-@bp.get("/admin/moderation")
-def admin_moderation_html():
-    user = get_current_user()
-    if not can_moderate(user):
-        flash("Area riservata allo staff.", "danger")
-        return redirect(url_for("main.public_feed"))
-
-    pending_posts = Post.query.filter(Post.moderation_status == "pending").order_by(Post.created_at.desc()).all()
-    pending_comments = Comment.query.filter(Comment.moderation_status == "pending").order_by(Comment.created_at.desc()).all()
-
-    return render_template("admin_moderation.html", pending_posts=pending_posts, pending_comments=pending_comments)
-
-def _admin_require():
-    user = get_current_user()
-    if not can_moderate(user):
-        flash("Area riservata allo staff.", "danger")
-        return False
-    return True
-
-@bp.post("/admin/moderation/post/<int:post_id>/approve")
-def admin_approve_post(post_id: int):
-    if not _admin_require():
-        return redirect(url_for("main.public_feed"))
-    post = Post.query.get_or_404(post_id)
-    post.moderation_status = "approved"
-    post.is_visible = not (post.author and post.author.is_shadow_banned)
-    db.session.commit()
-    flash("Post approvato.", "success")
-    return redirect(request.referrer or url_for("main.admin_moderation_html"))
-
-@bp.post("/admin/moderation/post/<int:post_id>/reject")
-def admin_reject_post(post_id: int):
-    if not _admin_require():
-        return redirect(url_for("main.public_feed"))
-    post = Post.query.get_or_404(post_id)
-    post.moderation_status = "rejected"
-    post.is_visible = False
-    escalate_strike(post.author)
-    db.session.commit()
-    flash("Post rifiutato.", "warning")
-    return redirect(request.referrer or url_for("main.admin_moderation_html"))
-
-@bp.post("/admin/moderation/comment/<int:comment_id>/approve")
-def admin_approve_comment(comment_id: int):
-    if not _admin_require():
-        return redirect(url_for("main.public_feed"))
-    c = Comment.query.get_or_404(comment_id)
-    c.moderation_status = "approved"
-    c.is_visible = not (c.user and c.user.is_shadow_banned)
-    db.session.commit()
-    flash("Commento approvato.", "success")
-    return redirect(request.referrer or url_for("main.admin_moderation_html"))
-
-@bp.post("/admin/moderation/comment/<int:comment_id>/reject")
-def admin_reject_comment(comment_id: int):
-    if not _admin_require():
-        return redirect(url_for("main.public_feed"))
-    c = Comment.query.get_or_404(comment_id)
-    c.moderation_status = "rejected"
-    c.is_visible = False
-    escalate_strike(c.user)
-    db.session.commit()
-    flash("Commento rifiutato.", "warning")
-    return redirect(request.referrer or url_for("main.admin_moderation_html"))
-
-@bp.get("/api")
-def hello():
-    return "Social del corso: Flask è attivo ✅"
-
-@bp.post("/api/students")
-def create_student_api():
-    data = request.get_json(force=True)
-    s = Student(
-        nome=data.get("nome"),
-        email=(data.get("email") or "").strip().lower() or None,
-        corso=data.get("corso"),
-        programmi=data.get("programmi"),
-        immagine_profilo=data.get("immagine_profilo"),
-    )
-    db.session.add(s)
-    db.session.commit()
-    return jsonify({"id": s.id, "nome": s.nome}), 201
-
-@bp.post("/api/posts")
-def create_post_api():
-    data = request.get_json(force=True)
-    author_id = data["author_id"]
-    user = Student.query.get_or_404(author_id)
-
-    content = (data.get("content") or "").strip() or None
-    image_url = data.get("image_url")
-    video_url = data.get("video_url")
-
-    if not any([content, image_url, video_url]):
-        return jsonify({"error": "empty post"}), 400
-
-    mod = assess(content or "")
-    status_map = {"approve": "approved", "pending": "pending", "reject": "rejected"}
-    status = status_map[mod.action]
-    is_visible = (status == "approved") and (not user.is_shadow_banned)
-
-    p = Post(
-        author_id=author_id,
-        content=content,
-        image_url=image_url,
-        video_url=video_url,
-        moderation_status=status,
-        toxicity_score=mod.score,
-        is_visible=is_visible,
-    )
-    db.session.add(p)
-
-    if mod.action == "reject":
-        escalate_strike(user)
-
-    db.session.commit()
-    return jsonify(p.to_dict()), 201
-
-@bp.get("/api/posts")
-def list_posts_api():
-    posts = Post.query.order_by(Post.created_at.desc()).all()
-    return jsonify([p.to_dict() for p in posts])
-
-@bp.route("/api/posts/<int:post_id>", methods=["PUT", "PATCH"])
-def update_post_api(post_id):
-    data = request.get_json(force=True)
-    post = Post.query.get_or_404(post_id)
-    user_id = data.get("user_id")
-    if user_id is not None and user_id != post.author_id:
-        return jsonify({"error": "not allowed"}), 403
-
-    content = (data.get("content", post.content) or "").strip() or None
-    image_url = data.get("image_url", post.image_url)
-    video_url = data.get("video_url", post.video_url)
-
-    if not any([content, image_url, video_url]):
-        return jsonify({"error": "empty post"}), 400
-
-    mod = assess(content or "")
-    status_map = {"approve": "approved", "pending": "pending", "reject": "rejected"}
-    status = status_map[mod.action]
-    author = Student.query.get(post.author_id)
-    is_visible = (status == "approved") and (not (author and author.is_shadow_banned))
-
-    post.content = content
-    post.image_url = image_url
-    post.video_url = video_url
-    post.moderation_status = status
-    post.toxicity_score = mod.score
-    post.is_visible = is_visible
-
-    if mod.action == "reject":
-        escalate_strike(author)
-
-    db.session.commit()
-    return jsonify(post.to_dict())
-
-@bp.delete("/api/posts/<int:post_id>")
-def delete_post_api(post_id):
-    post = Post.query.get_or_404(post_id)
-    db.session.delete(post)
-    db.session.commit()
-    return jsonify({"deleted": True, "post_id": post_id})
-
-@bp.post("/api/posts/<int:post_id>/like/toggle")
-@limiter.limit("30 per 5 minutes")
-def api_toggle_like(post_id: int):
-    if not session.get("user_id"):
-        return jsonify({"error": "not authenticated"}), 401
-    user_id = session["user_id"]
-    post = Post.query.get_or_404(post_id)
-
-    existing = Like.query.filter_by(user_id=user_id, post_id=post_id).first()
-    if existing:
-        db.session.delete(existing)
-        db.session.commit()
-        return jsonify({"status": "unliked", "post_id": post_id, "user_id": user_id, "likes_count": len(post.likes)}), 200
-    else:
-        db.session.add(Like(user_id=user_id, post_id=post_id))
-        try:
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
-            return jsonify({"error": "like already exists"}), 409
-        return jsonify({"status": "liked", "post_id": post_id, "user_id": user_id, "likes_count": len(post.likes)}), 201
-
-@bp.get("/api/posts/<int:post_id>/like")
-def api_like_status(post_id: int):
-    post = Post.query.get_or_404(post_id)
-    uid = session.get("user_id")
-    liked_by_me = False
-    if uid:
-        liked_by_me = Like.query.filter_by(user_id=uid, post_id=post_id).first() is not None
-    return jsonify({"post_id": post_id, "likes_count": len(post.likes), "liked_by_me": liked_by_me})
+# app/routes.py
+import json
+from flask import (
+    Blueprint, request, jsonify, render_template,
+    redirect, url_for, session, flash, Response, get_flashed_messages,
+    stream_with_context, abort, current_app as app
+)
+from werkzeug.utils import secure_filename
+from uuid import uuid4
+from datetime import datetime, timedelta
+from pathlib import Path
+from sqlalchemy import or_, and_, func, case, update, select, not_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import joinedload
+from . import db
+from .models import (Student, Course, Post, Like, Comment, Report,
+                     ArchivedPost, ArchivedLike, ArchivedComment)
+from .moderation import assess
+from .extensions import limiter, bus, page_cache, like_buffer, trending
+from .querybudget import query_budget
+from .media import local_media, cleanup_after_commit, check_media_urls, MediaPathError
+from . import video, stats, courses, skills
+from .trending import TrendingError
+
+bp = Blueprint("main", __name__)
+
+def allowed_file(filename: str) -> bool:
+    if "." not in filename:
+        return False
+    ext = filename.rsplit(".", 1)[1].lower()
+    return ext in app.config["ALLOWED_EXTENSIONS"]
+
+def media_kind(filename: str):
+    if "." not in filename:
+        return None
+    ext = filename.rsplit(".", 1)[1].lower()
+    if ext in app.config["ALLOWED_IMAGE_EXTENSIONS"]:
+        return "image"
+    if ext in app.config["ALLOWED_VIDEO_EXTENSIONS"]:
+        return "video"
+    return None
+
+def get_current_user() -> Student | None:
+    uid = session.get("user_id")
+    return Student.query.get(uid) if uid else None
+
+def require_login():
+    if not session.get("user_id"):
+        flash("Devi essere registrato per questa azione.", "warning")
+        return False
+    return True
+
+def require_owner(post: Post):
+    uid = session.get("user_id")
+    if not uid or uid != post.author_id:
+        flash("Non sei autorizzato/a a modificare questo post.", "danger")
+        return False
+    return True
+
+def require_comment_owner(comment: Comment):
+    user = get_current_user()
+    if not user:
+        flash("Devi essere registrato per questa azione.", "warning")
+        return False
+    if user.id != comment.user_id and not can_moderate(user):
+        flash("Non sei autorizzato/a a modificare questo commento.", "danger")
+        return False
+    return True
+
+def is_muted(user: Student) -> bool:
+    return bool(user and user.mute_until and user.mute_until > datetime.utcnow())
+
+def can_moderate(user: Student | None) -> bool:
+    admins = [e.lower() for e in app.config.get("ADMIN_EMAILS", [])]
+    return bool(user and user.email and user.email.lower() in admins)
+
+STRIKES_BEFORE_MUTE = 3
+MUTE_DURATION = timedelta(hours=24)
+
+def escalate_strike(user: Student):
+    user.strikes = (user.strikes or 0) + 1
+    if user.strikes >= STRIKES_BEFORE_MUTE and not is_muted(user):
+        user.mute_until = datetime.utcnow() + MUTE_DURATION
+
+def escalate_strikes(counts: dict[int, int]):
+    """Versione aggregata di escalate_strike: {author_id: n_strike} in una sola UPDATE.
+    Stessa regola: mute di 24h se si arriva a 3 strike e non si è già in mute."""
+    if not counts:
+        return
+    now = datetime.utcnow()
+    added = case(counts, value=Student.id, else_=0)
+    new_strikes = func.coalesce(Student.strikes, 0) + added
+    db.session.execute(
+        update(Student)
+        .where(Student.id.in_(list(counts)))
+        .values(
+            strikes=new_strikes,
+            mute_until=case(
+                (and_(new_strikes >= STRIKES_BEFORE_MUTE,
+                      or_(Student.mute_until.is_(None), Student.mute_until <= now)),
+                 now + MUTE_DURATION),
+                else_=Student.mute_until,
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+def set_post_video(post: Post, video_url):
+    """Cambia il video del post: poster e versione per lo streaming vanno rifatti."""
+    if video_url != post.video_url:
+        post.video_url = video_url
+        post.video_stream_url = post.video_poster_url = post.video_status = None
+
+def post_media(post: Post) -> set:
+    return local_media(post.image_url, post.video_url, post.video_stream_url, post.video_poster_url)
+
+def pending_counts() -> tuple[int, int]:
+    pending_post_count = db.session.query(Post.id).filter(Post.moderation_status == "pending").count()
+    pending_comment_count = db.session.query(Comment.id).filter(Comment.moderation_status == "pending").count()
+    return pending_post_count, pending_comment_count
+
+def likes_count(post_id: int) -> int:
+    count = db.session.query(Like.id).filter(Like.post_id == post_id).count()
+    return count + like_buffer.deltas([post_id]).get(post_id, 0)
+
+def liked_by(user_id: int, post_id: int) -> bool:
+    pending = like_buffer.pending_state(user_id, post_id)
+    if pending is not None:
+        return pending
+    return Like.query.filter_by(user_id=user_id, post_id=post_id).first() is not None
+
+def toggle_like_buffered(user_id: int, post_id: int) -> tuple[bool, int]:
+    """Toggle in write-behind (app/likebuffer.py): nessuna scrittura su social.db qui."""
+    in_db = Like.query.filter_by(user_id=user_id, post_id=post_id).first() is not None
+    liked = like_buffer.toggle(user_id, post_id, in_db)
+    return liked, publish_like_count(post_id)
+
+# --- eventi live (da chiamare dopo il commit) ---
+def publish_pending_count() -> int:
+    posts, comments = pending_counts()
+    bus.publish("moderation_pending_count",
+                {"posts": posts, "comments": comments, "total": posts + comments},
+                audience="admin")
+    return posts + comments
+
+def publish_like_count(post_id: int) -> int:
+    count = likes_count(post_id)
+    bus.publish("like_count", {"post_id": post_id, "likes_count": count})
+    return count
+
+def publish_post(post: Post):
+    if post.is_visible:
+        bus.publish("post_created", {"post_id": post.id, "author_id": post.author_id})
+    elif post.moderation_status == "pending":
+        publish_pending_count()
+
+def publish_comment(c: Comment):
+    if c.is_visible:
+        bus.publish("comment_added", {"post_id": c.post_id, "comment_id": c.id})
+    elif c.moderation_status == "pending":
+        publish_pending_count()
+
+# --- risposte AJAX (progressive enhancement) ---
+def is_htmx() -> bool:
+    return request.headers.get("HX-Request") == "true"
+
+def wants_json() -> bool:
+    return request.accept_mimetypes.best_match(["text/html", "application/json"]) == "application/json"
+
+def wants_fragment() -> bool:
+    return is_htmx() or wants_json()
+
+def fragment_response(data: dict, html: str = "", status: int = 200):
+    """htmx riceve il frammento HTML, fetch/JSON i dati più i messaggi flash
+    (consumati qui, così non ricompaiono al prossimo caricamento di pagina)."""
+    messages = get_flashed_messages(with_categories=True)
+    if is_htmx():
+        return html, status
+    return jsonify({**data, "messages": messages}), status
+
+@bp.app_context_processor
+def inject_globals():
+    user = get_current_user()
+    is_admin = can_moderate(user)
+    if is_admin:
+        pending_post_count, pending_comment_count = pending_counts()
+    else:
+        pending_post_count = 0
+        pending_comment_count = 0
+    return {
+        "ctx_user": user,
+        "is_admin": is_admin,
+        "now": datetime.utcnow(),
+        "pending_post_count": pending_post_count,
+        "pending_comment_count": pending_comment_count,
+        "pending_total": pending_post_count + pending_comment_count,
+    }
+
+@bp.get("/")
+def root():
+    return redirect(url_for("main.public_feed"))
+
+@bp.route("/register", methods=["GET", "POST"])
+def register():
+    if request.method == "POST":
+        nome = request.form.get("nome") or ""
+        email = (request.form.get("email") or "").strip().lower() or None
+        corso = request.form.get("corso") or ""
+        programmi = request.form.get("programmi") or ""
+        img = request.files.get("immagine_profilo")
+
+        if not nome or not corso:
+            flash("Nome e Corso sono obbligatori.", "danger")
+            return render_template("register.html")
+
+        existing = Student.query.filter_by(email=email).first() if email else None
+
+        img_filename = None
+        if img and img.filename:
+            if not allowed_file(img.filename):
+                flash("Formato immagine non valido. Usa png, jpg, jpeg, gif o webp.", "danger")
+                return render_template("register.html")
+            ext = img.filename.rsplit(".", 1)[1].lower()
+            img_filename = f"{uuid4().hex}.{ext}"
+            up_dir = Path(app.config["UPLOAD_FOLDER"])
+            up_dir.mkdir(parents=True, exist_ok=True)
+            save_path = up_dir / secure_filename(img_filename)
+            img.save(save_path)
+            img_filename = f"uploads/{img_filename}"
+
+        if existing:
+            if not existing.immagine_profilo and img_filename:
+                existing.immagine_profilo = img_filename
+                db.session.commit()
+            session["user_id"] = existing.id
+            flash(f"Accesso effettuato! Bentornata/o {existing.nome}.", "success")
+            return redirect(url_for("main.public_feed"))
+
+        course = courses.ensure(corso)
+        s = Student(nome=nome, email=email, corso=corso, course_id=course.id if course else None,
+                    programmi=programmi, immagine_profilo=img_filename)
+        db.session.add(s)
+        db.session.flush()
+        skills.set_for(s)
+        db.session.commit()
+        session["user_id"] = s.id
+        flash("Registrazione completata! Benvenutə nel social del corso 👋", "success")
+        return redirect(url_for("main.public_feed"))
+
+    return render_template("register.html")
+
+@bp.route("/login", methods=["GET", "POST"])
+def login():
+    if request.method == "POST":
+        email = (request.form.get("email") or "").strip().lower()
+        if not email:
+            flash("Inserisci la tua email.", "danger")
+            return render_template("login.html")
+        user = Student.query.filter_by(email=email).first()
+        if not user:
+            flash("Email non trovata. Registrati per creare un account.", "warning")
+            return redirect(url_for("main.register"))
+        session["user_id"] = user.id
+        flash(f"Ciao {user.nome}, accesso effettuato ✅", "success")
+        return redirect(url_for("main.public_feed"))
+    return render_template("login.html")
+
+@bp.route("/logout")
+def logout():
+    session.pop("user_id", None)
+    flash("Logout effettuato.", "info")
+    return redirect(url_for("main.public_feed"))
+
+@bp.get("/feed")
+@query_budget(max_total=30)
+def public_feed():
+    user = get_current_user()
+
+    def render():
+        # i contenuti nascosti (pending, rifiutati, auto-nascosti) restano visibili solo all'autore
+        visible = or_(Post.is_visible.is_(True), Post.is_visible.is_(None))
+        if user:
+            visible = or_(visible, Post.author_id == user.id)
+        posts = (Post.query.filter(visible).options(joinedload(Post.author))
+                 .order_by(Post.created_at.desc()).all())
+        ids = [p.id for p in posts]
+        threads = latest_comments(ids, user, app.config["FEED_COMMENTS_PER_POST"])
+        trending_terms = trending.top("24h", app.config["TRENDING_SIDEBAR_SIZE"]) if trending.enabled else []
+        return render_template("feed.html", posts=posts, comment_threads=threads,
+                               like_counts=like_counts(ids), trending=trending_terms,
+                               current_user=user)
+
+    # la pagina dei visitatori anonimi è uguale per tutti (messaggi flash a parte)
+    if user is None and not session.get("_flashes"):
+        return page_cache.get_or_render("feed:public", render)
+    return render()
+
+@bp.get("/corso/<slug>/feed")
+@query_budget(max_total=30)
+def course_feed(slug):
+    """Feed di un corso, a pagine con cursore (?before=<created_at>_<id>)."""
+    course = Course.query.filter_by(slug=slug).first_or_404()
+    user = get_current_user()
+    before = request.args.get("before")
+    page_size = app.config["COURSE_FEED_PAGE_SIZE"]
+
+    def render():
+        visible = or_(Post.is_visible.is_(True), Post.is_visible.is_(None))
+        if user:
+            visible = or_(visible, Post.author_id == user.id)
+        # ix_posts_course_created: filtro e ordinamento dallo stesso indice
+        q = Post.query.filter(Post.course_id == course.id, visible).options(joinedload(Post.author))
+        cursor = _parse_feed_cursor(before)
+        if cursor:
+            created_at, post_id = cursor
+            q = q.filter(or_(Post.created_at < created_at,
+                             and_(Post.created_at == created_at, Post.id < post_id)))
+        posts = q.order_by(Post.created_at.desc(), Post.id.desc()).limit(page_size + 1).all()
+        next_cursor = _feed_cursor(posts[page_size - 1]) if len(posts) > page_size else None
+        posts = posts[:page_size]
+        ids = [p.id for p in posts]
+        threads = latest_comments(ids, user, app.config["FEED_COMMENTS_PER_POST"])
+        return render_template("feed.html", posts=posts, comment_threads=threads,
+                               like_counts=like_counts(ids), course=course,
+                               next_cursor=next_cursor, current_user=user)
+
+    # in cache solo la prima pagina per i visitatori anonimi (i cursori sono infiniti)
+    if user is None and before is None and not session.get("_flashes"):
+        return page_cache.get_or_render(courses.cache_prefix(course.id), render)
+    return render()
+
+def _feed_cursor(item) -> str:
+    """Cursore (created_at, id) per le liste dal più recente (post, commenti)."""
+    return f"{item.created_at.isoformat()}_{item.id}"
+
+def _parse_feed_cursor(raw):
+    try:
+        created_at, item_id = raw.split("_")
+        return datetime.fromisoformat(created_at), int(item_id)
+    except (AttributeError, ValueError):
+        return None
+
+def comment_visible(user: Student | None):
+    """Commenti visibili a user: approvati, più i propri ancora in revisione."""
+    visible = or_(Comment.is_visible.is_(True), Comment.is_visible.is_(None))
+    if user:
+        visible = or_(visible, and_(Comment.user_id == user.id, Comment.moderation_status == "pending"))
+    return visible
+
+def latest_comments(post_ids, user: Student | None, per_post: int) -> dict[int, dict]:
+    """Gli ultimi per_post commenti visibili di ogni post, per tutta la pagina in una query
+    (ROW_NUMBER() per post). {post_id: {"comments": [...], "more": bool, "before": cursore}}"""
+    if not post_ids:
+        return {}
+    newest_first = (Comment.created_at.desc(), Comment.id.desc())
+    ranked = (
+        select(
+            Comment.id,
+            func.row_number().over(partition_by=Comment.post_id, order_by=newest_first).label("rn"),
+            func.count().over(partition_by=Comment.post_id).label("total"),
+        )
+        .where(Comment.post_id.in_(post_ids), comment_visible(user))
+        .subquery()
+    )
+    rows = db.session.execute(
+        select(Comment, ranked.c.total)
+        .join(ranked, ranked.c.id == Comment.id)
+        .where(ranked.c.rn <= per_post)
+        .options(joinedload(Comment.user))
+        .order_by(Comment.post_id, Comment.created_at, Comment.id)
+    ).all()
+    threads = {}
+    for c, total in rows:
+        thread = threads.setdefault(c.post_id, {"comments": [], "more": total > per_post})
+        thread["comments"].append(c)
+    for thread in threads.values():
+        thread["before"] = _feed_cursor(thread["comments"][0])
+    return threads
+
+def like_counts(post_ids) -> dict[int, int]:
+    """{post_id: n_like} con una sola query (al posto di post.likes|length per ogni post)."""
+    if not post_ids:
+        return {}
+    rows = (
+        db.session.query(Like.post_id, func.count(Like.id))
+        .filter(Like.post_id.in_(post_ids))
+        .group_by(Like.post_id)
+    )
+    counts = {post_id: 0 for post_id in post_ids} | dict(rows.all())
+    for post_id, delta in like_buffer.deltas(post_ids).items():
+        counts[post_id] += delta
+    return counts
+
+def comment_counts(post_ids) -> dict[int, int]:
+    """{post_id: n_commenti} con una sola query (tutti gli stati, come post.comments)."""
+    if not post_ids:
+        return {}
+    rows = (
+        db.session.query(Comment.post_id, func.count(Comment.id))
+        .filter(Comment.post_id.in_(post_ids))
+        .group_by(Comment.post_id)
+    )
+    return {post_id: 0 for post_id in post_ids} | dict(rows.all())
+
+@bp.route("/me", methods=["GET"])
+@query_budget(max_total=10)
+def my_feed():
+    if not session.get("user_id"):
+        flash("Per vedere la tua bacheca registrati o accedi.", "warning")
+        return redirect(url_for("main.register"))
+    me = Student.query.get(session["user_id"])
+
+    # una pagina per volta, a cursore (più recenti prima); i totali da student_stats
+    page_size = app.config["MY_FEED_PAGE_SIZE"]
+    before = request.args.get("before")
+    q = Post.query.filter(Post.author_id == me.id)
+    cursor = _parse_feed_cursor(before)
+    if cursor:
+        created_at, post_id = cursor
+        q = q.filter(or_(Post.created_at < created_at,
+                         and_(Post.created_at == created_at, Post.id < post_id)))
+    posts = q.order_by(Post.created_at.desc(), Post.id.desc()).limit(page_size + 1).all()
+    next_cursor = _feed_cursor(posts[page_size - 1]) if len(posts) > page_size else None
+    posts = posts[:page_size]
+
+    return render_template(
+        "bacheca.html",
+        me=me,
+        posts=posts,
+        stats=stats.get(me.id),
+        like_counts=like_counts([p.id for p in posts]),
+        before=before,
+        next_cursor=next_cursor,
+    )
+
+def _visible_to(item, user, owner_id) -> bool:
+    return item.is_visible is not False or (user is not None and user.id == owner_id)
+
+@bp.get("/post/<int:post_id>")
+@query_budget(max_total=10)
+def post_detail(post_id: int):
+    """Permalink: il post dalle tabelle calde o, se archiviato, dall'archivio (sola lettura)."""
+    user = get_current_user()
+    post = db.session.get(Post, post_id)
+    archived = post is None
+    if archived:
+        post = db.session.get(ArchivedPost, post_id)
+    if post is None or not _visible_to(post, user, post.author_id):
+        abort(404)
+    comment_model, like_model = (ArchivedComment, ArchivedLike) if archived else (Comment, Like)
+
+    comments = [
+        c for c in (
+            comment_model.query.filter(comment_model.post_id == post_id)
+            .options(joinedload(comment_model.user))
+            .order_by(comment_model.created_at)
+        )
+        if _visible_to(c, user, c.user_id)
+    ]
+    if archived:
+        likes = db.session.query(like_model.id).filter(like_model.post_id == post_id).count()
+    else:
+        likes = likes_count(post_id)
+    return render_template("post.html", p=post, archived=archived, comments=comments,
+                           likes_count=likes, current_user=user)
+
+@bp.get("/archivio")
+@query_budget(max_total=10)
+def archived_feed():
+    """I post più vecchi, spostati nell'archivio (app/archive.py); pagine a cursore."""
+    page_size = app.config["ARCHIVE_PAGE_SIZE"]
+    before = request.args.get("before")
+    q = (
+        ArchivedPost.query
+        .filter(or_(ArchivedPost.is_visible.is_(True), ArchivedPost.is_visible.is_(None)))
+        .options(joinedload(ArchivedPost.author))
+    )
+    cursor = _parse_feed_cursor(before)
+    if cursor:
+        created_at, post_id = cursor
+        q = q.filter(or_(ArchivedPost.created_at < created_at,
+                         and_(ArchivedPost.created_at == created_at, ArchivedPost.id < post_id)))
+    posts = q.order_by(ArchivedPost.created_at.desc(), ArchivedPost.id.desc()).limit(page_size + 1).all()
+    next_cursor = _feed_cursor(posts[page_size - 1]) if len(posts) > page_size else None
+    posts = posts[:page_size]
+
+    ids = [p.id for p in posts]
+    counts = {}
+    for model, key in ((ArchivedLike, "likes"), (ArchivedComment, "comments")):
+        rows = (db.session.query(model.post_id, func.count(model.id))
+                .filter(model.post_id.in_(ids)).group_by(model.post_id)) if ids else []
+        for post_id, n in rows:
+            counts.setdefault(post_id, {})[key] = n
+    return render_template("archive.html", posts=posts, counts=counts,
+                           before=before, next_cursor=next_cursor)
+
+@bp.route("/post/create", methods=["POST"])
+@limiter.limit(lambda: app.config["RATELIMIT_POST_CREATE"])
+def create_post_form():
+    if not require_login():
+        return redirect(url_for("main.register"))
+
+    user = get_current_user()
+    if is_muted(user):
+        flash("Non puoi postare al momento (sei in mute temporaneo).", "danger")
+        return redirect(url_for("main.public_feed"))
+
+    content = (request.form.get("content") or "").strip() or None
+    image_url = request.form.get("image_url") or None
+    video_url = request.form.get("video_url") or None
+    try:
+        check_media_urls(image_url, video_url)
+    except MediaPathError as e:
+        abort(400, description=str(e))
+
+    media = request.files.get("media_file")
+    if media and media.filename:
+        kind = media_kind(media.filename)
+        if not kind:
+            flash("Formato file non supportato. Immagini: png/jpg/jpeg/gif/webp. Video: mp4/webm/mov/avi/mkv.", "danger")
+            return redirect(url_for("main.public_feed"))
+        ext = media.filename.rsplit(".", 1)[1].lower()
+        fname = f"{uuid4().hex}.{ext}"
+        up_dir = Path(app.config["UPLOAD_FOLDER"])
+        up_dir.mkdir(parents=True, exist_ok=True)
+        save_path = up_dir / secure_filename(fname)
+        media.save(save_path)
+        rel_path = f"uploads/{fname}"
+        if kind == "image":
+            image_url = rel_path
+            video_url = None
+        else:
+            video_url = rel_path
+            image_url = None
+
+    if not any([content, image_url, video_url]):
+        flash("Inserisci almeno del testo, un'immagine o un video.", "danger")
+        return redirect(url_for("main.public_feed"))
+
+    mod = assess(content or "")
+    status_map = {"approve": "approved", "pending": "pending", "reject": "rejected"}
+    status = status_map[mod.action]
+    is_visible = (status == "approved") and (not user.is_shadow_banned)
+
+    p = Post(
+        author_id=user.id,
+        course_id=user.course_id,
+        content=content,
+        image_url=image_url,
+        video_url=video_url,
+        moderation_status=status,
+        toxicity_score=mod.score,
+        moderation_priority=mod.priority,
+        is_visible=is_visible,
+    )
+    db.session.add(p)
+    stats.bump(p.author_id, posts=1)
+
+    if mod.action == "reject":
+        escalate_strike(user)
+        flash("Il tuo post è stato rifiutato per linguaggio offensivo.", "danger")
+    elif mod.action == "pending":
+        flash("Il tuo post è in revisione.", "info")
+    else:
+        flash("Post pubblicato!", "success")
+
+    db.session.commit()
+    video.enqueue(p.id, p.video_url)
+    publish_post(p)
+    return redirect(request.referrer or url_for("main.public_feed"))
+
+@bp.route("/post/<int:post_id>/edit", methods=["GET", "POST"])
+def edit_post(post_id):
+    post = Post.query.get_or_404(post_id)
+    if not require_owner(post):
+        return redirect(url_for("main.public_feed"))
+
+    if request.method == "POST":
+        content = (request.form.get("content") or "").strip() or None
+        image_url = request.form.get("image_url") or None
+        video_url = request.form.get("video_url") or None
+
+        if not any([content, image_url, video_url]):
+            flash("Il post non può essere vuoto. Inserisci testo, immagine o video.", "danger")
+            return render_template("edit_post.html", post=post)
+        try:
+            check_media_urls(image_url, video_url)
+        except MediaPathError as e:
+            flash(str(e), "danger")
+            return render_template("edit_post.html", post=post), 400
+
+        mod = assess(content or "", ref=("post", post.id))
+        status_map = {"approve": "approved", "pending": "pending", "reject": "rejected"}
+        status = status_map[mod.action]
+        user = get_current_user()
+        is_visible = (status == "approved") and (not (user and user.is_shadow_banned))
+
+        post.content = content
+        post.image_url = image_url
+        set_post_video(post, video_url)
+        post.moderation_status = status
+        post.toxicity_score = mod.score
+        post.moderation_priority = mod.priority
+        post.is_visible = is_visible
+
+        if mod.action == "reject":
+            escalate_strike(user)
+            flash("Modifica rifiutata per linguaggio offensivo.", "danger")
+        elif mod.action == "pending":
+            flash("Modifica inviata: post in revisione.", "info")
+        else:
+            flash("Post aggiornato ✅", "success")
+
+        db.session.commit()
+        if post.video_status is None:
+            video.enqueue(post.id, post.video_url)
+        if status == "pending":
+            publish_pending_count()
+        return redirect(url_for("main.public_feed"))
+
+    return render_template("edit_post.html", post=post)
+
+@bp.post("/post/<int:post_id>/delete")
+def delete_post(post_id):
+    post = Post.query.get_or_404(post_id)
+    if not require_owner(post):
+        return redirect(url_for("main.public_feed"))
+    media = post_media(post)
+    stats.post_removed(post)
+    # like/commenti/segnalazioni li elimina il DB (ON DELETE CASCADE)
+    db.session.delete(post)
+    db.session.commit()
+    cleanup_after_commit(media)
+    flash("Post eliminato 🗑️", "success")
+    return redirect(request.referrer or url_for("main.public_feed"))
+
+@bp.post("/like/<int:post_id>")
+def like_post_html(post_id):
+    if not require_login():
+        if wants_fragment():
+            return fragment_response({"error": "not authenticated"}, status=401)
+        return redirect(url_for("main.register"))
+
+    user_id = session["user_id"]
+    post = Post.query.get_or_404(post_id)
+
+    like = None if like_buffer.enabled else Like.query.filter_by(user_id=user_id, post_id=post_id).first()
+    if like_buffer.enabled:
+        liked, count = toggle_like_buffered(user_id, post_id)
+        flash("Like aggiunto ❤️" if liked else "Like rimosso.", "success" if liked else "info")
+    elif like:
+        db.session.delete(like)
+        stats.bump(post.author_id, likes=-1)
+        db.session.commit()
+        count = publish_like_count(post_id)
+        liked = False
+        flash("Like rimosso.", "info")
+    else:
+        db.session.add(Like(user_id=user_id, post_id=post_id))
+        liked = True
+        try:
+            # dentro il try: l'autoflush di bump() può già violare il vincolo unico
+            stats.bump(post.author_id, likes=1)
+            db.session.commit()
+            count = publish_like_count(post_id)
+            flash("Like aggiunto ❤️", "success")
+        except Exception:
+            db.session.rollback()
+            count = likes_count(post_id)
+            flash("Hai già messo like a questo post.", "warning")
+
+    if wants_fragment():
+        html = render_template("_like_button.html", post_id=post_id, likes_count=count) if is_htmx() else ""
+        return fragment_response({"post_id": post_id, "liked": liked, "likes_count": count}, html)
+    return redirect(request.referrer or url_for("main.public_feed"))
+
+@bp.post("/comment/<int:post_id>")
+@limiter.limit(lambda: app.config["RATELIMIT_COMMENT"])
+def add_comment_html(post_id):
+    if not require_login():
+        if wants_fragment():
+            return fragment_response({"error": "not authenticated"}, status=401)
+        return redirect(url_for("main.register"))
+
+    user = get_current_user()
+    if is_muted(user):
+        flash("Non puoi commentare al momento (sei in mute temporaneo).", "danger")
+        if wants_fragment():
+            return fragment_response({"error": "muted"}, status=403)
+        return redirect(url_for("main.public_feed"))
+
+    body = (request.form.get("body") or "").strip()
+    if not body:
+        flash("Il commento non può essere vuoto.", "danger")
+        if wants_fragment():
+            return fragment_response({"error": "empty comment"}, status=400)
+        return redirect(request.referrer or url_for("main.public_feed"))
+
+    mod = assess(body)
+    status_map = {"approve": "approved", "pending": "pending", "reject": "rejected"}
+    status = status_map[mod.action]
+    is_visible = (status == "approved") and (not user.is_shadow_banned)
+
+    c = Comment(
+        user_id=user.id,
+        post_id=post_id,
+        body=body,
+        moderation_status=status,
+        toxicity_score=mod.score,
+        moderation_priority=mod.priority,
+        is_visible=is_visible,
+    )
+    db.session.add(c)
+    stats.bump_post_author(post_id, comments=1)
+
+    if mod.action == "reject":
+        escalate_strike(user)
+        flash("Commento rifiutato per linguaggio offensivo.", "danger")
+    elif mod.action == "pending":
+        flash("Commento in revisione.", "info")
+    else:
+        flash("Commento pubblicato.", "success")
+
+    db.session.commit()
+    publish_comment(c)
+    if wants_fragment():
+        # l'autore vede subito anche il proprio commento in revisione
+        show = c.is_visible or status == "pending"
+        html = render_template("_comment.html", c=c, uid=user.id) if show else ""
+        return fragment_response(
+            {"post_id": post_id, "comment_id": c.id, "status": status, "html": html}, html
+        )
+    return redirect(request.referrer or url_for("main.public_feed"))
+
+@bp.route("/comment/<int:comment_id>/edit", methods=["GET", "POST"])
+def edit_comment(comment_id: int):
+    c = Comment.query.get_or_404(comment_id)
+    if not require_comment_owner(c):
+        return redirect(url_for("main.public_feed"))
+
+    if request.method == "POST":
+        body = (request.form.get("body") or "").strip()
+        if not body:
+            flash("Il commento non può essere vuoto.", "danger")
+            return redirect(request.referrer or url_for("main.public_feed"))
+
+        mod = assess(body, ref=("comment", c.id))
+        status_map = {"approve": "approved", "pending": "pending", "reject": "rejected"}
+        status = status_map[mod.action]
+        is_visible = (status == "approved") and (not c.user.is_shadow_banned)
+
+        c.body = body
+        c.moderation_status = status
+        c.toxicity_score = mod.score
+        c.moderation_priority = mod.priority
+        c.is_visible = is_visible
+
+        if mod.action == "reject":
+            escalate_strike(c.user)
+            flash("Modifica rifiutata per linguaggio offensivo.", "danger")
+        elif mod.action == "pending":
+            flash("Modifica inviata: commento in revisione.", "info")
+        else:
+            flash("Commento aggiornato ✅", "success")
+
+        db.session.commit()
+        if status == "pending":
+            publish_pending_count()
+        return redirect(request.referrer or url_for("main.public_feed"))
+
+    return render_template("edit_comment.html", comment=c)
+
+@bp.post("/comment/<int:comment_id>/delete")
+def delete_comment(comment_id: int):
+    c = Comment.query.get_or_404(comment_id)
+    if not require_comment_owner(c):
+        return redirect(url_for("main.public_feed"))
+    db.session.delete(c)
+    stats.bump_post_author(c.post_id, comments=-1)
+    db.session.commit()
+    flash("Commento eliminato 🗑️", "success")
+    return redirect(request.referrer or url_for("main.public_feed"))
+
+def add_report(model, target_field: str, target_id: int, reason: str) -> bool:
+    """Registra la segnalazione (una per utente e contenuto) e incrementa report_count.
+    Quando il contatore raggiunge REPORT_AUTO_HIDE_THRESHOLD un contenuto approvato
+    torna pending e viene nascosto. False se l'utente l'aveva già segnalato."""
+    inserted = db.session.execute(
+        sqlite_insert(Report)
+        .values(reporter_id=session["user_id"], reason=reason[:300],
+                created_at=datetime.utcnow(), handled=False, **{target_field: target_id})
+        .on_conflict_do_nothing()
+    ).rowcount
+    if not inserted:
+        return False
+
+    threshold = app.config["REPORT_AUTO_HIDE_THRESHOLD"]
+    values = {"report_count": model.report_count + 1}
+    if threshold > 0:
+        # scatta una volta sola, quando il contatore raggiunge la soglia
+        hide = and_(model.report_count + 1 == threshold, model.moderation_status == "approved")
+        values["moderation_status"] = case((hide, "pending"), else_=model.moderation_status)
+        values["is_visible"] = case((hide, False), else_=model.is_visible)
+    count, status = db.session.execute(
+        update(model)
+        .where(model.id == target_id)
+        .values(**values)
+        .returning(model.report_count, model.moderation_status)
+        .execution_options(synchronize_session=False)
+    ).one()
+    db.session.commit()
+    if count == threshold and status == "pending":
+        publish_pending_count()
+    return True
+
+def _report_done(added: bool):
+    if added:
+        flash("Grazie, la tua segnalazione è stata inviata.", "info")
+    else:
+        flash("Hai già segnalato questo contenuto.", "info")
+    return redirect(request.referrer or url_for("main.public_feed"))
+
+@bp.post("/report/post/<int:post_id>")
+def report_post(post_id: int):
+    if not require_login():
+        return redirect(url_for("main.register"))
+    Post.query.get_or_404(post_id)
+    reason = (request.form.get("reason") or "Segnalazione utente").strip()
+    return _report_done(add_report(Post, "post_id", post_id, reason))
+
+@bp.post("/report/comment/<int:comment_id>")
+def report_comment(comment_id: int):
+    if not require_login():
+        return redirect(url_for("main.register"))
+    Comment.query.get_or_404(comment_id)
+    reason = (request.form.get("reason") or "Segnalazione utente").strip()
+    return _report_done(add_report(Comment, "comment_id", comment_id, reason))
+
+# --- coda di moderazione: priorità più alta prima, poi i più vecchi ---
+def _queue_cursor(item) -> str:
+    return f"{item.moderation_priority or 0}_{item.created_at.isoformat()}_{item.id}"
+
+def _parse_queue_cursor(raw):
+    try:
+        score, created_at, item_id = raw.split("_")
+        return float(score), datetime.fromisoformat(created_at), int(item_id)
+    except (AttributeError, ValueError):
+        return None
+
+def moderation_queue(model, author_rel, after: str | None = None, limit: int = 50):
+    """Una pagina di elementi pending e il cursore per la successiva (None se finita).
+    Paginazione a cursore sull'indice ix_*_moderation_queue: ogni pagina costa uguale."""
+    q = (
+        model.query
+        .filter(model.moderation_status == "pending")
+        .options(joinedload(author_rel))
+        .order_by(model.moderation_priority.desc(), model.created_at, model.id)
+    )
+    cursor = _parse_queue_cursor(after)
+    if cursor:
+        priority, created_at, item_id = cursor
+        q = q.filter(
+            model.moderation_priority <= priority,
+            or_(
+                model.moderation_priority < priority,
+                model.created_at > created_at,
+                and_(model.created_at == created_at, model.id > item_id),
+            ),
+        )
+    items = q.limit(limit + 1).all()
+    next_cursor = _queue_cursor(items[limit - 1]) if len(items) > limit else None
+    return items[:limit], next_cursor
+
+def pending_post_dicts(posts) -> list[dict]:
+    ids = [p.id for p in posts]
+    likes, comments = like_counts(ids), comment_counts(ids)
+    return [p.to_dict(likes_count=likes[p.id], comments_count=comments[p.id]) for p in posts]
+
+def pending_comment_dict(c: Comment) -> dict:
+    return {
+        "id": c.id,
+        "post_id": c.post_id,
+        "user_id": c.user_id,
+        "user_nome": c.user.nome if c.user else None,
+        "body": c.body,
+        "created_at": c.created_at.isoformat() if c.created_at else None,
+        "toxicity_score": c.toxicity_score,
+        "moderation_status": c.moderation_status,
+        "is_visible": c.is_visible,
+    }
+
+@bp.get("/admin/moderation/pending")
+def admin_pending_json():
+    """JSON in streaming, in ordine di priorità. Senza `limit` scorre tutta la coda
+    a blocchi di MODERATION_PAGE_SIZE; con `limit` restituisce una pagina e i cursori
+    (`posts_after` / `comments_after`) per la successiva."""
+    user = get_current_user()
+    if not can_moderate(user):
+        flash("Area riservata allo staff.", "danger")
+        return redirect(url_for("main.public_feed"))
+
+    page_size = app.config["MODERATION_PAGE_SIZE"]
+    limit = request.args.get("limit", type=int)
+    sections = [
+        ("pending_posts", Post, Post.author, pending_post_dicts, request.args.get("posts_after")),
+        ("pending_comments", Comment, Comment.user,
+         lambda comments: [pending_comment_dict(c) for c in comments],
+         request.args.get("comments_after")),
+    ]
+
+    def generate():
+        for i, (key, model, author_rel, to_dicts, after) in enumerate(sections):
+            yield ("{" if i == 0 else ",") + json.dumps(key) + ":["
+            remaining = limit
+            first = True
+            while remaining is None or remaining > 0:
+                size = page_size if remaining is None else min(page_size, remaining)
+                items, after = moderation_queue(model, author_rel, after, size)
+                for item in to_dicts(items):
+                    yield ("" if first else ",") + json.dumps(item)
+                    first = False
+                # niente identity map che cresce con la coda
+                db.session.expunge_all()
+                if remaining is not None:
+                    remaining -= len(items)
+                if after is None:
+                    break
+            yield "]," + json.dumps(key + "_next") + ":" + json.dumps(after)
+        yield "}"
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+@bp.get("/admin/moderation")
+@query_budget(max_total=30)
+def admin_moderation_html():
+    user = get_current_user()
+    if not can_moderate(user):
+        flash("Area riservata allo staff.", "danger")
+        return redirect(url_for("main.public_feed"))
+
+    page_size = app.config["MODERATION_PAGE_SIZE"]
+    posts_after = request.args.get("posts_after")
+    comments_after = request.args.get("comments_after")
+    pending_posts, next_posts = moderation_queue(Post, Post.author, posts_after, page_size)
+    pending_comments, next_comments = moderation_queue(Comment, Comment.user, comments_after, page_size)
+
+    return render_template(
+        "admin_moderation.html",
+        pending_posts=pending_posts,
+        pending_comments=pending_comments,
+        posts_after=posts_after,
+        comments_after=comments_after,
+        next_posts=next_posts,
+        next_comments=next_comments,
+    )
+
+@bp.get("/admin/reports")
+@query_budget(max_total=30)
+def admin_reports_html():
+    """Contenuti più segnalati: letti da report_count (indicizzato), senza contare i Report."""
+    if not _admin_require():
+        return redirect(url_for("main.public_feed"))
+
+    limit = app.config["MODERATION_PAGE_SIZE"]
+    posts = (
+        Post.query.filter(Post.report_count > 0)
+        .options(joinedload(Post.author))
+        .order_by(Post.report_count.desc(), Post.id.desc())
+        .limit(limit).all()
+    )
+    comments = (
+        Comment.query.filter(Comment.report_count > 0)
+        .options(joinedload(Comment.user))
+        .order_by(Comment.report_count.desc(), Comment.id.desc())
+        .limit(limit).all()
+    )
+
+    # motivazioni delle segnalazioni, una sola query per tutti i contenuti in pagina
+    reasons = {}
+    rows = (
+        db.session.query(Report.post_id, Report.comment_id, Report.reason)
+        .filter(or_(Report.post_id.in_([p.id for p in posts]),
+                    Report.comment_id.in_([c.id for c in comments])))
+        .order_by(Report.created_at.desc())
+    )
+    for post_id, comment_id, reason in rows:
+        key = ("post", post_id) if post_id else ("comment", comment_id)
+        reasons.setdefault(key, [])
+        if reason not in reasons[key] and len(reasons[key]) < 3:
+            reasons[key].append(reason)
+
+    return render_template("admin_reports.html", reported_posts=posts,
+                           reported_comments=comments, reasons=reasons)
+
+@bp.get("/admin/export/<table>")
+def admin_export(table: str):
+    """Una tabella in formato Arrow IPC stream, a blocchi (?after_id= per l'incrementale)."""
+    if not _admin_require():
+        return redirect(url_for("main.public_feed"))
+    from . import export  # pyarrow solo quando serve, non all'avvio dei worker
+    if table not in export.TABLES:
+        return jsonify({"error": "unknown table", "tables": list(export.TABLES)}), 404
+    if export.pa is None:
+        return jsonify({"error": "pyarrow not installed"}), 501
+    after_id = request.args.get("after_id", 0, type=int)
+    chunks = export.stream_arrow(table, after_id, app.config["EXPORT_CHUNK_SIZE"])
+    return Response(
+        stream_with_context(chunks),
+        mimetype=export.ARROW_STREAM_MIMETYPE,
+        headers={"Content-Disposition": f'attachment; filename="{table}.arrows"'},
+    )
+
+def _admin_require():
+    user = get_current_user()
+    if not can_moderate(user):
+        flash("Area riservata allo staff.", "danger")
+        return False
+    return True
+
+def _admin_denied():
+    if wants_fragment():
+        return fragment_response({"error": "forbidden"}, status=403)
+    return redirect(url_for("main.public_feed"))
+
+def _moderation_done(kind: str, item_id: int, status: str, pending_total: int):
+    if wants_fragment():
+        return fragment_response({kind + "_id": item_id, "status": status, "pending_total": pending_total})
+    return redirect(request.referrer or url_for("main.admin_moderation_html"))
+
+@bp.post("/admin/moderation/post/<int:post_id>/approve")
+def admin_approve_post(post_id: int):
+    if not _admin_require():
+        return _admin_denied()
+    post = Post.query.get_or_404(post_id)
+    post.moderation_status = "approved"
+    post.is_visible = not (post.author and post.author.is_shadow_banned)
+    db.session.commit()
+    publish_post(post)
+    pending_total = publish_pending_count()
+    flash("Post approvato.", "success")
+    return _moderation_done("post", post_id, "approved", pending_total)
+
+@bp.post("/admin/moderation/post/<int:post_id>/reject")
+def admin_reject_post(post_id: int):
+    if not _admin_require():
+        return _admin_denied()
+    post = Post.query.get_or_404(post_id)
+    post.moderation_status = "rejected"
+    post.is_visible = False
+    escalate_strike(post.author)
+    db.session.commit()
+    pending_total = publish_pending_count()
+    flash("Post rifiutato.", "warning")
+    return _moderation_done("post", post_id, "rejected", pending_total)
+
+@bp.post("/admin/moderation/comment/<int:comment_id>/approve")
+def admin_approve_comment(comment_id: int):
+    if not _admin_require():
+        return _admin_denied()
+    c = Comment.query.get_or_404(comment_id)
+    c.moderation_status = "approved"
+    c.is_visible = not (c.user and c.user.is_shadow_banned)
+    db.session.commit()
+    publish_comment(c)
+    pending_total = publish_pending_count()
+    flash("Commento approvato.", "success")
+    return _moderation_done("comment", comment_id, "approved", pending_total)
+
+@bp.post("/admin/moderation/comment/<int:comment_id>/reject")
+def admin_reject_comment(comment_id: int):
+    if not _admin_require():
+        return _admin_denied()
+    c = Comment.query.get_or_404(comment_id)
+    c.moderation_status = "rejected"
+    c.is_visible = False
+    escalate_strike(c.user)
+    db.session.commit()
+    pending_total = publish_pending_count()
+    flash("Commento rifiutato.", "warning")
+    return _moderation_done("comment", comment_id, "rejected", pending_total)
+
+def recompute_author_visibility(model, author_col, author_id: int, banned: bool) -> int:
+    """Allinea is_visible dei contenuti di un autore al suo shadow-ban.
+    UPDATE a blocchi di SHADOW_BAN_CHUNK_SIZE righe, un commit per blocco:
+    il lock in scrittura su SQLite dura poco anche per gli utenti più prolifici."""
+    if banned:
+        # nasconde tutto ciò che oggi è visibile (NULL conta come visibile nel feed)
+        stale = or_(model.is_visible.is_(True), model.is_visible.is_(None))
+    else:
+        # torna visibile solo ciò che è approvato
+        stale = and_(model.moderation_status == "approved",
+                     or_(model.is_visible.is_(False), model.is_visible.is_(None)))
+    chunk = select(model.id).where(author_col == author_id, stale).limit(
+        app.config["SHADOW_BAN_CHUNK_SIZE"]
+    )
+    total = 0
+    while True:
+        result = db.session.execute(
+            update(model)
+            .where(model.id.in_(chunk.scalar_subquery()))
+            .values(is_visible=not banned)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        total += result.rowcount
+        if not result.rowcount:
+            return total
+
+def _set_shadow_ban(student_id: int, banned: bool):
+    if not _admin_require():
+        return _admin_denied()
+    student = Student.query.get_or_404(student_id)
+    # prima il flag: i nuovi contenuti creati nel frattempo lo leggono già
+    student.is_shadow_banned = banned
+    db.session.commit()
+    posts = recompute_author_visibility(Post, Post.author_id, student_id, banned)
+    comments = recompute_author_visibility(Comment, Comment.user_id, student_id, banned)
+
+    if banned:
+        flash(f"{student.nome} è in shadow-ban ({posts} post e {comments} commenti nascosti).", "warning")
+    else:
+        flash(f"Shadow-ban rimosso per {student.nome} ({posts} post e {comments} commenti di nuovo visibili).", "success")
+    if wants_fragment():
+        return fragment_response({"student_id": student_id, "is_shadow_banned": banned,
+                                  "posts": posts, "comments": comments})
+    return redirect(request.referrer or url_for("main.admin_moderation_html"))
+
+@bp.post("/admin/students/<int:student_id>/shadow-ban")
+def admin_shadow_ban(student_id: int):
+    return _set_shadow_ban(student_id, True)
+
+@bp.post("/admin/students/<int:student_id>/unban")
+def admin_shadow_unban(student_id: int):
+    return _set_shadow_ban(student_id, False)
+
+def _bulk_params():
+    """(azione, id, soglia); ValueError se ids o below_score non sono validi.
+    ids presente ma vuoto è un errore: non deve ricadere sulla selezione per soglia."""
+    data = request.get_json(silent=True) or {}
+    action = data.get("action") or request.form.get("action")
+    if "ids" in data:
+        ids = data["ids"]
+    elif "ids" in request.form:
+        ids = request.form.getlist("ids")
+    else:
+        ids = None
+    below = data.get("below_score", request.form.get("below_score") or None)
+    given = ids is not None
+    if given and not isinstance(ids, list):
+        raise ValueError("ids deve essere una lista di id")
+    try:
+        ids = [int(i) for i in ids] if given else []
+        below = float(below) if below is not None else None
+    except (TypeError, ValueError):
+        raise ValueError("ids e below_score devono essere numeri")
+    if given and not ids:
+        raise ValueError("ids non può essere vuoto")
+    if below is not None and not 0 <= below <= 1:
+        raise ValueError("below_score deve essere tra 0 e 1")
+    return action, ids, below
+
+def bulk_moderate(model, author_col, action: str, ids: list[int],
+                  below_score: float | None) -> tuple[int, list[tuple]]:
+    """Approva/rifiuta i pending selezionati (per id o per score) con UPDATE set-based.
+    Restituisce (righe aggiornate, [(testo, created_at)] dei contenuti diventati visibili):
+    l'UPDATE non passa dagli hook della Session, i termini di tendenza li conta il chiamante."""
+    filters = [model.moderation_status == "pending"]
+    if ids:
+        filters.append(model.id.in_(ids))
+    elif below_score is not None:
+        filters.append(model.toxicity_score < below_score)
+    else:
+        return 0, []
+
+    if action == "reject":
+        strikes = dict(
+            db.session.query(author_col, func.count(model.id))
+            .filter(*filters)
+            .group_by(author_col)
+            .all()
+        )
+        values = {"moderation_status": "rejected", "is_visible": False}
+    else:
+        strikes = {}
+        banned = select(Student.is_shadow_banned).where(Student.id == author_col).scalar_subquery()
+        values = {"moderation_status": "approved", "is_visible": not_(func.coalesce(banned, False))}
+
+    text_col = model.content if model is Post else model.body
+    rows = db.session.execute(
+        update(model).where(*filters).values(**values)
+        .returning(text_col, model.created_at, model.is_visible)
+        .execution_options(synchronize_session=False)
+    ).all()
+    escalate_strikes(strikes)
+    return len(rows), [(text, created_at) for text, created_at, visible in rows if visible]
+
+def _bulk_moderation_view(model, author_col, label: str):
+    if not _admin_require():
+        return _admin_denied()
+    try:
+        action, ids, below_score = _bulk_params()
+    except ValueError as e:
+        if wants_fragment():
+            return fragment_response({"error": str(e)}, status=400)
+        flash(f"Parametri non validi: {e}.", "danger")
+        return redirect(url_for("main.admin_moderation_html"))
+    if action not in ("approve", "reject"):
+        if wants_fragment():
+            return fragment_response({"error": "invalid action"}, status=400)
+        flash("Azione non valida.", "danger")
+        return redirect(url_for("main.admin_moderation_html"))
+
+    n, visible = bulk_moderate(model, author_col, action, ids, below_score)
+    db.session.commit()
+    trending.record_quietly(visible)
+    pending_total = publish_pending_count()
+    verb = "approvati" if action == "approve" else "rifiutati"
+    flash(f"{n} {label} {verb}.", "success" if action == "approve" else "warning")
+    if wants_fragment():
+        return fragment_response({"action": action, "updated": n, "pending_total": pending_total})
+    return redirect(request.referrer or url_for("main.admin_moderation_html"))
+
+@bp.post("/admin/moderation/posts/bulk")
+def admin_bulk_posts():
+    return _bulk_moderation_view(Post, Post.author_id, "post")
+
+@bp.post("/admin/moderation/comments/bulk")
+def admin_bulk_comments():
+    return _bulk_moderation_view(Comment, Comment.user_id, "commenti")
+
+@bp.get("/api")
+def hello():
+    return "Social del corso: Flask è attivo ✅"
+
+@bp.post("/api/students")
+def create_student_api():
+    data = request.get_json(force=True)
+    course = courses.ensure(data.get("corso") or "")
+    s = Student(
+        nome=data.get("nome"),
+        email=(data.get("email") or "").strip().lower() or None,
+        corso=data.get("corso"),
+        course_id=course.id if course else None,
+        programmi=data.get("programmi"),
+        immagine_profilo=data.get("immagine_profilo"),
+    )
+    db.session.add(s)
+    db.session.flush()
+    skills.set_for(s)
+    db.session.commit()
+    return jsonify({"id": s.id, "nome": s.nome}), 201
+
+@bp.get("/api/students")
+@query_budget(max_total=6)
+def api_students():
+    """Elenco studenti, filtrabile per competenze (tutte): ?skill=react&skill=python,
+    a pagine con ?after=<id>&limit=N."""
+    names = request.args.getlist("skill")
+    if len(names) > app.config["STUDENTS_MAX_SKILLS"]:
+        return jsonify({"error": f"at most {app.config['STUDENTS_MAX_SKILLS']} skills"}), 400
+    limit = min(max(request.args.get("limit", app.config["STUDENTS_PAGE_SIZE"], type=int), 1), 100)
+    students, next_cursor = skills.search(names, request.args.get("after", type=int), limit)
+    return jsonify({
+        "students": [{
+            "id": s.id,
+            "nome": s.nome,
+            "corso": s.course.nome if s.course else s.corso,
+            "course_slug": s.course.slug if s.course else None,
+            "skills": sorted(k.nome for k in s.skills),
+        } for s in students],
+        "next": next_cursor,
+    })
+
+@bp.post("/api/posts")
+def create_post_api():
+    data = request.get_json(force=True)
+    author_id = data["author_id"]
+    user = Student.query.get_or_404(author_id)
+
+    content = (data.get("content") or "").strip() or None
+    image_url = data.get("image_url")
+    video_url = data.get("video_url")
+
+    if not any([content, image_url, video_url]):
+        return jsonify({"error": "empty post"}), 400
+    try:
+        check_media_urls(image_url, video_url)
+    except MediaPathError as e:
+        return jsonify({"error": str(e)}), 400
+
+    mod = assess(content or "")
+    status_map = {"approve": "approved", "pending": "pending", "reject": "rejected"}
+    status = status_map[mod.action]
+    is_visible = (status == "approved") and (not user.is_shadow_banned)
+
+    p = Post(
+        author_id=author_id,
+        course_id=user.course_id,
+        content=content,
+        image_url=image_url,
+        video_url=video_url,
+        moderation_status=status,
+        toxicity_score=mod.score,
+        moderation_priority=mod.priority,
+        is_visible=is_visible,
+    )
+    db.session.add(p)
+    stats.bump(p.author_id, posts=1)
+
+    if mod.action == "reject":
+        escalate_strike(user)
+
+    db.session.commit()
+    video.enqueue(p.id, p.video_url)
+    publish_post(p)
+    return jsonify(p.to_dict()), 201
+
+@bp.get("/api/posts")
+@query_budget(max_total=10)
+def list_posts_api():
+    # autore in join, like e commenti contati con una query raggruppata ciascuno:
+    # nessuna riga di likes/comments caricata come oggetto
+    posts = Post.query.options(joinedload(Post.author)).order_by(Post.created_at.desc()).all()
+    ids = [p.id for p in posts]
+    likes, comments = like_counts(ids), comment_counts(ids)
+    return jsonify([p.to_dict(likes_count=likes[p.id], comments_count=comments[p.id]) for p in posts])
+
+@bp.route("/api/posts/<int:post_id>", methods=["PUT", "PATCH"])
+def update_post_api(post_id):
+    data = request.get_json(force=True)
+    post = Post.query.get_or_404(post_id)
+    user_id = data.get("user_id")
+    if user_id is not None and user_id != post.author_id:
+        return jsonify({"error": "not allowed"}), 403
+
+    content = (data.get("content", post.content) or "").strip() or None
+    image_url = data.get("image_url", post.image_url)
+    video_url = data.get("video_url", post.video_url)
+
+    if not any([content, image_url, video_url]):
+        return jsonify({"error": "empty post"}), 400
+    try:
+        check_media_urls(image_url, video_url)
+    except MediaPathError as e:
+        return jsonify({"error": str(e)}), 400
+
+    mod = assess(content or "", ref=("post", post.id))
+    status_map = {"approve": "approved", "pending": "pending", "reject": "rejected"}
+    status = status_map[mod.action]
+    author = Student.query.get(post.author_id)
+    is_visible = (status == "approved") and (not (author and author.is_shadow_banned))
+
+    post.content = content
+    post.image_url = image_url
+    set_post_video(post, video_url)
+    post.moderation_status = status
+    post.toxicity_score = mod.score
+    post.moderation_priority = mod.priority
+    post.is_visible = is_visible
+
+    if mod.action == "reject":
+        escalate_strike(author)
+
+    db.session.commit()
+    if post.video_status is None:
+        video.enqueue(post.id, post.video_url)
+    if status == "pending":
+        publish_pending_count()
+    return jsonify(post.to_dict(likes_count=likes_count(post.id)))
+
+@bp.delete("/api/posts/<int:post_id>")
+def delete_post_api(post_id):
+    post = Post.query.get_or_404(post_id)
+    media = post_media(post)
+    stats.post_removed(post)
+    db.session.delete(post)
+    db.session.commit()
+    cleanup_after_commit(media)
+    return jsonify({"deleted": True, "post_id": post_id})
+
+@bp.post("/api/posts/<int:post_id>/like/toggle")
+@limiter.limit(lambda: app.config["RATELIMIT_LIKE_TOGGLE"])
+def api_toggle_like(post_id: int):
+    if not session.get("user_id"):
+        return jsonify({"error": "not authenticated"}), 401
+    user_id = session["user_id"]
+    post = Post.query.get_or_404(post_id)
+
+    if like_buffer.enabled:
+        liked, count = toggle_like_buffered(user_id, post_id)
+        return jsonify({"status": "liked" if liked else "unliked", "post_id": post_id,
+                        "user_id": user_id, "likes_count": count}), 201 if liked else 200
+
+    existing = Like.query.filter_by(user_id=user_id, post_id=post_id).first()
+    if existing:
+        db.session.delete(existing)
+        stats.bump(post.author_id, likes=-1)
+        db.session.commit()
+        count = publish_like_count(post_id)
+        return jsonify({"status": "unliked", "post_id": post_id, "user_id": user_id, "likes_count": count}), 200
+    else:
+        db.session.add(Like(user_id=user_id, post_id=post_id))
+        try:
+            stats.bump(post.author_id, likes=1)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            return jsonify({"error": "like already exists"}), 409
+        count = publish_like_count(post_id)
+        return jsonify({"status": "liked", "post_id": post_id, "user_id": user_id, "likes_count": count}), 201
+
+def comment_dict(c: Comment) -> dict:
+    return {
+        "id": c.id,
+        "post_id": c.post_id,
+        "user_id": c.user_id,
+        "user_nome": c.user.nome if c.user else None,
+        "body": c.body,
+        "created_at": c.created_at.isoformat() if c.created_at else None,
+        "moderation_status": c.moderation_status,
+    }
+
+@bp.get("/api/posts/<int:post_id>/comments")
+@query_budget(max_total=10)
+def api_post_comments(post_id: int):
+    """Commenti visibili del post, dal più recente, a pagine: ?before=<cursore>&limit=N.
+    Con ?html=1 anche il frammento già renderizzato (in ordine cronologico)."""
+    user = get_current_user()
+    post = Post.query.get_or_404(post_id)
+    if not _visible_to(post, user, post.author_id):
+        abort(404)
+
+    limit = min(max(request.args.get("limit", app.config["COMMENTS_PAGE_SIZE"], type=int), 1), 100)
+    q = (
+        Comment.query
+        .filter(Comment.post_id == post_id, comment_visible(user))
+        .options(joinedload(Comment.user))
+    )
+    cursor = _parse_feed_cursor(request.args.get("before"))
+    if cursor:
+        created_at, comment_id = cursor
+        q = q.filter(or_(Comment.created_at < created_at,
+                         and_(Comment.created_at == created_at, Comment.id < comment_id)))
+    comments = q.order_by(Comment.created_at.desc(), Comment.id.desc()).limit(limit + 1).all()
+    next_cursor = _feed_cursor(comments[limit - 1]) if len(comments) > limit else None
+    comments = comments[:limit]
+
+    data = {"post_id": post_id, "comments": [comment_dict(c) for c in comments], "next": next_cursor}
+    if request.args.get("html"):
+        uid = user.id if user else None
+        data["html"] = "".join(render_template("_comment.html", c=c, uid=uid)
+                               for c in reversed(comments))
+    return jsonify(data)
+
+@bp.get("/api/trending")
+def api_trending():
+    """Termini e hashtag più usati nella finestra (?window=6h|24h|7d|..., ?limit=N)."""
+    if not trending.enabled:
+        return jsonify({"error": "trending disabled"}), 404
+    window = request.args.get("window", "24h")
+    limit = min(max(request.args.get("limit", 10, type=int), 1), 100)
+    try:
+        terms = trending.top(window, limit)
+    except TrendingError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"window": window, "terms": terms})
+
+@bp.get("/api/posts/<int:post_id>/like")
+def api_like_status(post_id: int):
+    Post.query.get_or_404(post_id)
+    uid = session.get("user_id")
+    liked_by_me = liked_by(uid, post_id) if uid else False
+    return jsonify({"post_id": post_id, "likes_count": likes_count(post_id), "liked_by_me": liked_by_me})
+
+@bp.get("/events/stream")
+def event_stream():
+    """Server-Sent Events: like, nuovi post/commenti e coda moderazione (solo admin).
+    Solo con EVENTS_LIVE: con i worker WSGI sync ogni stream terrebbe occupato un worker."""
+    if not app.config.get("EVENTS_LIVE"):
+        return jsonify({"error": "live updates disabled"}), 404
+    sub = bus.subscribe(admin=can_moderate(get_current_user()))
+    if sub is None:
+        return jsonify({"error": "too many connections"}), 503
+    return Response(
+        bus.stream(sub),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
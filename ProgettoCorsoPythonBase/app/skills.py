@@ -0,0 +1,130 @@
+# app/skills.py
+"""
+Competenze degli studenti (tabelle skills e student_skills) ricavate da
+Student.programmi, per la ricerca GET /api/students?skill=react&skill=python.
+
+- programmi resta il testo inserito dallo studente; parse() lo spezza
+  sulle virgole e normalizza ogni voce ("React ", "react" -> "react")
+- set_for() allinea i legami dello studente al suo programmi: lo chiamano
+  le route che creano studenti, PRIMA del commit
+- la ricerca è un'intersezione sugli indici: si parte dalla competenza con
+  meno studenti (Skill.students_count) e per ogni altra si verifica il
+  legame con una ricerca puntuale sulla chiave (skill_id, student_id).
+  Nessun LIKE su programmi, nessuna scansione di students
+- pagine con cursore sull'id dello studente (?after=<id>): la chiave del
+  legame è già in ordine di student_id, l'ORDER BY non costa nulla
+- students_count sceglie solo l'ordine del join: se diventa impreciso (es.
+  studenti cancellati a cascata) i risultati restano giusti, e
+  `flask skills rebuild` lo ricalcola
+"""
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import joinedload, selectinload
+
+from . import db
+from .models import Skill, Student, student_skills
+
+MAX_LENGTH = 80
+
+
+def normalize(nome: str) -> str:
+    return " ".join((nome or "").lower().split())
+
+
+def parse(programmi: str | None) -> list[str]:
+    """"php, React , php" -> ["php", "react"] (ordine di inserimento, senza doppioni)."""
+    names = []
+    for part in (programmi or "").split(","):
+        nome = normalize(part)
+        if nome and len(nome) <= MAX_LENGTH and nome not in names:
+            names.append(nome)
+    return names
+
+
+def _ensure(names: list[str]) -> dict[str, int]:
+    if not names:
+        return {}
+    db.session.execute(
+        sqlite_insert(Skill).on_conflict_do_nothing(index_elements=[Skill.nome]),
+        [{"nome": nome} for nome in names],
+    )
+    return dict(db.session.execute(select(Skill.nome, Skill.id).where(Skill.nome.in_(names))).all())
+
+
+def _bump(skill_ids, n: int):
+    if skill_ids:
+        db.session.execute(update(Skill).where(Skill.id.in_(skill_ids))
+                           .values(students_count=Skill.students_count + n))
+
+
+def set_for(student: Student):
+    """Allinea i legami dello studente (già con id) al suo programmi."""
+    wanted = set(_ensure(parse(student.programmi)).values())
+    current = set(db.session.execute(
+        select(student_skills.c.skill_id).where(student_skills.c.student_id == student.id)
+    ).scalars())
+    added, removed = wanted - current, current - wanted
+    if added:
+        db.session.execute(insert(student_skills),
+                           [{"skill_id": s, "student_id": student.id} for s in added])
+    if removed:
+        db.session.execute(delete(student_skills).where(student_skills.c.student_id == student.id,
+                                                        student_skills.c.skill_id.in_(removed)))
+    _bump(added, 1)
+    _bump(removed, -1)
+
+
+def rebuild(chunk_size: int = 1000) -> int:
+    """Ricalcola legami e contatori da programmi; restituisce gli studenti letti."""
+    db.session.execute(delete(student_skills))
+    total, after = 0, 0
+    while True:
+        rows = db.session.execute(
+            select(Student.id, Student.programmi).where(Student.id > after)
+            .order_by(Student.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        parsed = [(student_id, parse(programmi)) for student_id, programmi in rows]
+        ids = _ensure(sorted({nome for _, names in parsed for nome in names}))
+        links = [{"skill_id": ids[nome], "student_id": student_id}
+                 for student_id, names in parsed for nome in names]
+        if links:
+            db.session.execute(insert(student_skills), links)
+        total, after = total + len(rows), rows[-1][0]
+    counts = (select(func.count()).select_from(student_skills)
+              .where(student_skills.c.skill_id == Skill.id).correlate(Skill).scalar_subquery())
+    db.session.execute(update(Skill).values(students_count=counts))
+    return total
+
+
+def search(names: list[str], after: int | None = None, limit: int = 20):
+    """Studenti con TUTTE le competenze indicate (nessuna: tutti), per id crescente.
+    Restituisce (studenti, cursore della pagina successiva o None)."""
+    wanted = {normalize(n) for n in names} - {""}
+    found = db.session.execute(
+        select(Skill.id).where(Skill.nome.in_(wanted)).order_by(Skill.students_count, Skill.id)
+    ).scalars().all() if wanted else []
+    if len(found) < len(wanted):  # una competenza che nessuno ha: intersezione vuota
+        return [], None
+
+    if found:
+        # parte dalla competenza più rara, le altre sono ricerche sulla chiave primaria
+        first = student_skills.alias("s0")
+        q = select(first.c.student_id.label("id")).where(first.c.skill_id == found[0])
+        for i, skill_id in enumerate(found[1:], 1):
+            other = student_skills.alias(f"s{i}")
+            q = q.join(other, (other.c.student_id == first.c.student_id) & (other.c.skill_id == skill_id))
+        key = first.c.student_id
+    else:
+        q, key = select(Student.id), Student.id
+    if after is not None:
+        q = q.where(key > after)
+    ids = db.session.execute(q.order_by(key).limit(limit + 1)).scalars().all()
+
+    next_cursor = ids[limit - 1] if len(ids) > limit else None
+    ids = ids[:limit]
+    students = (Student.query.filter(Student.id.in_(ids))
+                .options(selectinload(Student.skills), joinedload(Student.course))
+                .order_by(Student.id).all()) if ids else []
+    return students, next_cursor
@@ -0,0 +1,100 @@
+// app/static/js/social.js
+// Form con data-ajax: like, commenti e moderazione senza ricaricare la pagina.
+// Senza JS (o se la fetch fallisce) il form viene inviato normalmente.
+function showMessages(messages) {
+  const box = document.getElementById("ajax-messages");
+  if (!box || !messages) return;
+  box.replaceChildren(...messages.map(([cat, msg]) => {
+    const div = document.createElement("div");
+    div.className = `alert alert-${cat} mb-3`;
+    div.textContent = msg;
+    return div;
+  }));
+}
+
+const ajaxHandlers = {
+  like(form, d) {
+    document.querySelectorAll(`[data-like-count="${d.post_id}"]`)
+      .forEach((el) => { el.textContent = d.likes_count; });
+  },
+  comment(form, d) {
+    const list = document.querySelector(form.dataset.target);
+    if (list && d.html) {
+      list.querySelectorAll("[data-empty]").forEach((el) => el.remove());
+      list.insertAdjacentHTML("beforeend", d.html);
+    }
+    form.reset();
+  },
+  moderation(form, d) {
+    const item = form.closest("[data-mod-item]");
+    if (item) item.remove();
+    document.querySelectorAll("[data-pending-total]")
+      .forEach((el) => { el.textContent = d.pending_total; });
+  },
+};
+
+document.addEventListener("submit", async (e) => {
+  const form = e.target;
+  const kind = form.dataset && form.dataset.ajax;
+  if (!kind || e.defaultPrevented) return;  // es. confirm() annullato
+  e.preventDefault();
+  let resp;
+  try {
+    resp = await fetch(form.action, {
+      method: "POST",
+      body: new FormData(form),
+      headers: { "Accept": "application/json" },
+    });
+  } catch (err) {
+    form.submit();
+    return;
+  }
+  const d = await resp.json().catch(() => ({}));
+  showMessages(d.messages);
+  if (resp.ok) ajaxHandlers[kind](form, d);
+});
+
+// "Mostra commenti precedenti": la pagina successiva da /api/posts/<id>/comments
+document.addEventListener("click", async (e) => {
+  const btn = e.target.closest("[data-more-comments]");
+  if (!btn) return;
+  btn.disabled = true;
+  try {
+    const resp = await fetch(btn.dataset.moreComments, { headers: { "Accept": "application/json" } });
+    if (!resp.ok) throw new Error(resp.status);
+    const d = await resp.json();
+    btn.insertAdjacentHTML("afterend", d.html || "");
+    if (d.next) {
+      const url = new URL(btn.dataset.moreComments, window.location.href);
+      url.searchParams.set("before", d.next);
+      btn.dataset.moreComments = url.pathname + url.search;
+      btn.disabled = false;
+    } else {
+      btn.remove();
+    }
+  } catch (err) {
+    btn.disabled = false;
+  }
+});
+
+// Aggiornamenti live (SSE) solo sulle pagine che li mostrano (data-live)
+const eventsUrl = document.currentScript && document.currentScript.dataset.eventsUrl;
+if (window.EventSource && eventsUrl && document.querySelector("[data-live]")) {
+  const es = new EventSource(eventsUrl);
+  const showNews = () => {
+    const banner = document.getElementById("live-updates");
+    if (banner) banner.classList.remove("d-none");
+  };
+  es.addEventListener("like_count", (e) => {
+    const d = JSON.parse(e.data);
+    document.querySelectorAll(`[data-like-count="${d.post_id}"]`)
+      .forEach((el) => { el.textContent = d.likes_count; });
+  });
+  es.addEventListener("post_created", showNews);
+  es.addEventListener("comment_added", showNews);
+  es.addEventListener("moderation_pending_count", (e) => {
+    const d = JSON.parse(e.data);
+    document.querySelectorAll("[data-pending-total]")
+      .forEach((el) => { el.textContent = d.total; });
+  });
+}
@@ -0,0 +1,83 @@
+# app/stats.py
+"""
+Statistiche per studente (tabella student_stats): post scritti, like e
+commenti ricevuti sui propri post.
+
+- le route che scrivono post/like/commenti chiamano bump() o
+  bump_post_author() PRIMA del commit: contatori e dati cambiano nella
+  stessa transazione
+- l'aggiornamento è un upsert (INSERT ... ON CONFLICT DO UPDATE col + n):
+  nessuna lettura, la riga nasce al primo contributo
+- rebuild() ricalcola tutto dai dati (es. dopo cancellazioni a cascata
+  fatte fuori dall'app): `flask stats rebuild`
+"""
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from . import db
+from .models import (Student, Post, Like, Comment, StudentStats,
+                     ArchivedPost, ArchivedLike, ArchivedComment)
+
+_COLUMNS = ("student_id", "posts_count", "likes_received", "comments_received")
+
+
+def _add_on_conflict(stmt):
+    return stmt.on_conflict_do_update(
+        index_elements=[StudentStats.student_id],
+        set_={col: getattr(StudentStats, col) + getattr(stmt.excluded, col)
+              for col in _COLUMNS[1:]},
+    )
+
+
+def bump(student_id: int, posts: int = 0, likes: int = 0, comments: int = 0):
+    stmt = sqlite_insert(StudentStats).values(
+        student_id=student_id, posts_count=posts, likes_received=likes, comments_received=comments
+    )
+    db.session.execute(_add_on_conflict(stmt))
+
+
+def bump_post_author(post_id: int, likes: int = 0, comments: int = 0):
+    """Come bump(), per l'autore del post post_id (senza caricare il post)."""
+    src = select(Post.author_id, literal(0), literal(likes), literal(comments)).where(Post.id == post_id)
+    db.session.execute(_add_on_conflict(sqlite_insert(StudentStats).from_select(_COLUMNS, src)))
+
+
+def post_removed(post: Post):
+    """Da chiamare prima di cancellare il post: like e commenti spariscono con lui."""
+    n_likes = db.session.query(Like.id).filter(Like.post_id == post.id).count()
+    n_comments = db.session.query(Comment.id).filter(Comment.post_id == post.id).count()
+    bump(post.author_id, posts=-1, likes=-n_likes, comments=-n_comments)
+
+
+def get(student_id: int) -> StudentStats:
+    """Le statistiche dello studente (tutti zero se non ha ancora contributi)."""
+    stats = db.session.get(StudentStats, student_id)
+    if stats is None:
+        stats = StudentStats(student_id=student_id, posts_count=0, likes_received=0, comments_received=0)
+    return stats
+
+
+def rebuild(student_id: int | None = None) -> int:
+    """Ricalcola i contatori (di uno studente o di tutti); restituisce le righe scritte.
+    Conta anche i post archiviati (app/archive.py)."""
+    def authored(count_col, post, join_on=None):
+        q = select(func.count(count_col))
+        if join_on is not None:
+            q = q.join(post, join_on)
+        return q.where(post.author_id == Student.id).correlate(Student).scalar_subquery()
+
+    posts = authored(Post.id, Post) + authored(ArchivedPost.id, ArchivedPost)
+    likes = (authored(Like.id, Post, Post.id == Like.post_id)
+             + authored(ArchivedLike.id, ArchivedPost, ArchivedPost.id == ArchivedLike.post_id))
+    comments = (authored(Comment.id, Post, Post.id == Comment.post_id)
+                + authored(ArchivedComment.id, ArchivedPost, ArchivedPost.id == ArchivedComment.post_id))
+    src = select(Student.id, posts, likes, comments)
+    # WHERE obbligatoria: senza, SQLite scambia ON CONFLICT per una clausola di JOIN
+    src = src.where(Student.id == student_id) if student_id is not None else src.where(True)
+
+    stmt = sqlite_insert(StudentStats).from_select(_COLUMNS, src)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[StudentStats.student_id],
+        set_={col: getattr(stmt.excluded, col) for col in _COLUMNS[1:]},
+    )
+    return db.session.execute(stmt).rowcount
@@ -0,0 +1,265 @@
+# app/trending.py
+"""
+Termini e hashtag di tendenza (GET /api/trending?window=24h, riquadro nel feed).
+
+- al commit di un post/commento visibile (nuovo o appena approvato) le
+  sue parole passano dal tokenizer di moderation.py: restano hashtag e
+  parole di almeno TRENDING_MIN_LENGTH lettere fuori dalle stopword,
+  ognuna contata una volta per contenuto
+- contatori per bucket orari (ultime TRENDING_HOURLY_RETENTION_HOURS) e
+  giornalieri (ultimi TRENDING_DAILY_RETENTION_DAYS) in instance/trending.db
+  (SQLite in WAL, condiviso tra worker)
+- memoria limitata: al più TRENDING_TERMS_PER_BUCKET termini per bucket,
+  con l'algoritmo Space-Saving (un termine nuovo in un bucket pieno prende
+  il posto del meno contato ereditandone il conteggio; `error` è la
+  sovrastima massima). I termini frequenti ci sono sempre, le code lunghe
+  no: qui interessano solo i primi
+- la classifica di una finestra somma i bucket che la compongono (poche
+  centinaia di righe, niente GROUP BY sui contenuti) ed è tenuta in cache
+  per TRENDING_CACHE_SECONDS
+
+Contenuti approvati con UPDATE set-based (moderazione in blocco) non
+passano dagli hook: la route li legge con RETURNING e li passa a
+record_quietly() dopo il commit. `flask trending backfill` ricostruisce
+tutto dal DB.
+"""
+import calendar
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from itertools import chain
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, attributes
+
+from .moderation import tokenize
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS term_counts (
+    granularity TEXT NOT NULL,   -- 'h' (oraria) | 'd' (giornaliera)
+    bucket INTEGER NOT NULL,     -- inizio dell'ora / del giorno, epoch UTC
+    term TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    error INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket, term)
+);
+CREATE INDEX IF NOT EXISTS ix_term_counts_min ON term_counts (granularity, bucket, count);
+"""
+_GRANULARITY = {"h": 3600, "d": 86400}
+_WINDOW_RE = re.compile(r"^(\d+)([hd])$")
+_TEXT_FIELDS = {"posts": "content", "comments": "body"}
+
+STOPWORDS = frozenset("""
+    alla alle allo anche ancora avere come con cosa cose dalla dalle degli della delle dello
+    dopo dove essere fare fatto fino molto nella nelle nello noi non ogni perché perche poi
+    prima quale quando quanto quella quelle quello questa queste questo qui sono sopra sotto
+    sulla sulle sullo suoi tipo tra tutti tutto una uno voi vostro anche però pero proprio
+    sempre solo stato stata siamo siete hanno abbiamo avete ciao grazie
+""".split())
+
+log = logging.getLogger(__name__)
+
+
+class TrendingError(ValueError):
+    pass
+
+
+def terms_of(text: str, min_length: int = 4) -> set[str]:
+    """Termini di un contenuto (una volta sola ciascuno)."""
+    terms = set()
+    for token in tokenize(text):
+        if token.startswith("#"):
+            if len(token) > 1:
+                terms.add(token)
+        elif len(token) >= min_length and not token.isdigit() and token not in STOPWORDS:
+            terms.add(token)
+    return terms
+
+
+def _epoch(dt: datetime | None) -> float:
+    return calendar.timegm(dt.timetuple()) if dt else time.time()
+
+
+def parse_window(window: str, max_hours: int, max_days: int) -> tuple[str, int]:
+    """"24h" / "7d" -> (granularità, numero di bucket)."""
+    m = _WINDOW_RE.match(window or "")
+    if not m or int(m.group(1)) < 1:
+        raise TrendingError("window non valida: usa ad esempio 6h, 24h, 7d")
+    n, unit = int(m.group(1)), m.group(2)
+    if unit == "h" and n > max_hours:
+        # oltre lo storico orario si passa ai giorni
+        unit, n = "d", -(-n // 24)
+    if unit == "d" and n > max_days:
+        raise TrendingError(f"window troppo ampia: al massimo {max_days}d")
+    return unit, n
+
+
+class Trending:
+    def __init__(self):
+        self.enabled = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._installed = False
+
+    def init_app(self, app):
+        cfg = app.config
+        self.enabled = bool(cfg.get("TRENDING_ENABLED"))
+        self.path = str(cfg.get("TRENDING_DB_PATH", ""))
+        self.terms_per_bucket = cfg.get("TRENDING_TERMS_PER_BUCKET", 500)
+        self.min_length = cfg.get("TRENDING_MIN_LENGTH", 4)
+        self.retention = {"h": cfg.get("TRENDING_HOURLY_RETENTION_HOURS", 48),
+                          "d": cfg.get("TRENDING_DAILY_RETENTION_DAYS", 30)}
+        self.cache_seconds = cfg.get("TRENDING_CACHE_SECONDS", 60)
+        app.extensions["trending"] = self
+        if self.enabled and not self._installed:
+            event.listen(Session, "after_flush", self._after_flush)
+            event.listen(Session, "after_commit", self._after_commit)
+            event.listen(Session, "after_rollback", self._after_rollback)
+            self._installed = True
+
+    def _conn(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
+
+    # --- scrittura ---
+    def _add(self, conn, granularity: str, bucket: int, counts: Counter):
+        key = (granularity, bucket)
+        size = None
+        for term, n in counts.items():
+            if conn.execute("UPDATE term_counts SET count = count + ? "
+                            "WHERE granularity = ? AND bucket = ? AND term = ?",
+                            (n, *key, term)).rowcount:
+                continue
+            if size is None:
+                size = conn.execute("SELECT COUNT(*) FROM term_counts WHERE granularity = ? "
+                                    "AND bucket = ?", key).fetchone()[0]
+            if size < self.terms_per_bucket:
+                conn.execute("INSERT INTO term_counts (granularity, bucket, term, count) "
+                             "VALUES (?, ?, ?, ?)", (*key, term, n))
+                size += 1
+                continue
+            # Space-Saving: il nuovo termine sostituisce il meno contato
+            victim, least = conn.execute(
+                "SELECT term, count FROM term_counts WHERE granularity = ? AND bucket = ? "
+                "ORDER BY count LIMIT 1", key).fetchone()
+            conn.execute("UPDATE term_counts SET term = ?, count = ?, error = ? "
+                         "WHERE granularity = ? AND bucket = ? AND term = ?",
+                         (term, least + n, least, *key, victim))
+
+    def record(self, items):
+        """Conta [(testo, created_at)] nei bucket orari e giornalieri."""
+        now = time.time()
+        buckets = defaultdict(Counter)
+        for text, created_at in items:
+            terms = terms_of(text, self.min_length)
+            if not terms:
+                continue
+            ts = _epoch(created_at)
+            for granularity, seconds in _GRANULARITY.items():
+                if ts >= now - self.retention[granularity] * seconds:
+                    buckets[(granularity, int(ts // seconds * seconds))].update(terms)
+        if not buckets:
+            return
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for (granularity, bucket), counts in buckets.items():
+                self._add(conn, granularity, bucket, counts)
+            for granularity, seconds in _GRANULARITY.items():
+                conn.execute("DELETE FROM term_counts WHERE granularity = ? AND bucket < ?",
+                             (granularity, now - (self.retention[granularity] + 1) * seconds))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        self._conn().execute("DELETE FROM term_counts")
+        self._cache.clear()
+
+    def backfill(self, chunk_size: int = 1000) -> int:
+        """Riparte da zero con i contenuti visibili dello storico giornaliero;
+        restituisce quanti ne ha contati."""
+        from sqlalchemy import or_
+        from . import db
+        from .models import Post, Comment
+
+        since = datetime.utcnow() - timedelta(days=self.retention["d"])
+        self.clear()
+        total = 0
+        for model, field in ((Post, Post.content), (Comment, Comment.body)):
+            q = (db.session.query(field, model.created_at)
+                 .filter(model.created_at >= since,
+                         or_(model.is_visible.is_(True), model.is_visible.is_(None)))
+                 .yield_per(chunk_size))
+            batch = []
+            for row in q:
+                batch.append(tuple(row))
+                if len(batch) == chunk_size:
+                    self.record(batch)
+                    total, batch = total + len(batch), []
+            self.record(batch)
+            total += len(batch)
+        return total
+
+    # --- lettura ---
+    def top(self, window: str = "24h", limit: int = 10) -> list[dict]:
+        granularity, n = parse_window(window, self.retention["h"], self.retention["d"])
+        cache_key = (granularity, n, limit)
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(cache_key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        seconds = _GRANULARITY[granularity]
+        since = int(now // seconds * seconds) - (n - 1) * seconds
+        rows = self._conn().execute(
+            "SELECT term, SUM(count) AS n, SUM(error) FROM term_counts "
+            "WHERE granularity = ? AND bucket >= ? GROUP BY term ORDER BY n DESC, term LIMIT ?",
+            (granularity, since, limit),
+        ).fetchall()
+        result = [{"term": term, "count": count, "max_error": error,
+                   "hashtag": term.startswith("#")} for term, count, error in rows]
+        with self._lock:
+            self._cache[cache_key] = (now + self.cache_seconds, result)
+        return result
+
+    # --- hook sulla Session ---
+    def _after_flush(self, session, flush_context):
+        pending = session.info.setdefault("trending_pending", [])
+        for obj in chain(session.new, session.dirty):
+            field = _TEXT_FIELDS.get(getattr(obj, "__tablename__", None))
+            if field is None or obj.is_visible is False:
+                continue
+            # nuovo e visibile, oppure appena diventato visibile (approvato)
+            if obj in session.new or attributes.get_history(obj, "is_visible").deleted == [False]:
+                pending.append((getattr(obj, field), obj.created_at))
+
+    def record_quietly(self, items):
+        """record() dopo un commit: un errore di trending.db non fa fallire la richiesta."""
+        if not self.enabled or not items:
+            return
+        try:
+            self.record(items)
+        except sqlite3.Error:
+            log.exception("Impossibile aggiornare i termini di tendenza")
+
+    def _after_commit(self, session):
+        self.record_quietly(session.info.pop("trending_pending", None))
+
+    def _after_rollback(self, session):
+        session.info.pop("trending_pending", None)
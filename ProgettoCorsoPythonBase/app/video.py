@@ -0,0 +1,186 @@
+# app/video.py
+"""
+Elaborazione dei video caricati, in background con ffmpeg.
+
+Per ogni video locale ('uploads/...'), dopo il commit del post:
+- MP4/MOV: remux con -movflags +faststart (moov atom in testa, nessuna
+  ricodifica): il browser parte dopo poche centinaia di KB
+- AVI/MKV: ricodifica in MP4 (H.264/AAC) o WebM (VP9/Opus) se
+  VIDEO_TRANSCODE_EXOTIC è attivo
+- WebM: già adatto allo streaming, si estrae solo il poster
+- poster: un fotogramma JPEG dal primo secondo
+
+Il lavoro gira in un pool di processi (VIDEO_WORKERS); i processi figli
+eseguono solo ffmpeg e non toccano il DB. Al termine il processo web
+registra su Post video_stream_url, video_poster_url e video_status
+('ready' | 'failed'). Senza ffmpeg nel PATH (o FFMPEG_BINARY) non si fa
+nulla e il feed usa il file originale; il PATH si consulta al primo video,
+non all'import della configurazione. Solo gli upload validi
+(media.upload_path) arrivano a ffmpeg.
+
+`flask media videos` elabora i video rimasti indietro (es. worker
+riavviato a metà lavoro).
+"""
+import logging
+import multiprocessing as mp
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from flask import current_app
+from sqlalchemy import update
+
+from .media import upload_path
+
+log = logging.getLogger(__name__)
+
+_REMUX = {"mp4", "mov"}
+_TRANSCODE = {"avi", "mkv"}
+_ENCODERS = {
+    "mp4": ["-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-pix_fmt", "yuv420p",
+            "-c:a", "aac", "-b:a", "128k", "-movflags", "+faststart"],
+    "webm": ["-c:v", "libvpx-vp9", "-crf", "33", "-b:v", "0", "-row-mt", "1",
+             "-c:a", "libopus", "-b:a", "96k"],
+}
+
+_executor = None
+_UNSET = object()
+_which = _UNSET
+
+
+# --- nel processo figlio: solo ffmpeg, niente Flask ---
+def _ffmpeg(binary: str, args: list, timeout: int) -> bool:
+    try:
+        proc = subprocess.run([binary, "-hide_banner", "-loglevel", "error", "-y", *args],
+                              capture_output=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        log.warning("ffmpeg non completato: %s", e)
+        return False
+    if proc.returncode != 0:
+        log.warning("ffmpeg ha restituito %s: %s", proc.returncode,
+                    proc.stderr.decode(errors="replace")[-500:])
+    return proc.returncode == 0
+
+
+def process_file(src: str, binary: str, transcode_format: str | None, timeout: int) -> dict:
+    """Produce accanto a src la versione per lo streaming e il poster.
+    Restituisce i nomi dei file creati (None se non prodotti)."""
+    src_path = Path(src)
+    stem, ext = src_path.stem, src_path.suffix.lstrip(".").lower()
+    result = {"stream": None, "poster": None}
+
+    target = None
+    if ext in _REMUX:
+        target = src_path.with_name(f"{stem}.faststart.mp4")
+        ok = _ffmpeg(binary, ["-i", src, "-map", "0:v?", "-map", "0:a?", "-c", "copy",
+                              "-movflags", "+faststart", str(target)], timeout)
+        if not ok and transcode_format:
+            # codec non ammessi nel contenitore MP4: si ricodifica
+            target = src_path.with_name(f"{stem}.stream.{transcode_format}")
+            ok = _ffmpeg(binary, ["-i", src, *_ENCODERS[transcode_format], str(target)], timeout)
+    elif ext in _TRANSCODE and transcode_format:
+        target = src_path.with_name(f"{stem}.stream.{transcode_format}")
+        ok = _ffmpeg(binary, ["-i", src, *_ENCODERS[transcode_format], str(target)], timeout)
+    if target is not None:
+        if ok:
+            result["stream"] = target.name
+        else:
+            target.unlink(missing_ok=True)
+
+    poster = src_path.with_name(f"{stem}.poster.jpg")
+    frame = ["-frames:v", "1", "-vf", "scale='min(1280,iw)':-2", "-q:v", "3", str(poster)]
+    # -ss prima di -i: seek veloce; i video più corti di 1s ripiegano sul primo fotogramma
+    for seek in (["-ss", "1"], []):
+        if _ffmpeg(binary, [*seek, "-i", src, *frame], timeout) and poster.is_file() \
+                and poster.stat().st_size > 0:
+            result["poster"] = poster.name
+            break
+    return result
+
+
+# --- nel processo web ---
+def _pool(workers: int) -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # forkserver: niente fork di un processo con thread attivi (poller SSE, pool media)
+        methods = mp.get_all_start_methods()
+        ctx = mp.get_context("forkserver" if "forkserver" in methods else "spawn")
+        _executor = ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+    return _executor
+
+
+def ffmpeg_binary(app) -> str | None:
+    """FFMPEG_BINARY, altrimenti ffmpeg nel PATH: cercato al primo video, non all'avvio."""
+    global _which
+    if app.config.get("FFMPEG_BINARY"):
+        return app.config["FFMPEG_BINARY"]
+    if _which is _UNSET:
+        _which = shutil.which("ffmpeg")
+    return _which
+
+
+def _options(app):
+    cfg = app.config
+    transcode = cfg.get("VIDEO_TRANSCODE_FORMAT") if cfg.get("VIDEO_TRANSCODE_EXOTIC") else None
+    return ffmpeg_binary(app), transcode, cfg.get("VIDEO_TIMEOUT_SECONDS", 300)
+
+
+def _save_result(app, post_id: int, video_url: str, result: dict | None):
+    from . import db
+    from .models import Post
+
+    values = {"video_status": "failed"}
+    if result is not None and (result["stream"] or result["poster"]):
+        folder = video_url.rsplit("/", 1)[0]
+        values = {
+            "video_status": "ready",
+            "video_stream_url": f"{folder}/{result['stream']}" if result["stream"] else None,
+            "video_poster_url": f"{folder}/{result['poster']}" if result["poster"] else None,
+        }
+    with app.app_context():
+        # se nel frattempo il video del post è cambiato, il risultato non vale più
+        db.session.execute(
+            update(Post)
+            .where(Post.id == post_id, Post.video_url == video_url)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+
+def enqueue(post_id: int, video_url: str | None):
+    """Da chiamare DOPO il commit del post: elabora il video in background."""
+    app = current_app._get_current_object()
+    if not video_url or not video_url.startswith("uploads/"):
+        return
+    binary, transcode, timeout = _options(app)
+    # solo upload veri: ffmpeg legge src e scrive i derivati accanto
+    src = upload_path(video_url, app.config["UPLOAD_FOLDER"])
+    if not binary or src is None:
+        return
+    future = _pool(app.config.get("VIDEO_WORKERS", 1)).submit(
+        process_file, str(src), binary, transcode, timeout
+    )
+
+    def done(f):
+        try:
+            result = f.result()
+        except Exception:
+            log.exception("Elaborazione del video %s fallita", video_url)
+            result = None
+        try:
+            _save_result(app, post_id, video_url, result)
+        except Exception:
+            log.exception("Impossibile salvare il risultato del video %s", video_url)
+
+    future.add_done_callback(done)
+
+
+def process_now(app, post_id: int, video_url: str) -> dict:
+    """Versione sincrona (CLI)."""
+    binary, transcode, timeout = _options(app)
+    src = upload_path(video_url, app.config["UPLOAD_FOLDER"])
+    result = process_file(str(src), binary, transcode, timeout) if src and src.is_file() else None
+    _save_result(app, post_id, video_url, result)
+    return result or {"stream": None, "poster": None}
@@ -0,0 +1,5 @@
+# asgi.py — modalità asincrona: uvicorn asgi:app --workers 4
+from app import create_app
+from app.aio import AsyncApp
+
+app = AsyncApp(create_app())
@@ -0,0 +1,85 @@
+# benchmarks/bench_concurrency.py
+"""
+Capacità di connessioni concorrenti: modalità sync (WSGI) vs async (ASGI).
+
+Apre N connessioni SSE verso /events/stream e le tiene aperte; intanto
+misura la latenza di GET /api. In modalità sync ogni SSE occupa un
+worker/thread, quindi oltre la capacità del server le connessioni restano
+in attesa e /api smette di rispondere; in modalità async no.
+
+Avvia il server in un altro terminale, ad esempio:
+    gunicorn -w 4 -b 127.0.0.1:8000 wsgi:app            # sync
+    uvicorn asgi:app --workers 4 --port 8000            # async
+poi:
+    python benchmarks/bench_concurrency.py --port 8000 --connections 500
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+
+async def _open_sse(host: str, port: int, timeout: float):
+    """Ritorna lo stream aperto se il server inizia a rispondere entro timeout."""
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        writer.write(f"GET /events/stream HTTP/1.1\r\nHost: {host}\r\n"
+                     "Accept: text/event-stream\r\n\r\n".encode())
+        await writer.drain()
+        line = await asyncio.wait_for(reader.readline(), timeout)
+        if b" 200 " not in line:
+            writer.close()
+            return None
+        return writer
+    except (OSError, asyncio.TimeoutError):
+        return None
+
+
+async def _get_latency(host: str, port: int, timeout: float):
+    start = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        writer.write(f"GET /api HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        await asyncio.wait_for(reader.read(), timeout)
+        writer.close()
+        return (time.perf_counter() - start) * 1000
+    except (OSError, asyncio.TimeoutError):
+        return None
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--connections", type=int, default=200)
+    ap.add_argument("--probes", type=int, default=20)
+    ap.add_argument("--timeout", type=float, default=5.0)
+    args = ap.parse_args()
+
+    start = time.perf_counter()
+    streams = await asyncio.gather(*[_open_sse(args.host, args.port, args.timeout)
+                                     for _ in range(args.connections)])
+    opened = [w for w in streams if w is not None]
+    open_seconds = time.perf_counter() - start
+
+    latencies = [await _get_latency(args.host, args.port, args.timeout) for _ in range(args.probes)]
+    ok = sorted(x for x in latencies if x is not None)
+
+    for w in opened:
+        w.close()
+
+    print(json.dumps({
+        "connections_requested": args.connections,
+        "connections_open": len(opened),
+        "open_seconds": round(open_seconds, 2),
+        "probe_ok": len(ok),
+        "probe_failed": len(latencies) - len(ok),
+        "probe_p50_ms": round(statistics.median(ok), 1) if ok else None,
+        "probe_max_ms": round(ok[-1], 1) if ok else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
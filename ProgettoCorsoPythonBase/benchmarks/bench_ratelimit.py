@@ -0,0 +1,76 @@
+# benchmarks/bench_ratelimit.py
+"""
+Confronto tra storage del rate limiter: memory:// (per-processo) e
+sqlite:// (condiviso, app/ratelimit_storage.py).
+
+1. latenza per controllo in un singolo processo, per strategia
+2. correttezza multi-processo: N processi colpiscono la stessa chiave con
+   limite L; con memory:// passano ~N*L richieste, con sqlite:// al massimo L
+
+Uso (dalla cartella ProgettoCorsoPythonBase):
+    python benchmarks/bench_ratelimit.py [--checks 5000] [--procs 4]
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter, MovingWindowRateLimiter
+
+import app.ratelimit_storage  # noqa: F401  (registra sqlite://)
+
+STRATEGIES = {"fixed-window": FixedWindowRateLimiter, "moving-window": MovingWindowRateLimiter}
+
+
+def _bench(uri: str, strategy: str, checks: int) -> float:
+    limiter = STRATEGIES[strategy](storage_from_string(uri))
+    item = parse(f"{checks * 2} per minute")
+    start = time.perf_counter()
+    for i in range(checks):
+        limiter.hit(item, "bench", str(i % 50))
+    return (time.perf_counter() - start) / checks * 1e6
+
+
+def _worker(uri: str, strategy: str, limit: int, attempts: int, out):
+    limiter = STRATEGIES[strategy](storage_from_string(uri))
+    item = parse(f"{limit} per minute")
+    out.put(sum(1 for _ in range(attempts) if limiter.hit(item, "shared", "key")))
+
+
+def _allowed_across(uri: str, strategy: str, procs: int, limit: int) -> int:
+    out = mp.Queue()
+    workers = [mp.Process(target=_worker, args=(uri, strategy, limit, limit * 2, out))
+               for _ in range(procs)]
+    for w in workers:
+        w.start()
+    total = sum(out.get() for _ in workers)
+    for w in workers:
+        w.join()
+    return total
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--checks", type=int, default=5000)
+    ap.add_argument("--procs", type=int, default=4)
+    ap.add_argument("--limit", type=int, default=30)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="ratelimit-bench-")
+    print(f"{'storage':<10} {'strategia':<14} {'us/check':>9} {'passate':>8} {'attese':>7}")
+    for name in ("memory", "sqlite"):
+        for strategy in STRATEGIES:
+            uri = "memory://" if name == "memory" else f"sqlite:///{tmp}/{strategy}.db"
+            per_check = _bench(uri, strategy, args.checks)
+            allowed = _allowed_across(uri, strategy, args.procs, args.limit)
+            print(f"{name:<10} {strategy:<14} {per_check:>9.1f} {allowed:>8} {args.limit:>7}")
+
+
+if __name__ == "__main__":
+    main()
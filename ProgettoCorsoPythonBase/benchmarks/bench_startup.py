@@ -0,0 +1,111 @@
+# benchmarks/bench_startup.py
+"""
+Tempo di avvio a freddo: ogni misura è un interprete nuovo che importa
+`app` e chiama create_app(), come un worker gunicorn appena creato.
+
+1. mediana di import e create_app() su N avvii
+2. dettaglio degli import (python -X importtime): tempo proprio per
+   pacchetto di primo livello e per ogni modulo di `app`
+3. controllo di regressione: con --budget-ms esce con codice 1 se la
+   mediana supera il budget o se un worker carica moduli che devono
+   restare pigri (Flask-Migrate/Alembic, pyarrow). Lo stesso controllo
+   gira nei test (tests/test_startup.py, budget STARTUP_BUDGET_MS)
+
+Uso (dalla cartella ProgettoCorsoPythonBase):
+    python benchmarks/bench_startup.py [--runs 5] [--top 12] [--budget-ms 1500]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# caricati solo dal CLI (`flask db ...`) o da richieste rare, mai all'avvio di un worker
+LAZY_MODULES = ("flask_migrate", "alembic", "pyarrow")
+
+_PROBE = f"""
+import json, sys, time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+create_app()
+t2 = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (t1 - t0) * 1000,
+    "create_ms": (t2 - t1) * 1000,
+    "loaded_lazy": [m for m in {LAZY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def _run(importtime: bool = False):
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", _PROBE]
+    proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+
+def _parse_importtime(stderr: str):
+    """(modulo, tempo proprio in us) per ogni riga di -X importtime."""
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _cumulative, name = line[len("import time:"):].split("|")
+        yield name.strip(), int(self_us)
+
+
+def measure(runs: int = 5) -> dict:
+    """Mediane (ms) di import e create_app() su `runs` interpreti nuovi, più i
+    moduli pigri caricati all'avvio."""
+    _run()  # scalda la cache del filesystem e i .pyc
+    samples = [_run()[0] for _ in range(runs)]
+    return {
+        "import_ms": statistics.median(s["import_ms"] for s in samples),
+        "create_ms": statistics.median(s["create_ms"] for s in samples),
+        "total_ms": statistics.median(s["import_ms"] + s["create_ms"] for s in samples),
+        "loaded_lazy": sorted({m for s in samples for m in s["loaded_lazy"]}),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=12)
+    ap.add_argument("--budget-ms", type=float, default=None,
+                    help="fallisce (exit 1) se la mediana import+create_app lo supera")
+    args = ap.parse_args()
+
+    result = measure(args.runs)
+    import_ms, create_ms, total_ms = result["import_ms"], result["create_ms"], result["total_ms"]
+
+    _, stderr = _run(importtime=True)
+    by_package, app_modules = Counter(), Counter()
+    for name, self_us in _parse_importtime(stderr):
+        by_package[name.split(".")[0]] += self_us
+        if name == "app" or name.startswith("app."):
+            app_modules[name] += self_us
+
+    print(f"avvii: {args.runs}   import app: {import_ms:.0f} ms   "
+          f"create_app(): {create_ms:.0f} ms   totale: {total_ms:.0f} ms\n")
+    print(f"{'pacchetto':<28} {'ms':>8}")
+    for name, us in by_package.most_common(args.top):
+        print(f"{name:<28} {us / 1000:>8.1f}")
+    print(f"\n{'modulo app':<28} {'ms':>8}")
+    for name, us in app_modules.most_common():
+        print(f"{name:<28} {us / 1000:>8.1f}")
+
+    loaded = result["loaded_lazy"]
+    if loaded:
+        print(f"\nATTENZIONE: moduli da caricare solo nel CLI importati all'avvio: {', '.join(loaded)}")
+
+    if args.budget_ms is not None:
+        ok = total_ms <= args.budget_ms and not loaded
+        print(f"\nbudget {args.budget_ms:.0f} ms: {'OK' if ok else 'SUPERATO'}")
+        sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+# benchmarks/loadtest.py
+"""
+Load test end-to-end: quanti studenti contemporanei regge una macchina.
+
+1. seed: crea un database a parte con studenti, post (alcuni in attesa di
+   moderazione), commenti e like, più un manifest JSON per il run:
+       python benchmarks/loadtest.py seed --db instance/loadtest.db --students 500 --posts 5000
+2. avvia il server su quel database, con i rate limit spenti (lo stampa il seed):
+       DATABASE_URL=sqlite:///.../loadtest.db RATELIMIT_ENABLED=0 \\
+       ADMIN_EMAILS=admin@loadtest.local gunicorn -w 4 -b 127.0.0.1:8000 wsgi:app
+3. run: N utenti virtuali (client HTTP asyncio, keep-alive e cookie di
+   sessione) per --duration secondi, ognuno con uno scenario:
+       anon     feed, permalink e commenti senza login
+       user     feed, /me e stato dei like da loggati
+       like     tempesta di like/unlike sullo stesso post
+       post     nuovi post, alcuni da moderare
+       comment  raffiche di commenti sullo stesso post
+       admin    coda di moderazione (pagina, JSON, approvazioni)
+   --mix sceglie le proporzioni (default anon=40,user=30,like=10,post=5,comment=10,admin=5).
+       python benchmarks/loadtest.py run --users 200 --duration 60 --out report.json --html report.html
+
+Il report ha throughput, errori e p50/p95/p99 per endpoint; con
+--baseline old.json l'HTML mostra anche la variazione rispetto a un run
+precedente (stesso formato JSON).
+
+Limiti per non falsare i numeri: solo HTTP/1.1 in chiaro, nessun redirect
+seguito (un 302 conta come risposta valida), body ignorati tranne il JSON
+della coda admin.
+"""
+import argparse
+import asyncio
+import html
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from urllib.parse import urlencode
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+DEFAULT_MIX = "anon=40,user=30,like=10,post=5,comment=10,admin=5"
+ADMIN_EMAIL = "admin@loadtest.local"
+WORDS = ("python", "lezione", "esercizio", "domanda", "flask", "progetto", "consegna", "lista",
+         "dizionario", "funzione", "classe", "ciclo", "errore", "test", "database", "ciao")
+SKILLS = ("python", "flask", "sql", "javascript", "react", "php", "angular", "docker")
+TOXIC = "che idiota questo esercizio"  # finisce in coda di moderazione
+
+
+def _sentence(rng: random.Random, n: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+# --- seed ---
+def seed(args):
+    db_path = Path(args.db).resolve()
+    if db_path.exists():
+        if not args.force:
+            sys.exit(f"{db_path} esiste già (--force per ricrearlo)")
+        db_path.unlink()
+    # impronte dei quasi-duplicati del DB precedente (app/neardup.py)
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{db_path.with_suffix('.neardup.db')}{suffix}").unlink(missing_ok=True)
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["BACKUP_INTERVAL_MINUTES"] = "0"
+
+    from flask_migrate import stamp
+    from sqlalchemy import insert
+
+    from app import create_app, db, skills, stats
+    from app.models import Course, Student, Post, Like, Comment
+
+    rng = random.Random(args.seed)
+    app = create_app()
+    now = datetime.utcnow()
+    with app.app_context():
+        # schema dai modelli (la prima migrazione presuppone il DB storico), poi head
+        db.create_all()
+        stamp(directory=str(BASE_DIR / "migrations"))
+
+        course = Course(slug="python-base", nome="Python Base")
+        db.session.add(course)
+        db.session.flush()
+        emails = [f"student{i}@loadtest.local" for i in range(args.students)]
+        db.session.execute(insert(Student), [
+            {"nome": f"Studente {i}", "email": email, "corso": course.nome,
+             "course_id": course.id, "programmi": ", ".join(rng.sample(SKILLS, rng.randint(1, 4)))}
+            for i, email in enumerate(emails + [ADMIN_EMAIL])
+        ])
+        student_ids = list(db.session.execute(db.select(Student.id)).scalars())
+
+        posts = []
+        for i in range(args.posts):
+            pending = rng.random() < args.pending_ratio
+            posts.append({
+                "author_id": rng.choice(student_ids),
+                "course_id": course.id,
+                "content": TOXIC if pending else _sentence(rng),
+                "created_at": now - timedelta(minutes=args.posts - i),
+                "moderation_status": "pending" if pending else "approved",
+                "is_visible": not pending,
+            })
+        db.session.execute(insert(Post), posts)
+        post_ids = list(db.session.execute(
+            db.select(Post.id).where(Post.moderation_status == "approved")).scalars())
+
+        comments, likes = [], set()
+        for post_id in post_ids:
+            for _ in range(rng.randint(0, args.comments_per_post * 2)):
+                comments.append({"user_id": rng.choice(student_ids), "post_id": post_id,
+                                 "body": _sentence(rng, 6), "created_at": now})
+            for _ in range(rng.randint(0, args.likes_per_post * 2)):
+                likes.add((rng.choice(student_ids), post_id))
+        db.session.execute(insert(Comment), comments)
+        db.session.execute(insert(Like), [{"user_id": u, "post_id": p, "created_at": now}
+                                          for u, p in likes])
+        stats.rebuild()
+        skills.rebuild()
+        db.session.commit()
+
+    manifest = {
+        "db": str(db_path),
+        "students": emails,
+        "admin": ADMIN_EMAIL,
+        "post_ids": post_ids,
+        "hot_post_id": post_ids[-1],
+        "counts": {"students": len(student_ids), "posts": len(posts),
+                   "comments": len(comments), "likes": len(likes)},
+    }
+    manifest_path = db_path.with_suffix(".json")
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+    print(json.dumps(manifest["counts"]))
+    print(f"manifest: {manifest_path}")
+    print("avvia il server con:")
+    print(f"  DATABASE_URL=sqlite:///{db_path} RATELIMIT_ENABLED=0 ADMIN_EMAILS={ADMIN_EMAIL} "
+          "gunicorn -w 4 -b 127.0.0.1:8000 wsgi:app")
+
+
+# --- client HTTP minimo (keep-alive, cookie) ---
+class Client:
+    def __init__(self, host: str, port: int, timeout: float):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.cookies = {}
+        self._reader = self._writer = None
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+    async def request(self, method: str, path: str, form: dict | None = None,
+                      headers: dict | None = None) -> tuple[int, bytes]:
+        body = urlencode(form).encode() if form is not None else b""
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                 f"Content-Length: {len(body)}"]
+        if form is not None:
+            lines.append("Content-Type: application/x-www-form-urlencoded")
+        if self.cookies:
+            lines.append("Cookie: " + "; ".join(f"{k}={v}" for k, v in self.cookies.items()))
+        lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+        raw = ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+        for attempt in (1, 2):  # il server può aver chiuso la connessione keep-alive
+            if self._writer is None:
+                await self._connect()
+            try:
+                self._writer.write(raw)
+                await self._writer.drain()
+                return await asyncio.wait_for(self._read_response(), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self.close()
+                if attempt == 2:
+                    raise
+            except BaseException:
+                self.close()
+                raise
+
+    async def _read_response(self) -> tuple[int, bytes]:
+        head = await self._reader.readuntil(b"\r\n\r\n")
+        status_line, *header_lines = head.decode("latin-1").split("\r\n")
+        status = int(status_line.split(" ", 2)[1])
+        headers = {}
+        for line in filter(None, header_lines):
+            name, _, value = line.partition(":")
+            name, value = name.strip().lower(), value.strip()
+            if name == "set-cookie":
+                cookie = value.split(";", 1)[0]
+                key, _, val = cookie.partition("=")
+                if val:
+                    self.cookies[key] = val
+                else:
+                    self.cookies.pop(key, None)
+            headers[name] = value
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            parts = []
+            while True:
+                size = int((await self._reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await self._reader.readuntil(b"\r\n")
+                    break
+                parts.append(await self._reader.readexactly(size))
+                await self._reader.readexactly(2)
+            body = b"".join(parts)
+        elif "content-length" in headers:
+            body = await self._reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await self._reader.read()
+            self.close()
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, body
+
+
+# --- scenari ---
+class Recorder:
+    def __init__(self):
+        self.samples = {}  # endpoint -> [ms]
+        self.errors = {}   # endpoint -> n
+
+    async def call(self, client: Client, name: str, method: str, path: str, **kw):
+        start = time.perf_counter()
+        try:
+            status, body = await client.request(method, path, **kw)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            status, body = 0, b""
+        self.samples.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+        if not 200 <= status < 400:
+            self.errors[name] = self.errors.get(name, 0) + 1
+        return status, body
+
+
+JSON = {"Accept": "application/json"}
+
+
+async def anon(rec, client, m, rng):
+    post_id = rng.choice(m["post_ids"])
+    await rec.call(client, "GET /feed", "GET", "/feed")
+    await rec.call(client, "GET /post/<id>", "GET", f"/post/{post_id}")
+    await rec.call(client, "GET /api/posts/<id>/comments", "GET", f"/api/posts/{post_id}/comments")
+    query = urlencode([("skill", s) for s in rng.sample(SKILLS, 2)])
+    await rec.call(client, "GET /api/students?skill=", "GET", f"/api/students?{query}")
+
+
+async def user(rec, client, m, rng):
+    post_id = rng.choice(m["post_ids"])
+    await rec.call(client, "GET /feed", "GET", "/feed")
+    await rec.call(client, "GET /me", "GET", "/me")
+    await rec.call(client, "GET /api/posts/<id>/like", "GET", f"/api/posts/{post_id}/like")
+
+
+async def like(rec, client, m, rng):
+    await rec.call(client, "POST /api/posts/<id>/like/toggle", "POST",
+                   f"/api/posts/{m['hot_post_id']}/like/toggle")
+
+
+async def post(rec, client, m, rng):
+    content = TOXIC if rng.random() < 0.2 else _sentence(rng)
+    await rec.call(client, "POST /post/create", "POST", "/post/create", form={"content": content})
+
+
+async def comment(rec, client, m, rng):
+    for _ in range(3):
+        await rec.call(client, "POST /comment/<id>", "POST", f"/comment/{m['hot_post_id']}",
+                       form={"body": _sentence(rng, 6)}, headers=JSON)
+
+
+async def admin(rec, client, m, rng):
+    await rec.call(client, "GET /admin/moderation", "GET", "/admin/moderation")
+    status, body = await rec.call(client, "GET /admin/moderation/pending", "GET",
+                                  "/admin/moderation/pending?limit=20")
+    try:
+        pending = json.loads(body).get("pending_posts", []) if status == 200 else []
+    except ValueError:
+        pending = []
+    if pending:
+        await rec.call(client, "POST /admin/moderation/post/<id>/approve", "POST",
+                       f"/admin/moderation/post/{pending[0]['id']}/approve", form={})
+
+
+SCENARIOS = {"anon": anon, "user": user, "like": like, "post": post, "comment": comment, "admin": admin}
+
+
+async def virtual_user(kind, rec, m, args, deadline, rng):
+    client = Client(args.host, args.port, args.timeout)
+    try:
+        if kind == "admin":
+            await rec.call(client, "POST /login", "POST", "/login", form={"email": m["admin"]})
+        elif kind != "anon":
+            await rec.call(client, "POST /login", "POST", "/login",
+                           form={"email": rng.choice(m["students"])})
+        while time.perf_counter() < deadline:
+            await SCENARIOS[kind](rec, client, m, rng)
+            if args.think_ms:
+                await asyncio.sleep(rng.uniform(0, 2 * args.think_ms) / 1000)
+    finally:
+        client.close()
+
+
+def _parse_mix(text: str) -> dict[str, int]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            sys.exit(f"scenario sconosciuto: {name} (disponibili: {', '.join(SCENARIOS)})")
+        mix[name.strip()] = int(weight or 1)
+    return mix
+
+
+def _assign(mix: dict[str, int], users: int) -> list[str]:
+    """Distribuisce gli utenti sugli scenari in proporzione ai pesi (almeno 1 per scenario)."""
+    total = sum(mix.values())
+    kinds = []
+    for name, weight in mix.items():
+        kinds += [name] * max(1, round(users * weight / total))
+    return kinds
+
+
+def _percentile(sorted_ms: list[float], p: float) -> float:
+    # nearest-rank
+    k = max(0, min(len(sorted_ms) - 1, int(round(p / 100 * len(sorted_ms) + 0.5)) - 1))
+    return round(sorted_ms[k], 1)
+
+
+def build_report(rec: Recorder, meta: dict, elapsed: float) -> dict:
+    endpoints = {}
+    for name, samples in sorted(rec.samples.items()):
+        ms = sorted(samples)
+        endpoints[name] = {
+            "requests": len(ms),
+            "errors": rec.errors.get(name, 0),
+            "rps": round(len(ms) / elapsed, 1),
+            "p50_ms": _percentile(ms, 50),
+            "p95_ms": _percentile(ms, 95),
+            "p99_ms": _percentile(ms, 99),
+            "max_ms": round(ms[-1], 1),
+        }
+    requests = sum(e["requests"] for e in endpoints.values())
+    return {
+        "meta": {**meta, "elapsed_seconds": round(elapsed, 1)},
+        "totals": {"requests": requests, "errors": sum(rec.errors.values()),
+                   "rps": round(requests / elapsed, 1)},
+        "endpoints": endpoints,
+    }
+
+
+def render_html(report: dict, baseline: dict | None) -> str:
+    cols = ("requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+    base = (baseline or {}).get("endpoints", {})
+
+    def cell(name, col):
+        value = report["endpoints"][name][col]
+        old = base.get(name, {}).get(col)
+        if not old or col in ("requests", "errors"):
+            return f"<td>{value}</td>"
+        change = (value - old) / old * 100
+        # latenze: meglio se scendono; rps: meglio se sale
+        good = change < 0 if col.endswith("_ms") else change > 0
+        color = "#1a7f37" if good else "#cf222e"
+        return f'<td>{value} <small style="color:{color}">({change:+.0f}%)</small></td>'
+
+    rows = "".join(
+        f"<tr><th>{html.escape(name)}</th>{''.join(cell(name, c) for c in cols)}</tr>"
+        for name in report["endpoints"]
+    )
+    meta = html.escape(json.dumps(report["meta"], indent=2))
+    totals = report["totals"]
+    note = f"<p>confronto con: {html.escape(baseline['meta'].get('started_at', '?'))}</p>" if baseline else ""
+    return f"""<!doctype html>
+<html lang="it"><head><meta charset="utf-8"><title>Load test {html.escape(report['meta']['started_at'])}</title>
+<style>body{{font-family:sans-serif;margin:2rem}}table{{border-collapse:collapse}}
+td,th{{border:1px solid #ccc;padding:4px 8px;text-align:right}}th:first-child{{text-align:left}}</style>
+</head><body>
+<h1>Load test</h1>
+<p><b>{totals['rps']}</b> req/s, {totals['requests']} richieste, {totals['errors']} errori</p>
+{note}
+<table><tr><th>endpoint</th>{''.join(f'<th>{c}</th>' for c in cols)}</tr>{rows}</table>
+<pre>{meta}</pre>
+</body></html>
+"""
+
+
+async def run(args):
+    manifest_path = Path(args.manifest) if args.manifest else Path(args.db).resolve().with_suffix(".json")
+    m = json.loads(manifest_path.read_text(encoding="utf-8"))
+    mix = _parse_mix(args.mix)
+    kinds = _assign(mix, args.users)
+    rng = random.Random(args.seed)
+
+    rec = Recorder()
+    started_at = datetime.now().isoformat(timespec="seconds")
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(
+        virtual_user(kind, rec, m, args, deadline, random.Random(rng.random())) for kind in kinds
+    ))
+    elapsed = time.perf_counter() - start
+
+    meta = {"started_at": started_at, "target": f"{args.host}:{args.port}", "users": len(kinds),
+            "mix": mix, "duration": args.duration, "think_ms": args.think_ms,
+            "dataset": m.get("counts", {})}
+    report = build_report(rec, meta, elapsed)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.html:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8")) if args.baseline else None
+        Path(args.html).write_text(render_html(report, baseline), encoding="utf-8")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    sp = sub.add_parser("seed", help="crea il database del load test")
+    sp.add_argument("--db", default=str(BASE_DIR / "instance" / "loadtest.db"))
+    sp.add_argument("--students", type=int, default=500)
+    sp.add_argument("--posts", type=int, default=5000)
+    sp.add_argument("--comments-per-post", type=int, default=3)
+    sp.add_argument("--likes-per-post", type=int, default=5)
+    sp.add_argument("--pending-ratio", type=float, default=0.02)
+    sp.add_argument("--seed", type=int, default=1)
+    sp.add_argument("--force", action="store_true")
+
+    rp = sub.add_parser("run", help="esegue il load test contro un server avviato")
+    rp.add_argument("--host", default="127.0.0.1")
+    rp.add_argument("--port", type=int, default=8000)
+    rp.add_argument("--db", default=str(BASE_DIR / "instance" / "loadtest.db"),
+                    help="il manifest è accanto al DB (stesso nome, .json)")
+    rp.add_argument("--manifest")
+    rp.add_argument("--users", type=int, default=100)
+    rp.add_argument("--duration", type=float, default=30)
+    rp.add_argument("--mix", default=DEFAULT_MIX)
+    rp.add_argument("--think-ms", type=float, default=0, help="pausa media tra uno scenario e l'altro")
+    rp.add_argument("--timeout", type=float, default=10)
+    rp.add_argument("--seed", type=int, default=1)
+    rp.add_argument("--out", help="report JSON")
+    rp.add_argument("--html", help="report HTML")
+    rp.add_argument("--baseline", help="report JSON di un run precedente, per il confronto nell'HTML")
+
+    args = ap.parse_args()
+    if args.cmd == "seed":
+        seed(args)
+    else:
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,175 @@
-# config.py
-from pathlib import Path
-import os
-
-# Cartelle base
-BASE_DIR = Path(__file__).resolve().parent
-INSTANCE_DIR = BASE_DIR / "instance"
-INSTANCE_DIR.mkdir(exist_ok=True)
-
-STATIC_DIR = BASE_DIR / "app" / "static"
-UPLOAD_FOLDER = STATIC_DIR / "uploads"
-UPLOAD_FOLDER.mkdir(parents=True, exist_ok=True)
-
-
-class Config:
-    # --- Sicurezza / App ---
-    SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-change-me")
-
-    # --- Database ---
-    SQLALCHEMY_DATABASE_URI = f"sqlite:///{INSTANCE_DIR / 'social.db'}"
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
-
-    # --- Static / Upload ---
-    STATIC_DIR = STATIC_DIR  # Path object (usato nell’app)
-    UPLOAD_FOLDER = UPLOAD_FOLDER  # Path object (usato nell’app)
-    MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50 MB (anche video)
-
-    # --- Estensioni file ammesse ---
-    ALLOWED_IMAGE_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp"}
-    ALLOWED_VIDEO_EXTENSIONS = {"mp4", "webm", "mov", "avi", "mkv"}
-    ALLOWED_EXTENSIONS = ALLOWED_IMAGE_EXTENSIONS | ALLOWED_VIDEO_EXTENSIONS
-
-
-# --- Moderazione (soglie regolabili) ---
-# score < PENDING => approve ; PENDING <= score < REJECT => pending ; score >= REJECT => reject
-TOXICITY_PENDING_THRESHOLD = 0.60
-TOXICITY_REJECT_THRESHOLD = 0.80
-# --- Moderazione: amministratori (email che possono usare la dashboard admin) ---
-# Popola con le email reali, es: ["prof@example.com", "tutor@example.com"]
-ADMIN_EMAILS = [
-    e.strip().lower()
-    for e in os.environ.get("ADMIN_EMAILS", "").split(",")
-    if e.strip()
-]
-
-# --- Rate limiting (se usi Flask-Limiter) ---
-# Storage in memoria per dev; in produzione usa Redis: "redis://localhost:6379/0"
-RATELIMIT_STORAGE_URI = os.environ.get("RATELIMIT_STORAGE_URI", "memory://")
-# Limite di fallback per endpoint non decorati (opzionale)
-RATELIMIT_DEFAULT = os.environ.get("RATELIMIT_DEFAULT", "100 per 5 minutes")
+# config.py
+from pathlib import Path
+import os
+
+# Cartelle base
+BASE_DIR = Path(__file__).resolve().parent
+# niente mkdir all'import: instance/ la crea create_app, uploads/ il primo upload
+INSTANCE_DIR = BASE_DIR / "instance"
+
+STATIC_DIR = BASE_DIR / "app" / "static"
+UPLOAD_FOLDER = STATIC_DIR / "uploads"
+
+
+class Config:
+    # --- Sicurezza / App ---
+    SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-change-me")
+
+    # --- Database ---
+    # DATABASE_URL per puntare a un altro file (es. il DB del load test)
+    SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", f"sqlite:///{INSTANCE_DIR / 'social.db'}")
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # --- Static / Upload ---
+    STATIC_DIR = STATIC_DIR  # Path object (usato nell’app)
+    UPLOAD_FOLDER = UPLOAD_FOLDER  # Path object (usato nell’app)
+    MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50 MB (anche video)
+
+    # --- Estensioni file ammesse ---
+    ALLOWED_IMAGE_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp"}
+    ALLOWED_VIDEO_EXTENSIONS = {"mp4", "webm", "mov", "avi", "mkv"}
+    ALLOWED_EXTENSIONS = ALLOWED_IMAGE_EXTENSIONS | ALLOWED_VIDEO_EXTENSIONS
+    # --- Video (app/video.py): faststart, poster, ricodifica in background ---
+    FFMPEG_BINARY = os.environ.get("FFMPEG_BINARY")  # None = ffmpeg nel PATH (cercato al primo video)
+    VIDEO_WORKERS = int(os.environ.get("VIDEO_WORKERS", "1"))  # processi ffmpeg in parallelo
+    VIDEO_TRANSCODE_EXOTIC = True  # AVI/MKV (e MOV non remuxabili) ricodificati
+    VIDEO_TRANSCODE_FORMAT = "mp4"  # "mp4" (H.264/AAC) oppure "webm" (VP9/Opus)
+    VIDEO_TIMEOUT_SECONDS = 300
+    # `flask media gc` non tocca file più recenti di così (upload non ancora collegati)
+    MEDIA_ORPHAN_GRACE_SECONDS = 3600
+
+    # --- Query budget (rilevamento N+1) ---
+    # 'log' in produzione, 'raise' in dev/test per far fallire le regressioni
+    QUERY_BUDGET_ACTION = os.environ.get("QUERY_BUDGET_ACTION", "log")
+    # quante volte la stessa query (normalizzata) può ripetersi in una richiesta
+    QUERY_BUDGET_MAX_REPEAT = int(os.environ.get("QUERY_BUDGET_MAX_REPEAT", "5"))
+
+    # --- Bacheca personale (/me) ---
+    MY_FEED_PAGE_SIZE = 20
+
+    # --- Feed dei corsi (/corso/<slug>/feed) ---
+    COURSE_FEED_PAGE_SIZE = 20
+
+    # --- Directory studenti (GET /api/students?skill=...) ---
+    STUDENTS_PAGE_SIZE = 20
+    STUDENTS_MAX_SKILLS = 5       # competenze per ricerca (ognuna è un join)
+
+    # --- Commenti ---
+    FEED_COMMENTS_PER_POST = 3  # ultimi commenti mostrati sotto ogni post del feed
+    COMMENTS_PAGE_SIZE = 20  # default di GET /api/posts/<id>/comments (max 100)
+
+    # --- Coda di moderazione ---
+    MODERATION_PAGE_SIZE = 50  # elementi per pagina (post e commenti separatamente)
+    # utenti in shadow-ban: visibilità dei loro contenuti ricalcolata a blocchi di N righe
+    SHADOW_BAN_CHUNK_SIZE = 500
+    # segnalazioni distinte dopo cui un contenuto approvato torna pending e viene nascosto (0 = mai)
+    REPORT_AUTO_HIDE_THRESHOLD = int(os.environ.get("REPORT_AUTO_HIDE_THRESHOLD", "3"))
+    # email che possono usare la dashboard admin (ADMIN_EMAILS=prof@example.com,tutor@example.com)
+    ADMIN_EMAILS = [e.strip().lower() for e in os.environ.get("ADMIN_EMAILS", "").split(",") if e.strip()]
+
+    # --- Quasi-duplicati (app/neardup.py): copia-incolla e flood vanno in revisione ---
+    NEARDUP_ENABLED = os.environ.get("NEARDUP_ENABLED", "1") == "1"
+    NEARDUP_DB_PATH = None  # None = accanto al DB principale (social.db -> social.neardup.db)
+    NEARDUP_WINDOW_HOURS = 24  # confronto solo con i contenuti delle ultime N ore
+    NEARDUP_BANDS = 16  # finestre LSH sulla SimHash a 64 bit...
+    NEARDUP_BAND_BITS = 8  # ...da 8 bit ciascuna
+    NEARDUP_MAX_DISTANCE = 10  # bit diversi (su 64) entro cui due testi sono "quasi uguali"
+    NEARDUP_MIN_TOKENS = 6  # i testi più corti ("grazie!", "ok") non vengono confrontati
+    NEARDUP_MIN_MATCHES = 1  # copie recenti da cui il contenuto va in pending
+    NEARDUP_MAX_ITEMS = 100_000  # impronte in memoria per worker
+    NEARDUP_QUEUE_PRIORITY = 0.5  # posto minimo in coda dei quasi-duplicati (sotto i tossici)
+
+    # --- Termini di tendenza (app/trending.py, GET /api/trending) ---
+    TRENDING_ENABLED = os.environ.get("TRENDING_ENABLED", "1") == "1"
+    TRENDING_DB_PATH = INSTANCE_DIR / "trending.db"  # contatori per bucket, condivisi tra worker
+    TRENDING_TERMS_PER_BUCKET = 500  # termini tenuti per ora/giorno (Space-Saving)
+    TRENDING_MIN_LENGTH = 4  # parole più corte ignorate (gli hashtag contano sempre)
+    TRENDING_HOURLY_RETENTION_HOURS = 48  # finestre fino a 48h con bucket orari...
+    TRENDING_DAILY_RETENTION_DAYS = 30  # ...oltre, bucket giornalieri
+    TRENDING_CACHE_SECONDS = 60
+    TRENDING_SIDEBAR_SIZE = 10  # termini nel riquadro del feed (ultime 24h)
+
+    # --- Rate limiting (Flask-Limiter) ---
+    # SQLite in WAL condiviso tra tutti i worker della macchina (niente Redis).
+    # "memory://" torna ai contatori per-processo.
+    RATELIMIT_STORAGE_URI = os.environ.get(
+        "RATELIMIT_STORAGE_URI", f"sqlite:///{INSTANCE_DIR / 'ratelimit.db'}"
+    )
+    RATELIMIT_STRATEGY = os.environ.get("RATELIMIT_STRATEGY", "moving-window")
+    # RATELIMIT_ENABLED=0 spegne tutti i limiti (load test, benchmarks/loadtest.py)
+    RATELIMIT_ENABLED = os.environ.get("RATELIMIT_ENABLED", "1") == "1"
+    RATELIMIT_POST_CREATE = os.environ.get("RATELIMIT_POST_CREATE", "5 per 5 minutes")
+    RATELIMIT_COMMENT = os.environ.get("RATELIMIT_COMMENT", "10 per 5 minutes")
+    RATELIMIT_LIKE_TOGGLE = os.environ.get("RATELIMIT_LIKE_TOGGLE", "30 per 5 minutes")
+
+    # --- Eventi live (SSE) ---
+    # ogni scheda aperta tiene occupata una connessione /events/stream: con il
+    # server WSGI serve un worker a thread o gevent (gunicorn --threads N /
+    # -k gevent), con i worker sync bastano poche schede a bloccarli tutti.
+    # None = attivo solo in modalità ASGI (asgi.py); 1/0 lo forza
+    EVENTS_LIVE = {"1": True, "0": False}.get(os.environ.get("EVENTS_LIVE", ""))
+    EVENTS_DB_PATH = INSTANCE_DIR / "events.db"  # tabella di appoggio tra worker
+    EVENTS_HEARTBEAT_SECONDS = 15
+    EVENTS_POLL_INTERVAL = 0.5  # secondi tra una lettura e l'altra della tabella
+    EVENTS_QUEUE_SIZE = 100  # eventi in coda per connessione prima di scartare i vecchi
+    EVENTS_MAX_SUBSCRIBERS = 200  # connessioni SSE per processo (con WSGI: non oltre i thread)
+    EVENTS_RETENTION_SECONDS = 300  # eventi più vecchi cancellati (anche da chi pubblica)
+    EVENTS_WAL_LIMIT_BYTES = 4 * 1024 * 1024  # il WAL di events.db torna sotto questa soglia
+
+    # --- Like in write-behind (app/likebuffer.py) ---
+    # i toggle finiscono in un buffer su disco e arrivano a social.db a blocchi
+    LIKE_BUFFER_ENABLED = os.environ.get("LIKE_BUFFER_ENABLED", "0") == "1"
+    LIKE_BUFFER_DB_PATH = INSTANCE_DIR / "like_buffer.db"
+    LIKE_BUFFER_FLUSH_MS = 300  # ogni quanto il buffer viene applicato al DB
+
+    # --- Template ---
+    # bytecode dei template Jinja condiviso tra worker e riavvii (None = disattivato);
+    # `flask templates compile` lo riempie al deploy
+    JINJA_BYTECODE_CACHE_DIR = INSTANCE_DIR / "jinja_cache"
+
+    # --- Compressione e statici ---
+    COMPRESS_MIMETYPES = {
+        "text/html", "text/css", "text/plain", "text/javascript", "application/javascript",
+        "application/json", "image/svg+xml",
+    }
+    COMPRESS_MIN_SIZE = 1024  # byte: sotto questa soglia non conviene
+    COMPRESS_GZIP_LEVEL = 6
+    COMPRESS_BR_QUALITY = 5  # al volo; i file di `flask static build` usano il massimo
+    STATIC_DIST_DIR = "dist"  # sotto app/static: file con hash, serviti con cache immutabile
+
+    # --- Cache feed ---
+    # secondi di validità del feed pubblico renderizzato (0 = niente cache);
+    # svuotata comunque a ogni commit che tocca post, commenti, like o studenti
+    FEED_CACHE_SECONDS = int(os.environ.get("FEED_CACHE_SECONDS", "10"))
+
+    # --- Archivio dei post vecchi (app/archive.py, `flask archive run`) ---
+    ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "180"))
+    ARCHIVE_CHUNK_SIZE = 500  # post spostati per transazione
+    ARCHIVE_PAGE_SIZE = 20  # post per pagina in /archivio
+
+    # --- Backup del database (app/backup.py, `flask db backup`) ---
+    BACKUP_DIR = INSTANCE_DIR / "backups"
+    BACKUP_METHOD = "step"  # "step" (API di backup a passi) oppure "vacuum" (VACUUM INTO)
+    BACKUP_PAGES_PER_STEP = 256  # pagine copiate per passo (lock in lettura per passo)
+    BACKUP_STEP_PAUSE_SECONDS = 0.005  # pausa tra i passi, per chi deve scrivere
+    BACKUP_MAX_RESTARTS = 5  # ripartenze della copia a passi prima di passare a VACUUM INTO
+    BACKUP_KEEP = 14  # copie conservate
+    # backup periodico da un thread dei worker (0 = solo a mano)
+    BACKUP_INTERVAL_MINUTES = int(os.environ.get("BACKUP_INTERVAL_MINUTES", "0"))
+
+    # --- Export per le analisi (`flask export`, richiede pyarrow) ---
+    EXPORT_DIR = INSTANCE_DIR / "exports"
+    EXPORT_CHUNK_SIZE = 10_000  # righe lette e scritte per blocco
+
+
+# --- Moderazione (soglie regolabili) ---
+# score < PENDING => approve ; PENDING <= score < REJECT => pending ; score >= REJECT => reject
+TOXICITY_PENDING_THRESHOLD = 0.60
+TOXICITY_REJECT_THRESHOLD = 0.80
+# --- Moderazione: amministratori ---
+# in Config.ADMIN_EMAILS (env ADMIN_EMAILS)
+
+# --- Rate limiting ---
+# Storage e strategia sono in Config (RATELIMIT_STORAGE_URI / RATELIMIT_STRATEGY)
+# Limite di fallback per endpoint non decorati (opzionale)
+RATELIMIT_DEFAULT = os.environ.get("RATELIMIT_DEFAULT", "100 per 5 minutes")
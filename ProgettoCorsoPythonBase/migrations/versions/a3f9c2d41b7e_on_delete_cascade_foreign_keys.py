@@ -0,0 +1,45 @@
+"""ON DELETE CASCADE on foreign keys
+
+Revision ID: a3f9c2d41b7e
+Revises: 79f4eb811acd
+Create Date: 2026-10-19 09:12:40.118305
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f9c2d41b7e'
+down_revision = '79f4eb811acd'
+branch_labels = None
+depends_on = None
+
+# le FK originali non hanno nome: in batch mode le si individua con una naming convention
+naming_convention = {
+    "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
+}
+
+FOREIGN_KEYS = {
+    'posts': [('author_id', 'students')],
+    'likes': [('user_id', 'students'), ('post_id', 'posts')],
+    'comments': [('user_id', 'students'), ('post_id', 'posts')],
+    'reports': [('reporter_id', 'students'), ('post_id', 'posts'), ('comment_id', 'comments')],
+}
+
+
+def _recreate_foreign_keys(ondelete):
+    for table, fks in FOREIGN_KEYS.items():
+        with op.batch_alter_table(table, schema=None, naming_convention=naming_convention,
+                                  recreate='always') as batch_op:
+            for column, referred in fks:
+                name = f'fk_{table}_{column}_{referred}'
+                batch_op.drop_constraint(name, type_='foreignkey')
+                batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    _recreate_foreign_keys('CASCADE')
+
+
+def downgrade():
+    _recreate_foreign_keys(None)
@@ -0,0 +1,79 @@
+"""Courses table and course_id on students and posts (feed per corso)
+
+Revision ID: a6c1f0d3b975
+Revises: d4a9e2c7b816
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+import re
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c1f0d3b975'
+down_revision = 'd4a9e2c7b816'
+branch_labels = None
+depends_on = None
+
+COURSE_TABLES = ('students', 'posts', 'posts_archive')
+
+
+def _slugify(nome):
+    # copia di app.courses.slugify: la migrazione non dipende dal codice dell'app
+    ascii_name = unicodedata.normalize('NFKD', nome or '').encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '-', ascii_name.lower()).strip('-')
+
+
+def upgrade():
+    op.create_table(
+        'courses',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('slug', sa.String(length=120), nullable=False),
+        sa.Column('nome', sa.String(length=120), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('slug'),
+    )
+
+    # ADD COLUMN invece del batch: niente ricostruzione di posts (e dei suoi indici DESC)
+    for table in COURSE_TABLES:
+        op.execute(f'ALTER TABLE {table} ADD COLUMN course_id INTEGER '
+                   f'REFERENCES courses (id) ON DELETE SET NULL')
+    op.create_index('ix_students_course_id', 'students', ['course_id'], unique=False)
+    op.create_index('ix_posts_course_created', 'posts', ['course_id', 'created_at'], unique=False)
+
+    # backfill: un corso per slug, il nome è quello del primo studente che l'ha scritto
+    conn = op.get_bind()
+    slugs = {}
+    for student_id, corso in conn.execute(sa.text('SELECT id, corso FROM students ORDER BY id')):
+        slug = _slugify(corso)
+        if not slug:
+            continue
+        if slug not in slugs:
+            conn.execute(sa.text('INSERT INTO courses (slug, nome, created_at) '
+                                 'VALUES (:slug, :nome, CURRENT_TIMESTAMP)'),
+                         {'slug': slug, 'nome': ' '.join(corso.split())})
+            slugs[slug] = conn.execute(sa.text('SELECT id FROM courses WHERE slug = :slug'),
+                                       {'slug': slug}).scalar_one()
+        conn.execute(sa.text('UPDATE students SET course_id = :course_id WHERE id = :id'),
+                     {'course_id': slugs[slug], 'id': student_id})
+    for table in ('posts', 'posts_archive'):
+        op.execute(f'UPDATE {table} SET course_id = '
+                   f'(SELECT course_id FROM students WHERE students.id = {table}.author_id)')
+
+
+def downgrade():
+    op.drop_index('ix_posts_course_created', table_name='posts')
+    op.drop_index('ix_students_course_id', table_name='students')
+    for table in COURSE_TABLES:
+        kwargs = {'sqlite_autoincrement': True} if table == 'posts' else {}
+        with op.batch_alter_table(table, schema=None, table_kwargs=kwargs) as batch_op:
+            batch_op.drop_column('course_id')
+    # la ricostruzione di posts perde il DESC dell'indice della coda di moderazione
+    op.drop_index('ix_posts_moderation_queue', table_name='posts')
+    op.create_index('ix_posts_moderation_queue', 'posts',
+                    ['moderation_status', sa.text('toxicity_score DESC'), 'created_at'])
+    op.drop_table('courses')
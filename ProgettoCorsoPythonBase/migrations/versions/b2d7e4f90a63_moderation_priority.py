@@ -0,0 +1,40 @@
+"""moderation_priority on posts and comments: queue order apart from toxicity_score
+
+Revision ID: b2d7e4f90a63
+Revises: c3e8b1f5a042
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2d7e4f90a63'
+down_revision = 'c3e8b1f5a042'
+branch_labels = None
+depends_on = None
+
+QUEUE_TABLES = ('posts', 'comments')
+
+
+def upgrade():
+    for table in QUEUE_TABLES:
+        # ADD COLUMN invece del batch: niente ricostruzione della tabella
+        op.execute(f'ALTER TABLE {table} ADD COLUMN moderation_priority FLOAT NOT NULL DEFAULT 0')
+        op.execute(f'UPDATE {table} SET moderation_priority = COALESCE(toxicity_score, 0)')
+        op.drop_index(f'ix_{table}_moderation_queue', table_name=table)
+        op.create_index(f'ix_{table}_moderation_queue', table,
+                        ['moderation_status', sa.text('moderation_priority DESC'), 'created_at'],
+                        unique=False)
+
+
+def downgrade():
+    for table in QUEUE_TABLES:
+        op.drop_index(f'ix_{table}_moderation_queue', table_name=table)
+        with op.batch_alter_table(table, schema=None,
+                                  table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+            batch_op.drop_column('moderation_priority')
+        op.create_index(f'ix_{table}_moderation_queue', table,
+                        ['moderation_status', sa.text('toxicity_score DESC'), 'created_at'],
+                        unique=False)
@@ -0,0 +1,42 @@
+"""Per-student stats table and author/date index on posts
+
+Revision ID: b8e3f5a1c920
+Revises: f1c4a6d8b203
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e3f5a1c920'
+down_revision = 'f1c4a6d8b203'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'student_stats',
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('posts_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('likes_received', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('comments_received', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('student_id'),
+    )
+    op.execute("""
+        INSERT INTO student_stats (student_id, posts_count, likes_received, comments_received)
+        SELECT s.id,
+               (SELECT COUNT(*) FROM posts p WHERE p.author_id = s.id),
+               (SELECT COUNT(*) FROM likes l JOIN posts p ON p.id = l.post_id WHERE p.author_id = s.id),
+               (SELECT COUNT(*) FROM comments c JOIN posts p ON p.id = c.post_id WHERE p.author_id = s.id)
+        FROM students s
+    """)
+    op.create_index('ix_posts_author_created', 'posts', ['author_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_posts_author_created', table_name='posts')
+    op.drop_table('student_stats')
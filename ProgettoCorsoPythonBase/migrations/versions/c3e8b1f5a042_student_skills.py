@@ -0,0 +1,70 @@
+"""Skills table and student_skills link, backfilled from students.programmi
+
+Revision ID: c3e8b1f5a042
+Revises: a6c1f0d3b975
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8b1f5a042'
+down_revision = 'a6c1f0d3b975'
+branch_labels = None
+depends_on = None
+
+
+def _parse(programmi):
+    # copia di app.skills.parse: la migrazione non dipende dal codice dell'app
+    names = []
+    for part in (programmi or '').split(','):
+        nome = ' '.join(part.lower().split())
+        if nome and len(nome) <= 80 and nome not in names:
+            names.append(nome)
+    return names
+
+
+def upgrade():
+    op.create_table(
+        'skills',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nome', sa.String(length=80), nullable=False),
+        sa.Column('students_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('nome'),
+    )
+    op.create_table(
+        'student_skills',
+        sa.Column('skill_id', sa.Integer(), nullable=False),
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['skill_id'], ['skills.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('skill_id', 'student_id'),
+    )
+    op.create_index('ix_student_skills_student_id', 'student_skills', ['student_id'], unique=False)
+
+    # backfill: le competenze nell'ordine in cui compaiono, un legame per coppia
+    conn = op.get_bind()
+    ids = {}
+    links = []
+    for student_id, programmi in conn.execute(sa.text('SELECT id, programmi FROM students ORDER BY id')):
+        for nome in _parse(programmi):
+            if nome not in ids:
+                conn.execute(sa.text('INSERT INTO skills (nome, students_count) VALUES (:nome, 0)'),
+                             {'nome': nome})
+                ids[nome] = conn.execute(sa.text('SELECT id FROM skills WHERE nome = :nome'),
+                                         {'nome': nome}).scalar_one()
+            links.append({'skill_id': ids[nome], 'student_id': student_id})
+    if links:
+        conn.execute(sa.text('INSERT INTO student_skills (skill_id, student_id) '
+                             'VALUES (:skill_id, :student_id)'), links)
+    op.execute('UPDATE skills SET students_count = '
+               '(SELECT COUNT(*) FROM student_skills WHERE student_skills.skill_id = skills.id)')
+
+
+def downgrade():
+    op.drop_index('ix_student_skills_student_id', table_name='student_skills')
+    op.drop_table('student_skills')
+    op.drop_table('skills')
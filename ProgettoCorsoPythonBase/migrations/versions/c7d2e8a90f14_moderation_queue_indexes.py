@@ -0,0 +1,32 @@
+"""Composite indexes for the priority moderation queue
+
+Revision ID: c7d2e8a90f14
+Revises: a3f9c2d41b7e
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d2e8a90f14'
+down_revision = 'a3f9c2d41b7e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # la paginazione a cursore confronta toxicity_score: niente NULL nella coda
+    op.execute("UPDATE posts SET toxicity_score = 0 WHERE toxicity_score IS NULL")
+    op.execute("UPDATE comments SET toxicity_score = 0 WHERE toxicity_score IS NULL")
+
+    op.create_index('ix_posts_moderation_queue', 'posts',
+                    ['moderation_status', sa.text('toxicity_score DESC'), 'created_at'], unique=False)
+    op.create_index('ix_comments_moderation_queue', 'comments',
+                    ['moderation_status', sa.text('toxicity_score DESC'), 'created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_comments_moderation_queue', table_name='comments')
+    op.drop_index('ix_posts_moderation_queue', table_name='posts')
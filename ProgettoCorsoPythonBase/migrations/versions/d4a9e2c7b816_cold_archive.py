@@ -0,0 +1,112 @@
+"""Archive tables for old posts and AUTOINCREMENT on the hot tables
+
+Revision ID: d4a9e2c7b816
+Revises: b8e3f5a1c920
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a9e2c7b816'
+down_revision = 'b8e3f5a1c920'
+branch_labels = None
+depends_on = None
+
+# le righe archiviate conservano l'id: senza AUTOINCREMENT SQLite riusa
+# max(id)+1 e un nuovo post potrebbe prendere l'id di uno archiviato
+HOT_TABLES = ('posts', 'likes', 'comments', 'reports')
+
+
+def _recreate(autoincrement):
+    for table in HOT_TABLES:
+        with op.batch_alter_table(table, schema=None, recreate='always',
+                                  table_kwargs={'sqlite_autoincrement': autoincrement}):
+            pass
+    # la riflessione perde il DESC degli indici della coda di moderazione
+    for table in ('posts', 'comments'):
+        op.drop_index(f'ix_{table}_moderation_queue', table_name=table)
+        op.create_index(f'ix_{table}_moderation_queue', table,
+                        ['moderation_status', sa.text('toxicity_score DESC'), 'created_at'])
+
+
+def upgrade():
+    _recreate(True)
+
+    op.create_table(
+        'posts_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('author_id', sa.Integer(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=True),
+        sa.Column('image_url', sa.String(length=255), nullable=True),
+        sa.Column('video_url', sa.String(length=255), nullable=True),
+        sa.Column('video_stream_url', sa.String(length=255), nullable=True),
+        sa.Column('video_poster_url', sa.String(length=255), nullable=True),
+        sa.Column('video_status', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('moderation_status', sa.String(length=20), nullable=True),
+        sa.Column('toxicity_score', sa.Float(), nullable=True),
+        sa.Column('is_visible', sa.Boolean(), nullable=True),
+        sa.Column('report_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('archived_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.ForeignKeyConstraint(['author_id'], ['students.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_posts_archive_author_id', 'posts_archive', ['author_id'], unique=False)
+    op.create_index('ix_posts_archive_created_at', 'posts_archive', ['created_at'], unique=False)
+
+    op.create_table(
+        'likes_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['students.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['post_id'], ['posts_archive.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_likes_archive_post_id', 'likes_archive', ['post_id'], unique=False)
+
+    op.create_table(
+        'comments_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('moderation_status', sa.String(length=20), nullable=True),
+        sa.Column('toxicity_score', sa.Float(), nullable=True),
+        sa.Column('is_visible', sa.Boolean(), nullable=True),
+        sa.Column('report_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['user_id'], ['students.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['post_id'], ['posts_archive.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_comments_archive_post_id', 'comments_archive', ['post_id'], unique=False)
+
+    op.create_table(
+        'reports_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('reporter_id', sa.Integer(), nullable=False),
+        sa.Column('post_id', sa.Integer(), nullable=True),
+        sa.Column('comment_id', sa.Integer(), nullable=True),
+        sa.Column('reason', sa.String(length=300), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('handled', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['reporter_id'], ['students.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['post_id'], ['posts_archive.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['comment_id'], ['comments_archive.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_reports_archive_post_id', 'reports_archive', ['post_id'], unique=False)
+    op.create_index('ix_reports_archive_comment_id', 'reports_archive', ['comment_id'], unique=False)
+
+
+def downgrade():
+    op.drop_table('reports_archive')
+    op.drop_table('comments_archive')
+    op.drop_table('likes_archive')
+    op.drop_table('posts_archive')
+    _recreate(False)
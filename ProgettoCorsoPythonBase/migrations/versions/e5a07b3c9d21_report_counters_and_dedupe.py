@@ -0,0 +1,52 @@
+"""Report counters on posts/comments and one report per reporter and target
+
+Revision ID: e5a07b3c9d21
+Revises: c7d2e8a90f14
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a07b3c9d21'
+down_revision = 'c7d2e8a90f14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # tiene la prima segnalazione di ogni (reporter, contenuto)
+    op.execute("""
+        DELETE FROM reports WHERE post_id IS NOT NULL AND id NOT IN (
+            SELECT MIN(id) FROM reports WHERE post_id IS NOT NULL GROUP BY reporter_id, post_id
+        )
+    """)
+    op.execute("""
+        DELETE FROM reports WHERE comment_id IS NOT NULL AND id NOT IN (
+            SELECT MIN(id) FROM reports WHERE comment_id IS NOT NULL GROUP BY reporter_id, comment_id
+        )
+    """)
+    op.create_index('uq_report_reporter_post', 'reports', ['reporter_id', 'post_id'], unique=True)
+    op.create_index('uq_report_reporter_comment', 'reports', ['reporter_id', 'comment_id'], unique=True)
+
+    for table, fk in (('posts', 'post_id'), ('comments', 'comment_id')):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('report_count', sa.Integer(), nullable=False, server_default='0'))
+            batch_op.create_index(batch_op.f(f'ix_{table}_report_count'), ['report_count'], unique=False)
+        op.execute(f"""
+            UPDATE {table} SET report_count = (
+                SELECT COUNT(*) FROM reports WHERE reports.{fk} = {table}.id
+            )
+        """)
+
+
+def downgrade():
+    for table in ('comments', 'posts'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table}_report_count'))
+            batch_op.drop_column('report_count')
+
+    op.drop_index('uq_report_reporter_comment', table_name='reports')
+    op.drop_index('uq_report_reporter_post', table_name='reports')
@@ -0,0 +1,30 @@
+"""Derived video files on posts (faststart/transcoded stream, poster)
+
+Revision ID: f1c4a6d8b203
+Revises: e5a07b3c9d21
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c4a6d8b203'
+down_revision = 'e5a07b3c9d21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('video_stream_url', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('video_poster_url', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('video_status', sa.String(length=20), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.drop_column('video_status')
+        batch_op.drop_column('video_poster_url')
+        batch_op.drop_column('video_stream_url')
@@ -0,0 +1,90 @@
+# tests/conftest.py
+"""
+App su un DB SQLite temporaneo (schema dai modelli, come `loadtest.py seed`),
+con i file di appoggio (eventi, rate limit, impronte...) in una cartella
+temporanea: i test non toccano instance/.
+
+Uso (dalla cartella ProgettoCorsoPythonBase):
+    python -m pytest -q tests
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+ADMIN_EMAIL = "admin@test.local"
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("app")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp / 'social.db'}"
+    os.environ["BACKUP_INTERVAL_MINUTES"] = "0"
+
+    import config
+    cfg = config.Config
+    for key, name in (("EVENTS_DB_PATH", "events.db"), ("LIKE_BUFFER_DB_PATH", "like_buffer.db"),
+                      ("NEARDUP_DB_PATH", "neardup.db"), ("TRENDING_DB_PATH", "trending.db"),
+                      ("JINJA_BYTECODE_CACHE_DIR", "jinja_cache"), ("UPLOAD_FOLDER", "uploads")):
+        setattr(cfg, key, tmp / name)
+    cfg.SQLALCHEMY_DATABASE_URI = os.environ["DATABASE_URL"]
+    cfg.RATELIMIT_STORAGE_URI = "memory://"
+    cfg.RATELIMIT_ENABLED = False
+    cfg.ADMIN_EMAILS = [ADMIN_EMAIL]
+    cfg.QUERY_BUDGET_ACTION = "raise"
+
+    from app import create_app, db
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.create_all()
+        _seed(db)
+    return app
+
+
+def _seed(db, students: int = 12, posts: int = 30):
+    from app import courses, skills, stats
+    from app.models import Student, Post, Like, Comment
+
+    course = courses.ensure("Python Base")
+    people = [Student(nome=f"Studente {i}", email=f"s{i}@test.local", corso=course.nome,
+                      course_id=course.id, programmi="python, flask" if i % 2 else "python, sql")
+              for i in range(students)]
+    people.append(Student(nome="Admin", email=ADMIN_EMAIL, corso=course.nome, course_id=course.id))
+    db.session.add_all(people)
+    db.session.flush()
+    for s in people:
+        skills.set_for(s)
+
+    now = datetime.utcnow()
+    for i in range(posts):
+        author = people[i % students]
+        p = Post(author_id=author.id, course_id=course.id, content=f"Post di prova numero {i}",
+                 created_at=now - timedelta(minutes=i), moderation_status="approved",
+                 toxicity_score=0.0, is_visible=True)
+        db.session.add(p)
+        db.session.flush()
+        for j in range(3):
+            db.session.add(Comment(user_id=people[(i + j + 1) % students].id, post_id=p.id,
+                                   body=f"Commento {j}", created_at=now, moderation_status="approved",
+                                   toxicity_score=0.0, is_visible=True))
+            db.session.add(Like(user_id=people[(i + j) % students].id, post_id=p.id, created_at=now))
+    stats.rebuild()
+    db.session.commit()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(client):
+    def _login(email="s0@test.local"):
+        return client.post("/login", data={"email": email})
+    return _login
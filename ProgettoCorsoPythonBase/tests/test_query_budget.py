@@ -0,0 +1,44 @@
+# tests/test_query_budget.py
+"""Le route con @query_budget restano nel budget (QUERY_BUDGET_ACTION=raise)."""
+import pytest
+
+from app.querybudget import assert_max_queries
+
+from conftest import ADMIN_EMAIL
+
+PUBLIC = [
+    "/feed",
+    "/corso/python-base/feed",
+    "/post/1",
+    "/archivio",
+    "/api/posts",
+    "/api/posts/1/comments",
+    "/api/students",
+    "/api/students?skill=python&skill=flask",
+]
+
+
+@pytest.mark.parametrize("url", PUBLIC)
+def test_public_routes_within_budget(client, url):
+    assert client.get(url).status_code == 200
+
+
+@pytest.mark.parametrize("url", ["/feed", "/corso/python-base/feed", "/me", "/post/1"])
+def test_user_routes_within_budget(client, login, url):
+    login()
+    assert client.get(url).status_code == 200
+
+
+@pytest.mark.parametrize("url", ["/admin/moderation", "/admin/reports"])
+def test_admin_routes_within_budget(client, login, url):
+    login(ADMIN_EMAIL)
+    assert client.get(url).status_code == 200
+
+
+def test_api_posts_has_no_n_plus_one(client):
+    # autore in join, like e commenti contati in blocco: le query non crescono con i post
+    with assert_max_queries(max_total=6, max_repeat=1):
+        response = client.get("/api/posts")
+    posts = response.get_json()
+    assert len(posts) == 30
+    assert {(p["likes_count"], p["comments_count"]) for p in posts} == {(3, 3)}
@@ -0,0 +1,23 @@
+# tests/test_startup.py
+"""Avvio a freddo di un worker entro il budget (benchmarks/bench_startup.py)."""
+import importlib.util
+import os
+from pathlib import Path
+
+# caricato dal file: `benchmarks` non è un pacchetto e pyarrow ne installa
+# uno suo con lo stesso nome, che vincerebbe l'import
+_spec = importlib.util.spec_from_file_location(
+    "bench_startup", Path(__file__).resolve().parent.parent / "benchmarks" / "bench_startup.py")
+bench_startup = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(bench_startup)
+
+# margine largo: le macchine di CI sono più lente di quelle di sviluppo
+BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", "1500"))
+
+
+def test_cold_start_within_budget():
+    result = bench_startup.measure(runs=3)
+    assert not result["loaded_lazy"], f"moduli pigri caricati all'avvio: {result['loaded_lazy']}"
+    assert result["total_ms"] <= BUDGET_MS, (
+        f"import + create_app() in {result['total_ms']:.0f} ms (budget {BUDGET_MS:.0f} ms)"
+    )